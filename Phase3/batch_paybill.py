@@ -0,0 +1,205 @@
+"""
+Batch Paybill
+
+Month-end bill payments arrive in bulk. Running each one as a separate paybill
+command touches the biller's company account (10000, 20000, 30000, ...) on every
+payment, so all those payments queue up on a handful of accounts. Batch mode
+instead validates and debits the payers, and only adds each payment to a running
+total per biller in memory. When a batch is committed, the payer debits and one
+credit per biller go to the account store in a single apply().
+
+For every accepted payment the usual paybill record is written to the
+transaction file (03_<name>_<account>_<amount>_<company account>), so the
+per-payer audit trail is unchanged. The aggregated credits are written next to
+it, in <transaction file>.credits, one deposit-style record per biller per batch:
+
+  04_<biller code padded to 24>_<company account>_<batch total>__
+
+settle.py reads the credits file with its transaction file, and credits the
+company accounts from it instead of once per 03 record, so each payment is
+credited once. The credits are kept out of the transaction file itself so that
+tools reading it alone see only the payments.
+
+Payments file: one payment per line, "<account> <biller code> <amount>".
+Each payment is checked by the paybill rules of a standard session (paybill.py),
+with the paybill limit applying to what a payer pays within one batch.
+
+How to Run:
+    python3 batch_paybill.py <accounts_file> <payments_file> <transaction_out_file> [--batch-size N] [--shared-table=NAME]
+"""
+
+import sys
+
+import errors
+from check import CHECK
+from errors import ErrorMessage
+from main import load_users
+from paybill import Paybill
+from session import LOGOUT_RECORD
+
+PAYBILL_LIMIT = 2000.00
+
+
+def credits_path(path):
+    """ The file holding the biller credits of the batch paybill records in path. """
+    return path + ".credits"
+
+
+class PaybillBatch:
+    """
+    Accumulates one batch of bill payments and commits it to the accounts in one step.
+    """
+
+    def __init__(self, users, store=None, limit=PAYBILL_LIMIT, write_console=None):
+        """
+        :param users: Dict of User objects keyed by account number.
+        :param store: Optional account store (ShardedAccountStore / SharedAccountTable)
+                      that receives the batch's balance changes on commit.
+        :param limit: Maximum a single payer may pay in one batch.
+        :param write_console: Callback for rejection messages (defaults to a no-op).
+        """
+        self.users = users
+        self.store = store
+        self.limit = limit
+        self.write_console = write_console if write_console is not None else (lambda msg: None)
+        self.debits = {}    # payer account -> total debited in this batch
+        self.credits = {}   # company account -> [biller code, payments, total]
+        self.records = []
+
+    def add(self, account, company, amount):
+        """
+        Validates one payment and, if it is accepted, debits the payer locally and adds
+        it to its biller's total. Returns 1 if the payment was accepted, 0 otherwise.
+        """
+        user = self.users.get(account)
+        if user is None:
+            self.write_console(ErrorMessage(errors.ACCOUNT_NOT_FOUND, f"Error: Account {account} does not exist."))
+            return 0
+        if self.store is not None and account not in self.debits:
+            # First payment by this payer in the batch: start from the store's balance.
+            balance = self.store.balance(account)
+            if balance is not None:
+                user.balance = balance
+        if CHECK.invalid_character_check(amount):
+            amount = float(amount)
+        paid = self.debits.get(account, 0.0)
+        # The paybill rules (amount text that is not a number fails their numeric check),
+        # with the limit being what is left of the payer's limit in this batch.
+        paybill = Paybill("standard", user, company, amount, limit=self.limit - paid, write_console=self.write_console)
+        failed = paybill.rules.first_failure(paybill)
+        if failed is not None:
+            self.write_console(failed.error(paybill))
+            return 0
+
+        company_account = paybill.check.company_id_check(company)
+        user.balance -= amount
+        self.debits[account] = paid + amount
+        credit = self.credits.setdefault(company_account, [company, 0, 0.0])
+        credit[1] += 1
+        credit[2] += amount
+        self.records.append(paybill.return_transaction_output(company_account).rstrip("\n"))
+        return 1
+
+    def credit_records(self):
+        """ One deposit-style credit record per biller with its batch total. """
+        return [f"04_{company.ljust(24, '_')}_{company_account:0>5}_{total:0>8.2f}__"
+                for company_account, (company, _, total) in sorted(self.credits.items(), key=lambda c: c[1][0])]
+
+    def commit(self):
+        """
+        Applies the batch: payer debits and one credit per biller. Returns
+        (payment records, credit records). With a store, everything goes out in
+        a single apply(); if the store refuses it (a balance changed underneath
+        us), the local debits are rolled back and nothing is returned.
+        """
+        if not self.records:
+            return [], []
+        if self.store is not None:
+            deltas = {account: -paid for account, paid in self.debits.items()}
+            for company_account, (_, _, total) in self.credits.items():
+                deltas[company_account] = deltas.get(company_account, 0.0) + total
+            if not self.store.apply(deltas):
+                for account, paid in self.debits.items():
+                    self.users[account].balance += paid
+                self.write_console(ErrorMessage(errors.CONCURRENT_UPDATE,
+                                                "Error: Account balance changed by another session. Please re-try."))
+                return [], []
+        for company_account, (_, _, total) in self.credits.items():
+            if company_account in self.users:
+                self.users[company_account].balance += total
+        return self.records, self.credit_records()
+
+
+def read_payments(payments_file):
+    """ Yields (account, biller code, amount text) for each non-blank line. """
+    with open(payments_file) as f:
+        for number, line in enumerate(f, 1):
+            fields = line.split()
+            if not fields:
+                continue
+            if len(fields) != 3:
+                print(f"Error: line {number}: expected '<account> <biller> <amount>'.")
+                continue
+            yield fields
+
+
+def run_batches(users, payments, etf_file, batch_size=10000, store=None, write_console=None):
+    """
+    Processes payments in batches of batch_size and writes their records, the
+    payments to etf_file and the biller credits to credits_path(etf_file).
+    Returns (accepted, rejected) payment counts; payments of a batch the store
+    refused count as rejected.
+    """
+    accepted = total = 0
+    with open(etf_file, "w") as etf, open(credits_path(etf_file), "w") as credits:
+
+        def flush(batch):
+            records, credit_records = batch.commit()
+            etf.writelines(record + "\n" for record in records)
+            credits.writelines(record + "\n" for record in credit_records)
+            return len(records)
+
+        batch = PaybillBatch(users, store, write_console=write_console)
+        pending = 0
+        for account, company, amount in payments:
+            batch.add(account, company, amount)
+            total += 1
+            pending += 1
+            if pending >= batch_size:
+                accepted += flush(batch)
+                batch = PaybillBatch(users, store, write_console=write_console)
+                pending = 0
+        accepted += flush(batch)
+        etf.write(LOGOUT_RECORD + "\n")
+    return accepted, total - accepted
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        print("Usage: python3 batch_paybill.py <accounts_file> <payments_file> <transaction_out_file> "
+              "[--batch-size N] [--shared-table=NAME]")
+        sys.exit(1)
+
+    accounts_file, payments_file, etf_file = sys.argv[1:4]
+    batch_size, shared_name = 10000, None
+    options = sys.argv[4:]
+    for n, arg in enumerate(options):
+        if arg == "--batch-size" and n + 1 < len(options):
+            batch_size = int(options[n + 1])
+        elif arg.startswith("--batch-size="):
+            batch_size = int(arg.split("=", 1)[1])
+        elif arg.startswith("--shared-table="):
+            shared_name = arg.split("=", 1)[1]
+
+    if shared_name:
+        from shared_accounts import SharedAccountTable
+        table = SharedAccountTable.open_or_create(shared_name, lambda: load_users(accounts_file))
+        try:
+            accepted, rejected = run_batches(table.users(), read_payments(payments_file), etf_file,
+                                             batch_size, store=table, write_console=print)
+        finally:
+            table.close()
+    else:
+        accepted, rejected = run_batches(load_users(accounts_file), read_payments(payments_file), etf_file,
+                                         batch_size, write_console=print)
+    print(f"Batch paybill complete: {accepted} payments accepted, {rejected} rejected.")
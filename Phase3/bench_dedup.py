@@ -0,0 +1,81 @@
+"""
+Benchmark: Transaction ID Seen-Set
+
+Feeds txn_ids.SeenSet a stream of new transaction IDs, then the same IDs again
+(every one a duplicate), then a fresh set of IDs it has never seen, and reports
+for each pass the IDs per second and how many had to be looked up in the
+database. On the fresh pass every lookup is a Bloom filter false positive, so
+lookups / IDs is the measured false-positive rate. Also reports the filter's
+size, which is all the set keeps in memory, against what a Python set of the
+same IDs costs, and the time to reopen the set from disk.
+
+How to Run:
+    python3 bench_dedup.py [ids] [error_rate]
+
+The filter is sized for the 2 x ids it ends up holding, so the false-positive
+rate of the last pass should come out at or below error_rate.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from txn_ids import SeenSet, TransactionIds
+
+
+def ids(count, session):
+    generator = TransactionIds("T01", session)
+    return [generator.next() for _ in range(count)]
+
+
+def feed(seen, batch):
+    """ (IDs/s, new IDs, database lookups) of adding batch to seen. """
+    lookups = seen.lookups
+    start = time.perf_counter()
+    new = sum(1 for txn_id in batch if seen.add(txn_id))
+    seen.commit()
+    return len(batch) / (time.perf_counter() - start), new, seen.lookups - lookups
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    error_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 0.01
+
+    first, fresh = ids(count, "a1b2c3d4e5f6"), ids(count, "0f9e8d7c6b5a")
+    tracemalloc.start()
+    exact = set(first)
+    set_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del exact
+
+    workdir = tempfile.mkdtemp(prefix="bench_dedup_")
+    try:
+        path = os.path.join(workdir, "seen.db")
+        seen = SeenSet(path, expected=2 * count, error_rate=error_rate)
+        passes = [("new IDs", feed(seen, first)), ("duplicates", feed(seen, first))]
+        seen.close()
+        start = time.perf_counter()
+        seen = SeenSet(path)
+        reopen = time.perf_counter() - start
+        passes.append(("unseen IDs", feed(seen, fresh)))
+        filter_bytes = len(seen.bloom.data)
+        seen.close()
+        db_bytes = os.path.getsize(path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{count} IDs, filter sized for {error_rate:.2%} false positives")
+    for label, (rate, new, lookups) in passes:
+        print(f"  {label:<11}: {rate:9.0f} IDs/s  {new:8d} new  {lookups:8d} looked up ({lookups / count:.2%})")
+    print(f"  memory     : Bloom filter {filter_bytes / 1e6:.1f} MB, a set of the IDs {set_bytes / 1e6:.1f} MB")
+    print(f"  on disk    : {db_bytes / 1e6:.1f} MB database; reopened in {reopen * 1000:.1f} ms")
+    if passes[0][1][1] != count or passes[1][1][1] != 0 or passes[2][1][1] != count:
+        print("Error: the seen-set lost or invented IDs.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark: Transaction Log Durability Modes
+
+Writes the same stream of transaction records through a TransactionWriter in
+each durability mode (see txn_writer.py) and reports, per mode:
+
+  records/s      throughput, including the final sync on close
+  p50 / p99 / max  latency of a single write() call, i.e. how long the session
+                 waits for one record
+  syncs          fsyncs made; records / syncs is the group size
+
+Group commit is run with a few group sizes. Records are written back to back,
+so in group mode the record limit is what triggers the syncs; with slower
+traffic the group_ms bound takes over and groups get smaller.
+
+How to Run:
+    python3 bench_durability.py [records] [directory]
+
+directory should be on the disk whose fsync cost you want to know; it
+defaults to the system temporary directory, which may be a RAM-backed tmpfs
+where fsync costs nothing. A temporary subdirectory is created in it and
+removed afterwards.
+"""
+
+import datetime
+import shutil
+import sys
+import tempfile
+import time
+
+from txn_writer import TransactionWriter
+
+DAY = datetime.date(2026, 10, 19)
+CASES = (
+    ("none", {"durability": "none"}),
+    ("group of 256", {"durability": "group", "group_records": 256}),
+    ("group of 64", {"durability": "group", "group_records": 64}),
+    ("group of 8", {"durability": "group", "group_records": 8}),
+    ("txn", {"durability": "txn"}),
+)
+
+
+def records(count):
+    return [f"02_Holder_{n % 99999:05d}___________{n % 99999:05d}_{n % 100000 / 100:08.2f}_{(n * 7) % 99999:05d}"
+            for n in range(count)]
+
+
+def run(directory, lines, options):
+    """ (records/s, sorted write latencies in seconds, syncs) of writing lines with options. """
+    latencies = []
+    clock = time.perf_counter
+    start = clock()
+    with TransactionWriter(directory, max_bytes=1 << 40, today=lambda: DAY, **options) as writer:
+        for line in lines:
+            before = clock()
+            writer.write(line)
+            latencies.append(clock() - before)
+    elapsed = clock() - start
+    latencies.sort()
+    return len(lines) / elapsed, latencies, writer.syncs
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    base = sys.argv[2] if len(sys.argv) > 2 else None
+
+    lines = records(count)
+    workdir = tempfile.mkdtemp(prefix="bench_durability_", dir=base)
+    print(f"{count} records to {workdir}")
+    try:
+        for n, (label, options) in enumerate(CASES):
+            rate, latencies, syncs = run(f"{workdir}/{n}", lines, options)
+            p50, p99 = latencies[len(latencies) // 2], latencies[len(latencies) * 99 // 100]
+            print(f"  {label:<13}: {rate:9.0f} records/s  write p50 {p50 * 1e6:7.1f} us  p99 {p99 * 1e6:8.1f} us  "
+                  f"max {latencies[-1] * 1e3:6.2f} ms  {syncs} syncs")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
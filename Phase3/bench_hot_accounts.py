@@ -0,0 +1,99 @@
+"""
+Benchmark: Hot Company Accounts
+
+Runs concurrent paybill-style transfers (a random payer to one of the biller
+company accounts) from several worker processes against a SharedAccountTable,
+once with plain row locks on the company accounts and once with striped
+counters, and reports payments per second for each. Every run also checks that
+no money was created or lost: the sum of all balances must not change.
+
+How to Run:
+    python3 bench_hot_accounts.py [processes] [payments_per_process] [threads_per_process]
+
+A synthetic account table is used, so the real accounts file is never touched.
+"""
+
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+
+from billers import registry
+from main import User
+from shared_accounts import SharedAccountTable
+
+NUM_PAYERS = 2000
+
+
+def make_users():
+    users = {}
+    for n in range(1, NUM_PAYERS + 1):
+        acct = f"{n:05d}"
+        users[acct] = User(acct, f"Payer {n}", "A", 1_000_000.0)
+    for company in registry().codes:
+        users[company] = User(company, company, "A", 0.0)
+    return users
+
+
+def _pay(name, payments, threads, seed):
+    table = SharedAccountTable.attach(name)
+    companies = sorted(registry().codes)
+
+    def run(thread_seed):
+        rng = random.Random(thread_seed)
+        for _ in range(payments // threads):
+            table.transfer(f"{rng.randint(1, NUM_PAYERS):05d}", rng.choice(companies), 1.25)
+
+    workers = [threading.Thread(target=run, args=(seed * 100 + t,)) for t in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    table.close()
+
+
+def run(hot, processes, payments, threads):
+    users = make_users()
+    name = f"bench_hot_{os.getpid()}"
+    # persist=True keeps the block registered with no resource tracker, since the
+    # worker processes attach and detach through the tracker they share with us.
+    table = SharedAccountTable.create(name, users, persist=True, hot_accounts=None if hot else ())
+    total_before = sum(table.balance(acct) for acct in users)
+    try:
+        start = time.perf_counter()
+        procs = [multiprocessing.Process(target=_pay, args=(name, payments, threads, seed))
+                 for seed in range(processes)]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join()
+        elapsed = time.perf_counter() - start
+        table.merge_hot()
+        total_after = sum(table.balance(acct) for acct in users)
+        credited = sum(table.balance(acct) for acct in registry().codes)
+    finally:
+        table.close()
+        SharedAccountTable.remove(name)
+    expected = processes * (payments // threads) * threads * 1.25
+    assert abs(total_after - total_before) < 0.005, (total_before, total_after)
+    assert abs(credited - expected) < 0.005, (credited, expected)
+    return processes * (payments // threads) * threads / elapsed
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    payments = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+
+    print(f"{processes} processes x {threads} threads, {payments} payments per process, "
+          f"{os.cpu_count()} CPUs")
+    plain = run(False, processes, payments, threads)
+    striped = run(True, processes, payments, threads)
+    print(f"  row locks       : {plain:10.0f} payments/s")
+    print(f"  striped counters: {striped:10.0f} payments/s  ({striped / plain:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
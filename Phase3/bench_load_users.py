@@ -0,0 +1,92 @@
+"""
+Benchmark: Accounts File Ingestion
+
+Measures how fast load_users() turns a current accounts file into User objects,
+reported as MB/s of input. The old line-by-line str path (parse_account_line on
+each decoded line) is timed alongside it for comparison.
+
+How to Run:
+    python3 bench_load_users.py [num_accounts] [repeats]
+
+A synthetic accounts file with the usual fixed-width layout is generated in a
+temporary directory, so the real current_accounts_file.txt is never touched.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from main import User, load_users, parse_account_line
+
+# Fail the run if the bytes path drops below this throughput.
+TARGET_MB_PER_S = 10.0
+
+
+def write_accounts_file(path, num_accounts):
+    """ Writes num_accounts fixed-width records plus the END_OF_FILE sentinel. """
+    with open(path, "w") as f:
+        for n in range(1, num_accounts + 1):
+            name = f"Holder_{n}"[:20].ljust(21, "_")
+            flag = "D" if n % 7 == 0 else "A"
+            f.write(f"{n % 100000:05d}_{name}__{flag}_{(n * 37) % 100000:05d}.00\n")
+        f.write("END_OF_FILE___________________A_00000.00")
+
+
+def load_users_text(accounts_filename):
+    """ The previous str-based loader, kept here only as the comparison baseline. """
+    users_dict = {}
+    with open(accounts_filename, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            fields = parse_account_line(line)
+            if not fields:
+                continue
+            acct_num, uname, avail, bal = fields
+            users_dict[acct_num] = User(acct_num, uname, avail, bal)
+    return users_dict
+
+
+def best_of(func, path, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    num_accounts = int(sys.argv[1]) if len(sys.argv) > 1 else 99999
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "accounts.txt")
+        write_accounts_file(path, num_accounts)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+
+        # Both loaders must agree before their timings mean anything.
+        fast, slow = load_users(path), load_users_text(path)
+        assert fast.keys() == slow.keys()
+        for acct, user in fast.items():
+            other = slow[acct]
+            assert (user.user_name, user.availability, user.balance) == \
+                   (other.user_name, other.availability, other.balance)
+
+        text_time = best_of(load_users_text, path, repeats)
+        bytes_time = best_of(load_users, path, repeats)
+
+    bytes_rate = size_mb / bytes_time
+    print(f"accounts: {num_accounts}  file: {size_mb:.2f} MB  best of {repeats}")
+    print(f"  str path   : {text_time * 1000:8.2f} ms  {size_mb / text_time:8.2f} MB/s")
+    print(f"  bytes path : {bytes_time * 1000:8.2f} ms  {bytes_rate:8.2f} MB/s")
+    print(f"  speedup    : {text_time / bytes_time:.2f}x  (target {TARGET_MB_PER_S:.0f} MB/s)")
+
+    if bytes_rate < TARGET_MB_PER_S:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
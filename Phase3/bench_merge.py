@@ -0,0 +1,103 @@
+"""
+Benchmark: Transaction File Merge and Sort
+
+Writes a set of synthetic terminal files and times etf_merge on them:
+
+  merge          k-way merge of the files, each sorted by account first
+  sort, memory   external sort of the unsorted files with a limit they fit in
+  sort, spilled  external sort with a small memory limit, so it spills runs
+
+Reports records per second and the peak memory traced in a second run of each
+(tracing slows it down too much to time), and checks that all three produce the
+same records in the same order.
+
+How to Run:
+    python3 bench_merge.py [terminals] [records_per_terminal] [spill_limit_bytes]
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import etf_merge
+from etf_records import parse_record
+
+LOGOUT_RECORD = "00_________________________00000_00000.00__\n"
+
+
+def write_terminals(directory, terminals, per_terminal, seed=3060):
+    """ Writes each terminal's records unsorted and sorted; returns (unsorted paths, sorted paths). """
+    rng = random.Random(seed)
+    unsorted, sorted_paths = [], []
+    key = etf_merge.KEYS["account"]
+
+    def line_key(line):
+        return key(parse_record(line))
+
+    for terminal in range(terminals):
+        lines = []
+        for _ in range(per_terminal):
+            account = rng.randint(1, 99999)
+            name = f"Holder_{account}".ljust(21, "_")
+            code = rng.choice(("01", "02", "03", "04"))
+            lines.append(f"{code}_{name}_{account:05d}_{rng.randint(1, 99999) / 100:.2f}_{rng.randint(1, 99999):05d}\n")
+        for paths, body in ((unsorted, lines), (sorted_paths, sorted(lines, key=line_key))):
+            path = os.path.join(directory, f"T{terminal:03d}{'_sorted' if paths is sorted_paths else ''}.etf")
+            with open(path, "w") as f:
+                f.writelines(body)
+                f.write(LOGOUT_RECORD)
+            paths.append(path)
+    return unsorted, sorted_paths
+
+
+def run(fn, out_path):
+    """ (records/s, peak bytes) of fn(out), timed once and traced once. """
+    with open(out_path, "w") as out:
+        start = time.perf_counter()
+        stats = fn(out)
+        rate = stats.records / (time.perf_counter() - start)
+    with open(out_path, "w") as out:
+        tracemalloc.start()
+        fn(out)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return rate, peak, stats.runs
+
+
+def main():
+    terminals = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    per_terminal = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    spill_limit = int(sys.argv[3]) if len(sys.argv) > 3 else 2_000_000
+
+    workdir = tempfile.mkdtemp(prefix="bench_merge_")
+    try:
+        unsorted, sorted_paths = write_terminals(workdir, terminals, per_terminal)
+        cases = (
+            ("merge", lambda out: etf_merge.merge(sorted_paths, out, spill_dir=workdir)),
+            ("sort, memory", lambda out: etf_merge.external_sort(unsorted, out, memory_limit=1 << 40,
+                                                                 spill_dir=workdir)),
+            ("sort, spilled", lambda out: etf_merge.external_sort(unsorted, out, memory_limit=spill_limit,
+                                                                  spill_dir=workdir)),
+        )
+        outputs = []
+        print(f"{terminals} terminal files x {per_terminal} records")
+        for n, (label, fn) in enumerate(cases):
+            out_path = os.path.join(workdir, f"out_{n}.etf")
+            rate, peak, runs = run(fn, out_path)
+            with open(out_path) as f:
+                outputs.append(f.read())
+            print(f"  {label:<14}: {rate:9.0f} records/s  peak {peak / 1e6:6.1f} MB  {runs} temporary runs")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if len(set(outputs)) != 1:
+        print("Error: merge and sort produced different output.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
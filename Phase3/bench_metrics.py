@@ -0,0 +1,144 @@
+"""
+Benchmark: Metrics Overhead
+
+Runs the same generated sessions through banking_system with metrics off and
+with a SessionMetrics registry that is being scraped over HTTP about once a
+second, and reports the cost of the metrics as a share of session time. Each
+script is run with and without metrics back to back, several times, and its
+best time on each side is kept, so noise from the machine does not land on one
+side only. The metrics fold queued commands in batches, inside whichever run
+fills the batch (or a scrape), and a best-of per script would drop exactly
+those runs: so the time spent folding is timed, taken out of the run it
+happened in, and added back to the metrics side as the average per pass over
+all the scripts. Handler timing (--metrics-handlers) is on, the most the
+metrics can cost.
+
+The overhead is reported per session and per command, and the budget is on the
+share of session time the metrics add. Sessions here are run in-process, as the
+load generator and the worker pool run them, so a session is mostly opening and
+reading the accounts and script files and each command is only a few
+microseconds of work. Exits non-zero if the overhead is over budget.
+
+How to Run:
+    python3 bench_metrics.py [sessions] [repeats]
+"""
+
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+from loadgen import LoadGenerator
+from main import banking_system, load_users
+from metrics import SessionMetrics, serve
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Budget for the time metrics add to a session, in percent of its time without them.
+OVERHEAD_BUDGET_PERCENT = 3.0
+PORT = 9465
+
+
+class FoldTimedMetrics(SessionMetrics):
+    """ SessionMetrics that adds up the time spent folding queued commands into the metrics. """
+
+    fold_seconds = 0.0
+
+    def collect(self):
+        start = time.perf_counter()
+        super().collect()
+        self.fold_seconds += time.perf_counter() - start
+
+
+def write_sessions(accounts_file, count, directory):
+    generator = LoadGenerator(load_users(accounts_file), seed=3060)
+    paths = []
+    for n in range(count):
+        path = os.path.join(directory, f"session_{n:05d}.inp")
+        with open(path, "w") as f:
+            f.write("\n".join(generator.session()) + "\n")
+        paths.append(path)
+    return paths
+
+
+def run(accounts_file, paths, directory, metrics, repeats):
+    """
+    Runs every session script repeats times with metrics off and repeats times with
+    metrics on (a FoldTimedMetrics), each script's two runs back to back (in alternating
+    order), and returns the summed best time per script for each side, plus the average
+    folding time per pass on the metrics side: (off seconds, on seconds). Pairing the
+    runs gives both sides the same machine state; taking the best run of each script
+    keeps one slow file open or a scheduler hiccup from counting against either.
+    """
+    out, etf = os.path.join(directory, "bench.out"), os.path.join(directory, "bench.etf")
+    best = {None: [float("inf")] * len(paths), metrics: [float("inf")] * len(paths)}
+    folded = metrics.fold_seconds
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for repeat in range(repeats):
+            order = (None, metrics) if repeat % 2 == 0 else (metrics, None)
+            for n, path in enumerate(paths):
+                for session_metrics in order:
+                    fold = metrics.fold_seconds
+                    start = time.perf_counter()
+                    banking_system(accounts_file, path, out, etf, metrics=session_metrics)
+                    elapsed = time.perf_counter() - start - (metrics.fold_seconds - fold)
+                    best[session_metrics][n] = min(best[session_metrics][n], elapsed)
+    metrics.collect()
+    return sum(best[None]), sum(best[metrics]) + (metrics.fold_seconds - folded) / repeats
+
+
+def commands_recorded(metrics):
+    metrics.collect()
+    return sum(child.value for child in metrics.commands._children.values())
+
+
+def scrape(stop, counts):
+    while not stop.wait(1.0):
+        with urllib.request.urlopen(f"http://127.0.0.1:{PORT}/metrics") as response:
+            response.read()
+        counts[0] += 1
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    accounts_file = os.path.join(HERE, "current_accounts_file.txt")
+
+    workdir = tempfile.mkdtemp(prefix="bench_metrics_")
+    old_cwd = os.getcwd()
+    # create/delete append to daily_transaction_file.txt in the current directory.
+    os.chdir(workdir)
+    metrics = FoldTimedMetrics(handler_timing=True)
+    server = serve(metrics.registry, PORT)
+    stop, scrapes = threading.Event(), [0]
+    scraper = threading.Thread(target=scrape, args=(stop, scrapes), daemon=True)
+    try:
+        paths = write_sessions(accounts_file, sessions, workdir)
+        run(accounts_file, paths[:100], workdir, metrics, 1)  # warm up imports and caches
+        scraper.start()
+        recorded = commands_recorded(metrics)
+        base, with_metrics = run(accounts_file, paths, workdir, metrics, repeats)
+        commands = (commands_recorded(metrics) - recorded) / repeats
+    finally:
+        stop.set()
+        server.shutdown()
+        os.chdir(old_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    overhead = (with_metrics - base) / base * 100
+    per_command_us = (with_metrics - base) / commands * 1_000_000
+    print(f"{sessions} sessions ({commands:.0f} commands), best of {repeats} runs each way, {scrapes[0]} scrapes")
+    print(f"  metrics off: {base * 1000 / sessions:8.3f} ms/session")
+    print(f"  metrics on : {with_metrics * 1000 / sessions:8.3f} ms/session  "
+          f"({overhead:+.1f}%, budget {OVERHEAD_BUDGET_PERCENT:.0f}%)")
+    print(f"  per command: {per_command_us:8.2f} us added")
+    if overhead > OVERHEAD_BUDGET_PERCENT:
+        print("Error: metrics overhead is over budget.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark: Optimistic Commits on the Shared Account Table
+
+Runs writer processes that make transfers between a small set of accounts
+through Session (read balances and versions, check the debit, commit with
+compare_and_apply() and retry on conflict) against a SharedAccountTable, first
+on their own and then alongside reader processes that do nothing but read
+balances. Reports transfers per second, reads per second and the contention
+counters (conflicts, read retries, commits given up) for each run, and checks
+that no money was created or lost.
+
+Readers take no locks, so the writers' rate should not drop when they are added
+beyond what sharing the CPUs costs; on a machine with fewer CPUs than processes
+the two runs mostly show that readers never make a writer wait on a lock.
+
+How to Run:
+    python3 bench_optimistic.py [writers] [readers] [seconds] [accounts]
+
+A synthetic account table is used, so the real accounts file is never touched.
+"""
+
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from main import User
+from session import Session
+from shared_accounts import SharedAccountTable
+
+
+def make_users(accounts):
+    return {f"{n:05d}": User(f"{n:05d}", f"Holder {n}", "A", 1000.0) for n in range(1, accounts + 1)}
+
+
+def _write(name, seconds, seed, results):
+    table = SharedAccountTable.attach(name)
+    users = table.users()
+    accounts = sorted(users)
+    rng = random.Random(seed)
+    done = refused = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        session = Session(users, table)
+        sender, receiver = rng.sample(accounts, 2)
+        sender, receiver = session.account(sender), session.account(receiver)
+        before = session.refresh(sender, receiver)
+        amount = float(rng.randint(1, 50))
+        if sender.balance < amount:
+            continue
+        sender.balance -= amount
+        receiver.balance += amount
+        if session.commit(before):
+            done += 1
+        else:
+            refused += 1
+    results.put(("writer", done, refused, dict(table.contention)))
+    table.close()
+
+
+def _read(name, seconds, seed, results):
+    table = SharedAccountTable.attach(name)
+    accounts = sorted(table.users())
+    rng = random.Random(seed)
+    done = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            table.read(rng.choice(accounts))
+        done += 100
+    results.put(("reader", done, 0, dict(table.contention)))
+    table.close()
+
+
+def run(writers, readers, seconds, accounts):
+    users = make_users(accounts)
+    name = f"bench_optimistic_{os.getpid()}"
+    # persist=True, as in bench_hot_accounts.py: the workers attach through the tracker we share.
+    table = SharedAccountTable.create(name, users, persist=True, hot_accounts=())
+    total_before = sum(table.balance(acct) for acct in users)
+    results = multiprocessing.Queue()
+    try:
+        procs = [multiprocessing.Process(target=_write, args=(name, seconds, seed, results))
+                 for seed in range(writers)]
+        procs += [multiprocessing.Process(target=_read, args=(name, seconds, 1000 + seed, results))
+                  for seed in range(readers)]
+        for proc in procs:
+            proc.start()
+        reports = [results.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+        total_after = sum(table.balance(acct) for acct in users)
+    finally:
+        table.close()
+        SharedAccountTable.remove(name)
+    assert abs(total_after - total_before) < 0.005, (total_before, total_after)
+
+    contention = {}
+    for _, _, _, counts in reports:
+        for key, value in counts.items():
+            contention[key] = contention.get(key, 0) + value
+    transfers = sum(done for kind, done, _, _ in reports if kind == "writer")
+    refused = sum(refused for kind, _, refused, _ in reports if kind == "writer")
+    reads = sum(done for kind, done, _, _ in reports if kind == "reader")
+    return transfers / seconds, reads / seconds, refused, contention
+
+
+def main():
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 3.0
+    accounts = int(sys.argv[4]) if len(sys.argv) > 4 else 20
+
+    print(f"{writers} writers, {readers} readers, {accounts} accounts, {seconds:g} s per run, "
+          f"{os.cpu_count()} CPUs")
+    for label, num_readers in (("writers only", 0), ("with readers", readers)):
+        transfers, reads, refused, counts = run(writers, num_readers, seconds, accounts)
+        conflict_rate = counts["conflicts"] / counts["commits"] * 100 if counts["commits"] else 0.0
+        print(f"  {label:<13}: {transfers:9.0f} transfers/s  {reads:10.0f} reads/s")
+        print(f"  {'':<13}  {counts['commits']} commits, {counts['conflicts']} conflicts ({conflict_rate:.1f}%), "
+              f"{counts['retries_exhausted']} given up, {refused} refused, "
+              f"{counts['read_retries']} read retries in {counts['reads']} reads")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Benchmark: Session Pipeline Stages
+
+Times each stage of the session pipeline (see pipeline.py) on its own over the
+same generated sessions, then whole sessions with the emit stage inline and on
+its own thread:
+
+  tokenize   tokenize() on every script
+  dispatch   banking_system with a NullEmitter (accounts loaded beforehand, so
+             this is the command loop only)
+  emit       the output dispatch produced, replayed into FileEmitters
+  session    banking_system end to end, emit inline / emit on a ThreadedEmitter /
+             on a ThreadedEmitter that fsyncs the .etf after each of its writes
+
+For the threaded runs it also reports how many lines each of the writer
+thread's writes took on average (how much it coalesced) and how often the
+session had to wait for room in its queue.
+
+How to Run:
+    python3 bench_pipeline.py [sessions] [repeats]
+
+Sessions run in a temporary working directory, because create/delete append to
+daily_transaction_file.txt in the current directory.
+"""
+
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from loadgen import LoadGenerator
+from main import banking_system, load_users
+from pipeline import CONSOLE, RECORD, FileEmitter, NullEmitter, ThreadedEmitter, tokenize
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class RecordingEmitter(NullEmitter):
+    """ Keeps the output of a session so the emit stage can be replayed on its own. """
+
+    def __init__(self, sink):
+        self.items = []
+        sink.append(self.items)
+
+    def console(self, msg):
+        self.items.append((CONSOLE, msg))
+
+    def record(self, txn_str):
+        self.items.append((RECORD, txn_str))
+
+
+def best(repeats, fn, setup=lambda: None):
+    """ Best time of repeats calls fn(setup()), with setup() left out of the timing. """
+    times = []
+    for _ in range(repeats):
+        arg = setup()
+        start = time.perf_counter()
+        fn(arg)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    accounts_file = os.path.join(HERE, "current_accounts_file.txt")
+
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    old_cwd = os.getcwd()
+    os.chdir(workdir)
+    devnull = open(os.devnull, "w")
+    try:
+        generator = LoadGenerator(load_users(accounts_file), seed=3060)
+        paths = []
+        for n in range(sessions):
+            paths.append(os.path.join(workdir, f"session_{n:05d}.inp"))
+            with open(paths[-1], "w") as f:
+                f.write("\n".join(generator.session()) + "\n")
+        out, etf = os.path.join(workdir, "bench.out"), os.path.join(workdir, "bench.etf")
+
+        def run_tokenize(_):
+            for path in paths:
+                tokenize(path)
+
+        def load_all():
+            # A fresh copy per session, as each session reads the accounts file itself.
+            return [load_users(accounts_file) for _ in paths]
+
+        def run_dispatch(all_users, make_emitter=NullEmitter):
+            for path, users in zip(paths, all_users):
+                banking_system(accounts_file, path, out, etf, users=users, emitter=make_emitter())
+
+        outputs = []
+        with contextlib.redirect_stdout(devnull):
+            run_dispatch(load_all(), lambda: RecordingEmitter(outputs))
+
+        def run_emit(_):
+            for items in outputs:
+                emitter = FileEmitter(out, etf)
+                emitter.emit(items)
+                emitter.close()
+
+        writer_stats = {}
+
+        def run_sessions(threaded, fsync=False):
+            writes = waits = 0
+            for path in paths:
+                emitter = ThreadedEmitter(FileEmitter(out, etf), fsync=fsync) if threaded else None
+                banking_system(accounts_file, path, out, etf, emitter=emitter)
+                if threaded:
+                    writes += emitter.writes
+                    waits += emitter.waits
+            if threaded:
+                writer_stats[fsync] = (writes, waits)
+
+        with contextlib.redirect_stdout(devnull):
+            results = [
+                ("tokenize", best(repeats, run_tokenize)),
+                ("dispatch", best(repeats, run_dispatch, load_all)),
+                ("emit", best(repeats, run_emit)),
+                ("session, emit inline", best(repeats, lambda _: run_sessions(False))),
+                ("session, emit thread", best(repeats, lambda _: run_sessions(True))),
+                ("session, thread+fsync", best(repeats, lambda _: run_sessions(True, True))),
+            ]
+    finally:
+        devnull.close()
+        os.chdir(old_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    lines = sum(len(items) for items in outputs)
+    print(f"{sessions} sessions ({lines} output lines), best of {repeats}")
+    for name, seconds in results:
+        print(f"  {name:<22}: {seconds * 1e6 / sessions:8.1f} us/session")
+    for fsync, (writes, waits) in writer_stats.items():
+        print(f"  writer thread{' (fsync)' if fsync else ''}: {lines / max(1, writes):.1f} lines per write, "
+              f"{waits} waits for queue room")
+
+
+if __name__ == "__main__":
+    main()
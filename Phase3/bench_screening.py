@@ -0,0 +1,93 @@
+"""
+Benchmark: Velocity Screening
+
+Replays a synthetic stream of withdrawals, transfers and paybills through a
+ScreeningStage with the default rules (screen() before each transaction and
+record() after it) and reports the cost per transaction, first with 1,000
+accounts and then with 100,000. Each account transacts about once every
+ACCOUNT_INTERVAL simulated seconds in both runs, so a screen() or record()
+finds the same number of expired buckets to clear on average whatever the
+number of accounts. The first half of the stream warms the stage up (every
+account gets its counters) and only the second half is timed. With 100k
+accounts the same number of transactions covers much less simulated time, so
+the longer windows are not full yet and fewer transactions are rejected.
+
+Screening cost must not grow with the number of accounts: the run fails if the
+cost per transaction at 100k accounts is over the budget, or more than
+MAX_GROWTH times the cost at 1k accounts.
+
+How to Run:
+    python3 bench_screening.py [transactions] [repeats]
+"""
+
+import random
+import sys
+import time
+
+from screening import ScreeningStage
+
+SMALL, LARGE = 1_000, 100_000
+BUDGET_US = 20.0
+MAX_GROWTH = 2.0
+KINDS = ("withdraw", "transfer", "paybill")
+ACCOUNT_INTERVAL = 600.0
+
+
+def make_stream(num_accounts, count, seed=3060):
+    """ (time, kind, account, amount) tuples. """
+    rng = random.Random(seed)
+    rate = num_accounts / ACCOUNT_INTERVAL
+    now = 0.0
+    stream = []
+    for _ in range(count):
+        now += rng.expovariate(rate)
+        stream.append((now, rng.choice(KINDS), f"{rng.randrange(num_accounts):05d}", float(rng.randint(1, 500))))
+    return stream
+
+
+def replay(stage, clock, stream):
+    rejected = 0
+    screen, record = stage.screen, stage.record
+    for now, kind, account, amount in stream:
+        clock[0] = now
+        if screen(kind, account, amount) is None:
+            record(kind, account, amount)
+        else:
+            rejected += 1
+    return rejected
+
+
+def run(stream):
+    """ Returns (seconds per timed transaction, rejected, flagged) for one replay of stream. """
+    clock = [0.0]
+    stage = ScreeningStage(clock=lambda: clock[0])
+    half = len(stream) // 2
+    replay(stage, clock, stream[:half])
+    flagged = stage.flagged
+    start = time.perf_counter()
+    rejected = replay(stage, clock, stream[half:])
+    elapsed = time.perf_counter() - start
+    return elapsed / (len(stream) - half), rejected, stage.flagged - flagged
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 400_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    results = {}
+    for num_accounts in (SMALL, LARGE):
+        stream = make_stream(num_accounts, count)
+        per_txn, rejected, flagged = min(run(stream) for _ in range(repeats))
+        results[num_accounts] = per_txn
+        print(f"{num_accounts:>7} accounts: {per_txn * 1e6:6.2f} us/transaction  "
+              f"({rejected} rejected, {flagged} flagged in the timed half, {stream[-1][0] / 3600:.1f} h simulated)")
+
+    growth = results[LARGE] / results[SMALL]
+    print(f"100k / 1k cost ratio: {growth:.2f}x (max {MAX_GROWTH:.1f}x), budget {BUDGET_US:.0f} us/transaction")
+    if results[LARGE] * 1e6 > BUDGET_US or growth > MAX_GROWTH:
+        print("Error: screening cost is over budget.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
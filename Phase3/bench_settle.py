@@ -0,0 +1,106 @@
+"""
+Benchmark: End-of-Day Settlement
+
+Generates a day of withdrawals, transfers, paybills and deposits over a
+synthetic set of accounts and settles it twice: with the default memory limit
+(every account's totals stay in the hash table) and with a limit small enough
+that the table spills to sorted runs many times. Reports records per second
+for each, and the peak memory of a second, traced run (tracing slows it down
+too much to time), and checks that both produce the same report and the same
+closing balances.
+
+How to Run:
+    python3 bench_settle.py [records] [accounts] [spill_limit_bytes]
+
+Files are written to a temporary directory, so the real accounts file is never
+touched.
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from main import User
+from settle import settle
+
+COMPANIES = ("10000", "20000", "30000")
+
+
+def make_users(accounts):
+    users = {f"{n:05d}": User(f"{n:05d}", f"Holder {n}", "A", 5000.0) for n in range(1, accounts + 1)}
+    for company in COMPANIES:
+        users[company] = User(company, company, "A", 0.0)
+    return users
+
+
+def write_day(path, records, accounts, seed=3060):
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        for _ in range(records):
+            code = rng.choice(("01", "02", "02", "03", "04"))
+            account = f"{rng.randint(1, accounts):05d}"
+            amount = rng.randint(1, 50000) / 100
+            name = f"Holder_{int(account)}".ljust(21, "_")
+            if code == "02":
+                f.write(f"02_{name}_{account}_{amount:.2f}_{rng.randint(1, accounts):05d}\n")
+            elif code == "03":
+                f.write(f"03_{name}_{account}_{amount:.2f}_{rng.choice(COMPANIES)}\n")
+            elif code == "04":
+                f.write(f"04_{name.ljust(24, '_')}_{account}_{amount:.2f}__\n")
+            else:
+                f.write(f"01_{name}_{account}_{amount:.2f}\n")
+        f.write("00_________________________00000_00000.00__\n")
+
+
+def run(path, accounts, memory_limit, spill_dir):
+    """
+    Settles path once for the time and once more under tracemalloc for the peak memory.
+    Returns (records/s, peak bytes, runs spilled, report text, closing balances).
+    """
+    report_path = os.path.join(spill_dir, "report.txt")
+    for traced in (False, True):
+        users = make_users(accounts)
+        with open(report_path, "w") as report:
+            if traced:
+                tracemalloc.start()
+            start = time.perf_counter()
+            records, settled, spilled = settle(users, [path], report, memory_limit, spill_dir)
+            elapsed = time.perf_counter() - start
+            if traced:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            else:
+                rate = records / elapsed
+    with open(report_path) as f:
+        text = f.read()
+    return rate, peak, spilled, text, {acct: user.balance for acct, user in users.items()}
+
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    accounts = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    spill_limit = int(sys.argv[3]) if len(sys.argv) > 3 else 1_000_000
+
+    workdir = tempfile.mkdtemp(prefix="bench_settle_")
+    try:
+        path = os.path.join(workdir, "day.etf")
+        write_day(path, records, accounts)
+        in_memory = run(path, accounts, 1 << 40, workdir)
+        spilling = run(path, accounts, spill_limit, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{records} records over {accounts} accounts")
+    for label, (rate, peak, spilled, _, _) in (("hash table only", in_memory), ("spilling", spilling)):
+        print(f"  {label:<16}: {rate:9.0f} records/s  peak {peak / 1e6:6.1f} MB  {spilled} runs spilled")
+    if in_memory[3] != spilling[3] or in_memory[4] != spilling[4]:
+        print("Error: spilling changed the settlement.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
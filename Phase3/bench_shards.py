@@ -0,0 +1,83 @@
+"""
+Benchmark: Sharded Account Store Scaling
+
+Pushes the same stream of balance changes through ShardedAccountStore with
+1, 2, 4 ... shards and reports operations per second for each, so the effect
+of adding shard processes on one machine can be seen directly.
+
+The stream is mostly single-account debits/credits (withdrawal, deposit,
+paybill) with a share of transfers, some of which cross shard boundaries and
+therefore exercise the two-phase prepare/commit path.
+
+How to Run:
+    python3 bench_shards.py [num_accounts] [num_ops] [max_shards]
+"""
+
+import random
+import sys
+import time
+
+from main import User
+from shard_store import ShardedAccountStore
+
+BATCH_SIZE = 2000
+TRANSFER_SHARE = 0.2
+
+
+def make_users(num_accounts):
+    return {f"{n:05d}": User(f"{n:05d}", f"Holder {n}", "A", 5000.00)
+            for n in range(1, num_accounts + 1)}
+
+
+def make_ops(accounts, num_ops, seed=3060):
+    rng = random.Random(seed)
+    ops = []
+    for _ in range(num_ops):
+        amount = float(rng.randint(1, 50))
+        if rng.random() < TRANSFER_SHARE:
+            src, dst = rng.sample(accounts, 2)
+            ops.append({src: -amount, dst: amount})
+        else:
+            acct = rng.choice(accounts)
+            ops.append({acct: amount if rng.random() < 0.5 else -amount})
+    return ops
+
+
+def run(users, ops, num_shards):
+    with ShardedAccountStore(users, num_shards) as store:
+        start = time.perf_counter()
+        for pos in range(0, len(ops), BATCH_SIZE):
+            store.apply_batch(ops[pos:pos + BATCH_SIZE])
+        elapsed = time.perf_counter() - start
+        total = sum(store.snapshot().values())
+    return elapsed, total
+
+
+def main():
+    num_accounts = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    num_ops = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    max_shards = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    users = make_users(num_accounts)
+    ops = make_ops(sorted(users), num_ops)
+
+    print(f"accounts: {num_accounts}  ops: {num_ops}  batch: {BATCH_SIZE}")
+    baseline = None
+    totals = set()
+    shards = 1
+    while shards <= max_shards:
+        elapsed, total = run(users, ops, shards)
+        totals.add(round(total, 2))
+        rate = num_ops / elapsed
+        baseline = baseline or rate
+        print(f"  shards={shards:<3} {elapsed:8.3f} s  {rate:12,.0f} ops/s  x{rate / baseline:.2f}")
+        shards *= 2
+
+    # Every shard count must end with the same money in the system.
+    if len(totals) != 1:
+        print(f"  ERROR: shard counts disagree on total balance: {sorted(totals)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark: Front End Cold Start
+
+Every session is a fresh `python3 main.py ...` process, so interpreter start and
+imports are paid once per session. This script keeps that cost under a budget:
+
+1. Runs `python -X importtime -c "import main"` and reports the import time of
+   main and of every project module it pulls in at startup.
+2. Runs main.py end to end on a short login/withdraw/logout script several times
+   and reports the median wall time of the whole process.
+
+Exits non-zero if either median is over its budget.
+
+How to Run:
+    python3 bench_startup.py [runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Budgets for the median of the runs, in milliseconds.
+IMPORT_BUDGET_MS = 25.0
+SESSION_BUDGET_MS = 60.0
+
+SESSION_SCRIPT = "login\nstandard\nXuan_Zheng\nwithdraw\n00003\n100\nlogout\n"
+
+
+def import_times():
+    """ Returns {module: (self_us, cumulative_us)} for one cold `import main`. """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            cwd=HERE, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def session_time(tmp):
+    inp = os.path.join(tmp, "startup.inp")
+    with open(inp, "w") as f:
+        f.write(SESSION_SCRIPT)
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "main.py", "current_accounts_file.txt", inp,
+                    os.path.join(tmp, "startup.out"), os.path.join(tmp, "startup.etf")],
+                   cwd=HERE, check=True, stdout=subprocess.DEVNULL)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 9
+    project = {name[:-3] for name in os.listdir(HERE) if name.endswith(".py")}
+
+    samples = [import_times() for _ in range(runs)]
+    import_ms = statistics.median(s["main"][1] for s in samples) / 1000
+    loaded = sorted(name for name in samples[-1] if name in project)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        session_ms = statistics.median(session_time(tmp) for _ in range(runs))
+
+    print(f"median of {runs} runs")
+    print(f"  import main     : {import_ms:7.2f} ms  (budget {IMPORT_BUDGET_MS:.0f} ms)")
+    print(f"  project modules : {', '.join(loaded)}")
+    print(f"  full session    : {session_ms:7.2f} ms  (budget {SESSION_BUDGET_MS:.0f} ms)")
+
+    if import_ms > IMPORT_BUDGET_MS or session_ms > SESSION_BUDGET_MS:
+        print("Error: cold start is over budget.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Biller Registry
+
+Single source of truth for the billers a user can pay. The biller table is read
+from a data file (billers.txt next to this module by default), one biller per line:
+
+  <code>_<company account>_<name with _ for spaces>
+  EC_10000_The_Bright_Light_Electric_Company
+  ...
+  END_OF_FILE
+
+and published as read-only mappings (types.MappingProxyType), so validating a
+biller or finding its company account is a single dict lookup however many
+billers there are. Check and Paybill share one registry through registry().
+
+Hot reload: the file's modification time is checked at most once every
+check_interval seconds; when it changed, the file is parsed into new mappings and
+swapped in with one assignment, so a lookup sees either the old table or the new
+one, never a half-loaded one. A malformed file is rejected and the previous table
+stays in use (the problem is kept in last_error).
+"""
+
+import os
+import time
+from types import MappingProxyType
+
+BILLERS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "billers.txt")
+
+# Used when no billers file exists, matching the billers the front end always had.
+DEFAULT_BILLERS = {
+    "EC": ("10000", "The Bright Light Electric Company"),
+    "CQ": ("20000", "Credit Card Company Q"),
+    "FI": ("30000", "Fast Internet Inc"),
+}
+
+
+def parse_billers(path):
+    """
+    Reads a billers file into {code: (company account, name)}.
+    Raises ValueError naming the first malformed line.
+    """
+    billers = {}
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("END_OF_FILE"):
+                break
+            code, _, rest = line.partition("_")
+            account, _, name = rest.partition("_")
+            if not code or len(account) != 5 or not account.isdigit():
+                raise ValueError(f"{path}:{number}: expected <code>_<5-digit account>_<name>, got {line!r}")
+            if code in billers:
+                raise ValueError(f"{path}:{number}: duplicate biller code {code}")
+            billers[code] = (account, name.replace("_", " "))
+    return billers
+
+
+class BillerRegistry:
+    """
+    Read-only biller table loaded from a data file, reloaded when the file changes.
+    """
+
+    def __init__(self, path=BILLERS_FILE, check_interval=1.0):
+        """
+        :param path: Billers data file. If it does not exist, DEFAULT_BILLERS are used.
+        :param check_interval: Minimum seconds between modification-time checks (0 = every lookup).
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self.last_error = None
+        self._mtime = None
+        self._checked = None
+        self._install(DEFAULT_BILLERS)
+        self.refresh(force=True)
+
+    def _install(self, billers):
+        accounts = {code: account for code, (account, _) in billers.items()}
+        self._tables = (MappingProxyType(accounts),
+                        MappingProxyType({code: name for code, (_, name) in billers.items()}),
+                        MappingProxyType({account: code for code, account in accounts.items()}))
+
+    def refresh(self, force=False):
+        """
+        Reloads the table if the data file changed. Returns True if a new table was installed.
+        """
+        now = time.monotonic()
+        if not force and self._checked is not None and now - self._checked < self.check_interval:
+            return False
+        self._checked = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            billers = parse_billers(self.path)
+        except (OSError, ValueError) as error:
+            self.last_error = str(error)
+            return False
+        self._install(billers)
+        self.last_error = None
+        return True
+
+    @property
+    def accounts(self):
+        """ Read-only {biller code: company account number}. """
+        self.refresh()
+        return self._tables[0]
+
+    @property
+    def names(self):
+        """ Read-only {biller code: company name}. """
+        self.refresh()
+        return self._tables[1]
+
+    @property
+    def codes(self):
+        """ Read-only {company account number: biller code}. """
+        self.refresh()
+        return self._tables[2]
+
+    def is_valid(self, code):
+        return code in self.accounts
+
+    def account_for(self, code):
+        """ The company account for a biller code, or None if it is not a biller. """
+        return self.accounts.get(code)
+
+
+_registry = None
+
+
+def registry():
+    """ The registry shared by Check, Paybill and the tools, created on first use. """
+    global _registry
+    if _registry is None:
+        _registry = BillerRegistry()
+    return _registry
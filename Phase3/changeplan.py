@@ -1,4 +1,6 @@
-from check import Check
+import errors
+from check import CHECK
+from errors import ErrorMessage
 
 class ChangePlan:
     """
@@ -29,7 +31,7 @@ class ChangePlan:
         self.user = user
         self.provided_account_number = provided_account_number
         self.new_plan = new_plan
-        self.check = Check()
+        self.check = CHECK
         # Use the provided write_console function; if none provided, default to print.
         self.write_console = write_console if write_console is not None else print
 
@@ -74,20 +76,20 @@ class ChangePlan:
         Returns 1 if successful, 0 otherwise.
         """
         if self.userType != "admin":
-            self.write_console("Error: Change plan transaction requires admin privileges.")
+            self.write_console(ErrorMessage(errors.UNAUTHORIZED, "Error: Change plan transaction requires admin privileges."))
             return 0
 
         if not self.check.account_existence_check(self.user):
-            self.write_console("Error: Account does not exist.")
+            self.write_console(ErrorMessage(errors.ACCOUNT_NOT_FOUND, "Error: Account does not exist."))
             return 0
 
         if not self.check.availability_check(self.user):
-            self.write_console(f"Error: Account {self.user.account_number} is disabled. Cannot change plan.")
+            self.write_console(ErrorMessage(errors.ACCOUNT_DISABLED, f"Error: Account {self.user.account_number} is disabled. Cannot change plan."))
             return 0
 
         # Check if provided account number matches the user's actual account number.
         if self.user.account_number != self.provided_account_number:
-            self.write_console("Error: The account number does not match the account holder name.")
+            self.write_console(ErrorMessage(errors.ACCOUNT_MISMATCH, "Error: The account number does not match the account holder name."))
             return 0
 
         current_plan = getattr(self.user, 'plan', 'SP')
@@ -96,7 +98,7 @@ class ChangePlan:
             new_plan = "NP" if current_plan == "SP" else "SP"
         else:
             if self.new_plan not in ["SP", "NP"]:
-                self.write_console("Error: Invalid plan provided. Must be 'SP' or 'NP'.")
+                self.write_console(ErrorMessage(errors.INVALID_PLAN, "Error: Invalid plan provided. Must be 'SP' or 'NP'."))
                 return 0
             new_plan = self.new_plan
 
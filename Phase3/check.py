@@ -3,8 +3,11 @@ Check Class
 
 This class provides various validation methods to ensure proper transaction processing in the banking system.
 It includes methods for checking user account validity, balance sufficiency, transaction limits, and input correctness.
+Biller codes are looked up in the shared biller registry (billers.py).
 """
 
+from billers import registry
+
 class Check:
     """
     Provides validation checks for different banking transactions.
@@ -44,17 +47,11 @@ class Check:
 
     def valid_company_check(self, company):
         """ Confirms that the provided company code is valid. """
-        VALID_COMPANIES = ["EC", "CQ", "FI"]
-        return company in VALID_COMPANIES
+        return registry().is_valid(company)
 
     def company_id_check(self, company):
         """ Retrieves the corresponding account ID for a given company code. """
-        COMPANY_ACCOUNTS = {
-            "EC": "10000",
-            "CQ": "20000",
-            "FI": "30000"
-        }
-        return COMPANY_ACCOUNTS.get(company)
+        return registry().account_for(company)
 
     def invalid_character_check(self, value):
         """ Ensures that the value contains only numeric characters. """
@@ -74,3 +71,7 @@ class Check:
     def sender_account_match(self, user, sender_account):
         """ Verifies that the sender's account matches the logged-in user. """
         return user.account_number == sender_account
+
+
+# Check keeps no state, so handlers and rule sets share this one instance.
+CHECK = Check()
@@ -1,4 +1,6 @@
-from check import Check
+import errors
+from check import CHECK
+from errors import ErrorMessage
 
 class Create:
     """
@@ -13,7 +15,8 @@ class Create:
         :param accounts: A dictionary containing existing accounts.
         :param account_holder_name: Name of the new account holder.
         :param initial_balance: The initial balance for the account.
-        :param transaction_file: The file where transaction logs are stored.
+        :param transaction_file: The file where transaction logs are stored (None when the
+                                 caller logs the returned record itself, e.g. to a TransactionWriter).
         :param write_console: Function to handle console output.
         """
         self.userType = userType
@@ -21,7 +24,7 @@ class Create:
         self.account_holder_name = account_holder_name
         self.initial_balance = initial_balance
         self.transaction_file = transaction_file
-        self.check = Check()
+        self.check = CHECK
 
         # Provide a default no-op if not given
         if write_console is None:
@@ -37,23 +40,23 @@ class Create:
         """
         # Ensure only admins can create an account
         if self.userType != "admin":
-            self.write_console("Error: Only admins can create new accounts.")
+            self.write_console(ErrorMessage(errors.UNAUTHORIZED, "Error: Only admins can create new accounts."))
             return None
 
         # Validate account holder name
         if not self.account_holder_name:
-            self.write_console("Error: Account holder name cannot be empty.")
+            self.write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Account holder name cannot be empty."))
             return None
         if len(self.account_holder_name) > 20:
-            self.write_console("Error: Account holder name must be at most 20 characters.")
+            self.write_console(ErrorMessage(errors.INVALID_NAME, "Error: Account holder name must be at most 20 characters."))
             return None
 
         # Validate balance
         if not self.check.negative_amount_check(self.initial_balance):
-            self.write_console("Error: Balance cannot be negative.")
+            self.write_console(ErrorMessage(errors.INVALID_AMOUNT, "Error: Balance cannot be negative."))
             return None
         if self.initial_balance > 99999.99:
-            self.write_console("Error: Initial balance cannot exceed $99,999.99.")
+            self.write_console(ErrorMessage(errors.LIMIT_EXCEEDED, "Error: Initial balance cannot exceed $99,999.99."))
             return None
 
         # Generate unique account number (ensures 5-digit format)
@@ -99,5 +102,7 @@ class Create:
         
         :param transaction_output: The formatted transaction string.
         """
+        if self.transaction_file is None:
+            return
         with open(self.transaction_file, "a") as file:
             file.write(transaction_output + "\n")
\ No newline at end of file
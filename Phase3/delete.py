@@ -1,4 +1,6 @@
-from check import Check
+import errors
+from check import CHECK
+from errors import ErrorMessage
 
 class Delete:
     """
@@ -15,12 +17,13 @@ class Delete:
         - accounts (dict): Dictionary containing existing accounts.
         - write_console (function): Function to write to the console (default: print).
         - transaction_file (str): File where transactions are logged (default: "daily_transaction_file.txt").
+          None when the caller logs the returned record itself, e.g. to a TransactionWriter.
         """
         self.userType = userType
         self.accounts = accounts
         self.write_console = write_console
         self.transaction_file = transaction_file
-        self.check = Check()
+        self.check = CHECK
 
         if write_console is None:
             def _default_console(msg): pass
@@ -40,11 +43,11 @@ class Delete:
         """
 
         if self.userType != "admin":
-            self.write_console("Error: Only admins can delete accounts.")
+            self.write_console(ErrorMessage(errors.UNAUTHORIZED, "Error: Only admins can delete accounts."))
             return None
 
         if not account_holder_name:
-            self.write_console("Error: Account holder name cannot be empty.")
+            self.write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Account holder name cannot be empty."))
             return None
 
         account_found = None
@@ -52,7 +55,7 @@ class Delete:
             account_found = self.accounts[account_number]
 
         if not account_found:
-            self.write_console(f"Error: No account found for {account_holder_name} with account number {account_number}.")
+            self.write_console(ErrorMessage(errors.ACCOUNT_NOT_FOUND, f"Error: No account found for {account_holder_name} with account number {account_number}."))
             return None
 
         transaction_output = self.return_transaction_output(account_found)
@@ -91,5 +94,7 @@ class Delete:
         - transaction_output (str): The formatted transaction string to be recorded.
         """
 
+        if self.transaction_file is None:
+            return
         with open(self.transaction_file, "a") as file:
             file.write(transaction_output + "\n")
\ No newline at end of file
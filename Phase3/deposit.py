@@ -1,4 +1,6 @@
-from check import Check
+import errors
+from check import CHECK
+from errors import ErrorMessage
 
 class Deposit:
     """
@@ -16,7 +18,7 @@ class Deposit:
         self.userType = userType
         self.user = user
         self.amount = amount
-        self.check = Check()
+        self.check = CHECK
         
         # Provide a default no-op if not given
         if write_console is None:
@@ -31,30 +33,30 @@ class Deposit:
             user=self.user, amount=self.amount
         )
         if not all_inputs_valid:
-            self.write_console(f"Error: The deposit {', '.join(missing_fields)} is missing, so the process will be rejected. Please re-try.")
+            self.write_console(ErrorMessage(errors.MISSING_INPUT, f"Error: The deposit {', '.join(missing_fields)} is missing, so the process will be rejected. Please re-try."))
             return
 
         # Validate deposit amount
         if not self.check.invalid_character_check(self.amount):
-            self.write_console("Error: Invalid deposit amount. Amount must be numeric.")
+            self.write_console(ErrorMessage(errors.NOT_NUMERIC, "Error: Invalid deposit amount. Amount must be numeric."))
             return
         if not self.check.negative_amount_check(self.amount):
-            self.write_console("Error: Invalid deposit amount. Amount must be positive.")
+            self.write_console(ErrorMessage(errors.INVALID_AMOUNT, "Error: Invalid deposit amount. Amount must be positive."))
             return
         if not self.check.zero_amount_check(self.amount):
-            self.write_console("Error: Deposit amount must be greater than zero.")
+            self.write_console(ErrorMessage(errors.INVALID_AMOUNT, "Error: Deposit amount must be greater than zero."))
             return
 
         # Check if the account is active
         if not self.check.availability_check(self.user):
-            self.write_console("Error: Account is inactive. Please use an available account.")
+            self.write_console(ErrorMessage(errors.ACCOUNT_DISABLED, "Error: Account is inactive. Please use an available account."))
             return
 
         # Process the deposit by updating the balance
         self.user.balance += self.amount
 
         if self.user.balance > 10000:
-            self.write_console("Error: Cannot deposit more funds than accounts balance limit of 10000")
+            self.write_console(ErrorMessage(errors.LIMIT_EXCEEDED, "Error: Cannot deposit more funds than accounts balance limit of 10000"))
             return
             
         self.write_console(f"Deposit successful. Funds unavailable for this session. New balance: ${self.user.balance:.2f}")
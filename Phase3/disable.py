@@ -1,4 +1,6 @@
-from check import Check
+import errors
+from check import CHECK
+from errors import ErrorMessage
 
 class Disable:
     """
@@ -28,7 +30,7 @@ class Disable:
         self.provided_account_holder = provided_account_holder
         self.provided_account_number = provided_account_number
         self.users = users
-        self.check = Check()
+        self.check = CHECK
         self.user = None  # Will hold the actual User object if found
         self.write_console = write_console if write_console is not None else print
 
@@ -37,7 +39,7 @@ class Disable:
            Returns 1 if successful, 0 otherwise.
         """
         if self.userType != "admin":
-            self.write_console("Error: Disable transaction requires admin privileges.")
+            self.write_console(ErrorMessage(errors.UNAUTHORIZED, "Error: Disable transaction requires admin privileges."))
             return 0
 
         # 1. Check if an account with the provided name exists.
@@ -48,12 +50,12 @@ class Disable:
                 break
 
         if found_user is None:
-            self.write_console("Error: Account holder name not found.")
+            self.write_console(ErrorMessage(errors.ACCOUNT_NOT_FOUND, "Error: Account holder name not found."))
             return 0
 
         # 2. Check if the provided account number matches that account.
         if found_user.account_number != self.provided_account_number:
-            self.write_console("Error: Provided account number does not match the account holder name.")
+            self.write_console(ErrorMessage(errors.ACCOUNT_MISMATCH, "Error: Provided account number does not match the account holder name."))
             return 0
 
         # Set the found user.
@@ -61,7 +63,7 @@ class Disable:
 
         # 3. Check if the account is already disabled.
         if not self.check.availability_check(self.user):
-            self.write_console(f"Error: Account {self.user.account_number} is already disabled.")
+            self.write_console(ErrorMessage(errors.ACCOUNT_DISABLED, f"Error: Account {self.user.account_number} is already disabled."))
             return 0
 
         # 4. Disable the account.
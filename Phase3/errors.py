@@ -0,0 +1,50 @@
+"""
+Error Codes
+
+Every error a session reports to the console gets a code, chosen where the
+error happens: the handler or command that rejects a transaction writes an
+ErrorMessage, which is the console text (a str, so every write_console callback
+takes it as before) carrying the code along with it. The event stream and the
+metrics read the code from the message and never look at its wording, so
+messages can be reworded freely.
+
+The codes are plain ints here, so that sessions do not import enum just to
+report an error; events.ErrorCode is the IntEnum of the same names and values
+for consumers. Binary event files store the numbers: never renumber a code.
+"""
+
+NONE = 0
+NOT_LOGGED_IN = 1
+ALREADY_LOGGED_IN = 2
+UNAUTHORIZED = 3
+MISSING_INPUT = 4
+NOT_NUMERIC = 5
+INVALID_AMOUNT = 6
+INSUFFICIENT_FUNDS = 7
+LIMIT_EXCEEDED = 8
+ACCOUNT_NOT_FOUND = 9
+ACCOUNT_MISMATCH = 10
+ACCOUNT_DISABLED = 11
+SAME_ACCOUNT = 12
+INVALID_BILLER = 13
+INVALID_PLAN = 14
+INVALID_SESSION_TYPE = 15
+CONCURRENT_UPDATE = 16
+SCREENED = 17
+INVALID_NAME = 18
+OTHER = 99   # an "Error:" line written without a code
+
+
+class ErrorMessage(str):
+    """
+    Console text of an error, with its code.
+    """
+
+    def __new__(cls, code, text):
+        """
+        :param code: One of the codes above.
+        :param text: The console text, e.g. "Error: Target account does not exist."
+        """
+        message = super().__new__(cls, text)
+        message.code = code
+        return message
@@ -0,0 +1,264 @@
+"""
+Transaction Archive
+
+Packs historical transaction files into one compressed archive (.etfa) that can
+still be queried by day and account without unpacking the whole thing.
+
+Records are grouped into blocks of up to block_records lines, never mixing two
+days in one block, and each block is compressed on its own (zlib by default,
+lzma optionally). The index at the end of the archive lists every block with
+its day, record count and the set of account numbers that appear in it (the
+account of every record, and the target or company account of transfers and
+paybills), so a query such as "all transactions for account 00003 in October"
+only seeks to and decompresses the blocks that can contain a match. A record
+matches an account it debits or credits, so a transfer into 00003 is one of
+00003's transactions. Blocks are decompressed in
+chunks and records are yielded as they come out, so a large block is never held
+in memory as a whole.
+
+Archive layout:
+  MAGIC | block 1 | block 2 | ... | index (zlib-compressed JSON) | FOOTER
+where FOOTER holds the index offset and length followed by MAGIC again.
+
+How to Run:
+    python3 etf_archive.py pack  <archive> <log_dir> [--codec lzma] [--block-records N]
+    python3 etf_archive.py pack  <archive> <day>=<etf_file> [<day>=<etf_file> ...]
+    python3 etf_archive.py query <archive> [--account NNNNN] [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+    python3 etf_archive.py stats <archive>
+
+A <log_dir> is a directory written by txn_writer.TransactionWriter; its
+manifest supplies the day of every file.
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import zlib
+
+try:
+    import lzma
+except ImportError:  # Python built without liblzma; only zlib archives are available
+    lzma = None
+
+from etf_records import parse_record
+from txn_writer import read_manifest
+
+MAGIC = b"ETFA1\n"
+FOOTER = struct.Struct("<QQ6s")
+READ_CHUNK = 64 * 1024
+
+
+def _accounts(record):
+    """ The accounts a parsed record names: its own, and a transfer's or paybill's other side. """
+    if record.code in ("02", "03") and record.extra.isdigit():
+        return record.account, record.extra
+    return (record.account,)
+
+
+def _compressor(codec):
+    if codec == "zlib":
+        return zlib.compressobj(9)
+    if codec == "lzma":
+        if lzma is None:
+            raise ValueError("This Python has no lzma support; use --codec zlib.")
+        return lzma.LZMACompressor(preset=6)
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+def _decompressor(codec):
+    if codec == "zlib":
+        return zlib.decompressobj()
+    if lzma is None:
+        raise ValueError("This archive uses lzma, which this Python does not support.")
+    return lzma.LZMADecompressor()
+
+
+class ArchiveWriter:
+    """
+    Writes a new archive. Records must be added in day order.
+    """
+
+    def __init__(self, path, codec="zlib", block_records=2048):
+        """
+        :param path: Archive file to create (overwritten if it exists).
+        :param codec: "zlib" or "lzma".
+        :param block_records: Maximum records per compressed block.
+        """
+        _compressor(codec)  # fail early on an unsupported codec
+        self.path = path
+        self.codec = codec
+        self.block_records = block_records
+        self.blocks = []
+        self._day = None
+        self._lines = []
+        self._accounts = set()
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+
+    def add(self, day, record):
+        """ Adds one record line (without its newline) for day (YYYY-MM-DD). """
+        if self._day is not None and day < self._day:
+            raise ValueError(f"Records must be added in day order ({day} after {self._day}).")
+        if day != self._day or len(self._lines) >= self.block_records:
+            self._flush_block()
+            self._day = day
+        self._lines.append(record)
+        parsed = parse_record(record)
+        if parsed is not None:
+            self._accounts.update(_accounts(parsed))
+
+    def add_file(self, day, etf_path):
+        """ Adds every non-blank line of a transaction file under day. """
+        with open(etf_path) as f:
+            for line in f:
+                line = line.rstrip("\n")
+                if line.strip():
+                    self.add(day, line)
+
+    def _flush_block(self):
+        if not self._lines:
+            return
+        compressor = _compressor(self.codec)
+        data = compressor.compress(("\n".join(self._lines) + "\n").encode()) + compressor.flush()
+        self.blocks.append({"offset": self._file.tell(), "length": len(data), "day": self._day,
+                            "records": len(self._lines), "accounts": sorted(self._accounts)})
+        self._file.write(data)
+        self._lines = []
+        self._accounts = set()
+
+    def close(self):
+        """ Writes the last block, the index and the footer. """
+        if self._file is None:
+            return
+        self._flush_block()
+        index = zlib.compress(json.dumps({"codec": self.codec, "blocks": self.blocks},
+                                         separators=(",", ":")).encode())
+        offset = self._file.tell()
+        self._file.write(index)
+        self._file.write(FOOTER.pack(offset, len(index), MAGIC))
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ArchiveReader:
+    """
+    Reads the index of an archive and streams records out of the matching blocks.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a transaction archive.")
+            f.seek(-FOOTER.size, os.SEEK_END)
+            offset, length, magic = FOOTER.unpack(f.read(FOOTER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is incomplete (no footer); it was not closed properly.")
+            f.seek(offset)
+            index = json.loads(zlib.decompress(f.read(length)))
+        self.codec = index["codec"]
+        self.blocks = index["blocks"]
+        self.blocks_read = 0
+
+    def days(self):
+        return sorted({block["day"] for block in self.blocks})
+
+    def select(self, day_from=None, day_to=None, account=None):
+        """ The index entries of the blocks that can hold a matching record. """
+        return [block for block in self.blocks
+                if (day_from is None or block["day"] >= day_from)
+                and (day_to is None or block["day"] <= day_to)
+                and (account is None or account in block["accounts"])]
+
+    def _block_lines(self, f, block):
+        """ Yields the lines of one block, decompressing it a chunk at a time. """
+        self.blocks_read += 1
+        decompressor = _decompressor(self.codec)
+        f.seek(block["offset"])
+        remaining = block["length"]
+        pending = b""
+        while remaining:
+            chunk = f.read(min(READ_CHUNK, remaining))
+            remaining -= len(chunk)
+            pending += decompressor.decompress(chunk)
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                yield line.decode()
+        if pending:
+            yield pending.decode()
+
+    def records(self, day_from=None, day_to=None, account=None):
+        """
+        Yields (day, record line) for every record in [day_from, day_to] (inclusive,
+        either end optional), limited to the records naming one account number (on
+        either side of a transfer or paybill) if given.
+        """
+        with open(self.path, "rb") as f:
+            for block in self.select(day_from, day_to, account):
+                for line in self._block_lines(f, block):
+                    if account is not None:
+                        parsed = parse_record(line)
+                        if parsed is None or account not in _accounts(parsed):
+                            continue
+                    yield block["day"], line
+
+
+def pack_log_dir(log_dir, archive_path, codec="zlib", block_records=2048):
+    """ Archives every file listed in a TransactionWriter manifest. Returns the block count. """
+    entries = sorted(read_manifest(log_dir), key=lambda e: (e["day"], e["terminal"] or "", e["seq"]))
+    with ArchiveWriter(archive_path, codec, block_records) as writer:
+        for entry in entries:
+            writer.add_file(entry["day"], os.path.join(log_dir, entry["file"]))
+    return len(writer.blocks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compressed transaction archive.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    pack = sub.add_parser("pack")
+    pack.add_argument("archive")
+    pack.add_argument("sources", nargs="+", help="a log directory, or <day>=<etf_file> pairs")
+    pack.add_argument("--codec", choices=["zlib", "lzma"], default="zlib")
+    pack.add_argument("--block-records", type=int, default=2048)
+    query = sub.add_parser("query")
+    query.add_argument("archive")
+    query.add_argument("--account")
+    query.add_argument("--from", dest="day_from")
+    query.add_argument("--to", dest="day_to")
+    stats = sub.add_parser("stats")
+    stats.add_argument("archive")
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        if len(args.sources) == 1 and os.path.isdir(args.sources[0]):
+            pack_log_dir(args.sources[0], args.archive, args.codec, args.block_records)
+        else:
+            sources = []
+            for source in args.sources:
+                day, sep, etf_path = source.partition("=")
+                if not sep:
+                    print(f"Error: expected <day>=<etf_file>, got {source}")
+                    sys.exit(1)
+                sources.append((day, etf_path))
+            with ArchiveWriter(args.archive, args.codec, args.block_records) as writer:
+                for day, etf_path in sorted(sources):
+                    writer.add_file(day, etf_path)
+        print(f"Archived to {args.archive} ({os.path.getsize(args.archive)} bytes).")
+    elif args.command == "query":
+        reader = ArchiveReader(args.archive)
+        for day, line in reader.records(args.day_from, args.day_to, args.account):
+            print(f"{day} {line}")
+        print(f"({reader.blocks_read} of {len(reader.blocks)} blocks read)", file=sys.stderr)
+    else:
+        reader = ArchiveReader(args.archive)
+        records = sum(block["records"] for block in reader.blocks)
+        print(f"{args.archive}: {records} records in {len(reader.blocks)} {reader.codec} blocks, "
+              f"{len(reader.days())} days, {os.path.getsize(args.archive)} bytes")
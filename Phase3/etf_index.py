@@ -0,0 +1,191 @@
+"""
+Transaction File Integrity Index
+
+Keeps a small side index next to a daily transaction file (<file>.idx) that is
+updated incrementally as batches of records are appended:
+
+- a rolling SHA-256 hash chain: each batch's hash is sha256(previous hash + batch
+  bytes), with the file offset and chain value recorded per batch,
+- a record count per transaction code,
+- a record count and amount total per account.
+
+Because update() only reads bytes appended since the last call, keeping the index
+current costs O(new records). Summaries come straight from the index without
+touching the transaction file, and verify() detects a truncated or altered file:
+the quick check looks at the file size and the last batch only, and the full
+check re-hashes every batch and reports the first one that does not match.
+
+The per-day log files keep their index current as they are written when the
+TransactionWriter is created with index=True (main.py --log-index). For any
+other transaction file, including the .etf of a session, updating the index is
+a manual step: run update (or call EtfIndex.update()) after the file is written.
+
+How to Run:
+    python3 etf_index.py update  daily_transaction_file.txt
+    python3 etf_index.py verify  daily_transaction_file.txt [--full]
+    python3 etf_index.py summary daily_transaction_file.txt
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+from etf_records import TRANSACTION_CODES, parse_record
+
+GENESIS = "0" * 64
+
+
+class EtfIndex:
+    """
+    Hash-chain and summary index for one transaction file.
+    """
+
+    def __init__(self, etf_path):
+        self.etf_path = etf_path
+        self.index_path = etf_path + ".idx"
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.data = json.load(f)
+        else:
+            self.data = {
+                "size": 0,          # bytes of the transaction file covered by the index
+                "records": 0,
+                "unparsed": 0,      # lines that were not valid transaction records
+                "chain": GENESIS,
+                "checkpoints": [],  # [end offset, chain value] per indexed batch
+                "codes": {},
+                "accounts": {},     # account number -> [record count, amount total]
+            }
+
+    def _save(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.data, f, separators=(",", ":"))
+        os.replace(tmp_path, self.index_path)
+
+    def update(self):
+        """
+        Indexes every complete line appended since the last update as one batch.
+        Returns the number of records added. Raises ValueError if the file is now
+        shorter than the indexed part (it was truncated or replaced).
+        """
+        size = os.path.getsize(self.etf_path) if os.path.exists(self.etf_path) else 0
+        start = self.data["size"]
+        if size < start:
+            raise ValueError(f"{self.etf_path} is shorter than its index ({size} < {start} bytes); run verify.")
+        if size == start:
+            return 0
+
+        with open(self.etf_path, "rb") as f:
+            f.seek(start)
+            new_bytes = f.read(size - start)
+        # A partially written last line is left for the next update.
+        end = new_bytes.rfind(b"\n") + 1
+        if end == 0:
+            return 0
+        batch = new_bytes[:end]
+
+        codes, accounts = self.data["codes"], self.data["accounts"]
+        added = 0
+        for line in batch.decode().splitlines():
+            if not line.strip():
+                continue
+            record = parse_record(line)
+            if record is None:
+                self.data["unparsed"] += 1
+                continue
+            added += 1
+            codes[record.code] = codes.get(record.code, 0) + 1
+            if record.code != "00":
+                totals = accounts.setdefault(record.account, [0, 0.0])
+                totals[0] += 1
+                totals[1] = round(totals[1] + record.amount, 2)
+
+        chain = hashlib.sha256(bytes.fromhex(self.data["chain"]) + batch).hexdigest()
+        self.data["chain"] = chain
+        self.data["size"] = start + end
+        self.data["records"] += added
+        self.data["checkpoints"].append([start + end, chain])
+        self._save()
+        return added
+
+    def append_batch(self, records):
+        """ Appends a list of record strings to the transaction file and indexes them. """
+        with open(self.etf_path, "a") as f:
+            for record in records:
+                f.write(record + "\n")
+        return self.update()
+
+    def verify(self, full=False):
+        """
+        Checks the transaction file against the index and returns a list of problems
+        (empty when the file is intact). The quick check re-hashes only the last batch;
+        full=True re-hashes every batch.
+        """
+        problems = []
+        size = os.path.getsize(self.etf_path) if os.path.exists(self.etf_path) else 0
+        indexed = self.data["size"]
+        if size < indexed:
+            problems.append(f"truncated: file has {size} bytes, index covers {indexed}")
+            return problems
+
+        checkpoints = self.data["checkpoints"]
+        if full:
+            first, chain, offset = 0, GENESIS, 0
+        elif checkpoints:
+            first = len(checkpoints) - 1
+            chain = checkpoints[-2][1] if len(checkpoints) > 1 else GENESIS
+            offset = checkpoints[-2][0] if len(checkpoints) > 1 else 0
+        else:
+            first, chain, offset = 0, GENESIS, 0
+
+        with open(self.etf_path, "rb") as f:
+            f.seek(offset)
+            for number in range(first, len(checkpoints)):
+                end, expected = checkpoints[number]
+                chain = hashlib.sha256(bytes.fromhex(chain) + f.read(end - offset)).hexdigest()
+                if chain != expected:
+                    problems.append(f"tampered: batch {number + 1} (bytes {offset}-{end}) does not match its hash")
+                    break
+                offset = end
+
+        if size > indexed:
+            problems.append(f"unindexed: {size - indexed} bytes appended since the last update")
+        return problems
+
+    def summary(self):
+        """ Returns record totals straight from the index. """
+        return {
+            "records": self.data["records"],
+            "unparsed": self.data["unparsed"],
+            "batches": len(self.data["checkpoints"]),
+            "chain": self.data["chain"],
+            "codes": dict(self.data["codes"]),
+            "accounts": {acct: {"count": n, "amount": amount}
+                         for acct, (n, amount) in self.data["accounts"].items()},
+        }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("update", "verify", "summary"):
+        print("Usage: python3 etf_index.py update|verify|summary <transaction_file> [--full]")
+        sys.exit(1)
+
+    index = EtfIndex(sys.argv[2])
+    if sys.argv[1] == "update":
+        print(f"Indexed {index.update()} new records.")
+    elif sys.argv[1] == "verify":
+        problems = index.verify(full="--full" in sys.argv[3:])
+        for problem in problems:
+            print(f"Error: {problem}")
+        print("Integrity check failed." if any(not p.startswith("unindexed") for p in problems)
+              else "Integrity check passed.")
+        sys.exit(1 if any(not p.startswith("unindexed") for p in problems) else 0)
+    else:
+        summary = index.summary()
+        print(f"Records: {summary['records']} in {summary['batches']} batches ({summary['unparsed']} unparsed)")
+        for code, count in sorted(summary["codes"].items()):
+            print(f"  {code} {TRANSACTION_CODES.get(code, '?'):<11} {count}")
+        for acct, totals in sorted(summary["accounts"].items()):
+            print(f"  account {acct}: {totals['count']} records, total ${totals['amount']:,.2f}")
@@ -0,0 +1,255 @@
+"""
+Transaction File Merge and Sort
+
+Every terminal writes its own transaction files; the back office wants one
+ordered stream to apply. Two tools, both streaming, so the work grows with disk
+space and not memory:
+
+- merge: k-way merge of transaction files that are each already in order. One
+  line per input file is held in a heap (heapq.merge), so hundreds of terminal
+  files merge in constant memory. An input that turns out not to be in order is
+  reported with its file and record number instead of being merged wrongly.
+
+- sort: external sort of transaction files in any order. Lines are collected up
+  to memory_limit bytes, sorted, and spilled to a temporary run file; the runs
+  are then k-way merged. With no more input than fits in memory nothing is
+  spilled at all.
+
+Records are ordered by account number ("--key=account", the default) or by
+transaction code ("--key=code"), and nothing else: records with the same key
+keep the order they had, the order of the inputs on the command line and then
+their order within each file. Each account's records therefore stay in the
+order they happened (a create before the first deposit to the new account, a
+deposit before the withdrawal it pays for), as long as the inputs are given in
+time order. Logout (00) records only mark where one session
+ended, which means nothing once records are reordered, so they are dropped and
+the output ends with a single logout record, as a session's file does. Lines
+that are not transaction records are skipped and counted.
+
+At most fan_in files are open at once. With more inputs or runs than that, they
+are merged in groups into intermediate runs first (each pass reads and writes
+the data once more).
+
+How to Run:
+    python3 etf_merge.py merge <out.etf> <etf_file | log_dir> [...] [--key=account|code] [--fan-in=N]
+    python3 etf_merge.py sort  <out.etf> <etf_file | log_dir> [...] [--key=account|code] [--fan-in=N]
+                               [--memory-limit=BYTES]
+
+A <log_dir> is a directory written by txn_writer.TransactionWriter; every file in
+its manifest is used, in manifest order.
+"""
+
+import heapq
+import os
+import sys
+import tempfile
+from operator import itemgetter
+
+from etf_records import parse_record
+from txn_writer import manifest_files
+
+LOGOUT_RECORD = "00_________________________00000_00000.00__"
+DEFAULT_MEMORY_LIMIT = 64 * 1024 * 1024
+# Well under the usual limit of 1024 open files per process.
+DEFAULT_FAN_IN = 256
+# Memory a buffered record costs beyond its characters: the line's str object, its
+# sort key and the pair holding both, and the list slot.
+LINE_OVERHEAD = 250
+
+# Sort keys, as functions of a parsed Record. Deliberately a single field: every
+# merge and sort here is stable, which is what keeps records of one key in time order.
+KEYS = {
+    "account": lambda record: record.account,
+    "code": lambda record: record.code,
+}
+_first = itemgetter(0)
+
+
+class MergeStats:
+    """
+    Counts of what a merge or sort did.
+    """
+
+    def __init__(self):
+        self.records = 0    # records written
+        self.skipped = 0    # lines that were not transaction records
+        self.runs = 0       # temporary run files written (spills and intermediate merges)
+
+
+def _records(f, key, stats):
+    """
+    (sort key, line) for the transaction records of an open file, logout records and
+    stray lines left out. Each line is parsed once, here.
+    """
+    for line in f:
+        if line.startswith("00_"):
+            continue
+        record = parse_record(line)
+        if record is None:
+            if line.strip():
+                stats.skipped += 1
+            continue
+        yield key(record), line if line.endswith("\n") else line + "\n"
+
+
+def _checked(records, path):
+    """ Passes records through, raising ValueError at the first one out of key order. """
+    previous = None
+    for number, record in enumerate(records, 1):
+        if previous is not None and record[0] < previous:
+            raise ValueError(f"{path}: record {number} is out of order; sort the file first.")
+        previous = record[0]
+        yield record
+
+
+def _new_run(spill_dir, stats):
+    fd, path = tempfile.mkstemp(prefix="etf_run_", suffix=".etf", dir=spill_dir)
+    stats.runs += 1
+    return path, os.fdopen(fd, "w")
+
+
+def _stream(f, path, key, stats, check):
+    records = _records(f, key, stats)
+    return _checked(records, path) if check else records
+
+
+def _reduce(paths, key, fan_in, spill_dir, stats, temporary, check_order=frozenset()):
+    """
+    Merges paths in consecutive groups into runs until at most fan_in remain, and
+    returns the remaining paths. Paths in check_order are checked for order as they
+    are read. Runs in temporary are removed once merged into a later run; new runs
+    are added to it, for the caller to remove.
+    """
+    while len(paths) > fan_in:
+        merged = []
+        for start in range(0, len(paths), fan_in):
+            group = paths[start:start + fan_in]
+            if len(group) == 1:
+                merged.append(group[0])
+                continue
+            path, out = _new_run(spill_dir, stats)
+            temporary.append(path)
+            files = [open(p) for p in group]
+            try:
+                with out:
+                    streams = [_stream(f, p, key, stats, p in check_order) for f, p in zip(files, group)]
+                    out.writelines(line for _, line in heapq.merge(*streams, key=_first))
+            finally:
+                for f in files:
+                    f.close()
+            for p in group:
+                if p in temporary:
+                    temporary.remove(p)
+                    os.remove(p)
+            merged.append(path)
+        paths = merged
+    return paths
+
+
+def merge(paths, out, key="account", fan_in=DEFAULT_FAN_IN, spill_dir=None):
+    """
+    Merges transaction files that are each in key order into out (an open file).
+    Raises ValueError if an input is out of order. Returns MergeStats.
+    """
+    key = KEYS[key]
+    stats = MergeStats()
+    temporary = []
+    originals = frozenset(paths)
+    try:
+        remaining = _reduce(list(paths), key, fan_in, spill_dir, stats, temporary, originals)
+        _write_merged([(path, path in originals) for path in remaining], out, key, stats)
+    finally:
+        for path in temporary:
+            os.remove(path)
+    return stats
+
+
+def _write_merged(inputs, out, key, stats, tail=()):
+    """ Merges (path, check order) inputs, and the sorted (key, line) records in tail, into out. """
+    files = [open(path) for path, _ in inputs]
+    try:
+        streams = [_stream(f, path, key, stats, check) for f, (path, check) in zip(files, inputs)]
+        for _, line in heapq.merge(*streams, tail, key=_first):
+            out.write(line)
+            stats.records += 1
+        out.write(LOGOUT_RECORD + "\n")
+    finally:
+        for f in files:
+            f.close()
+
+
+def external_sort(paths, out, key="account", memory_limit=DEFAULT_MEMORY_LIMIT, fan_in=DEFAULT_FAN_IN,
+                  spill_dir=None):
+    """
+    Sorts the records of transaction files in any order into out (an open file),
+    buffering at most about memory_limit bytes of records. Returns MergeStats.
+    """
+    key = KEYS[key]
+    stats = MergeStats()
+    runs = []
+    buffer, used = [], 0
+    try:
+        for path in paths:
+            with open(path) as f:
+                for record in _records(f, key, stats):
+                    buffer.append(record)
+                    used += len(record[1]) + LINE_OVERHEAD
+                    if used >= memory_limit:
+                        buffer.sort(key=_first)
+                        run, run_file = _new_run(spill_dir, stats)
+                        runs.append(run)
+                        with run_file:
+                            run_file.writelines(line for _, line in buffer)
+                        buffer, used = [], 0
+        buffer.sort(key=_first)
+        # The buffer holds the newest records, so it goes last among equal keys.
+        inputs = [(run, False) for run in _reduce(list(runs), key, max(2, fan_in - 1), spill_dir, stats, runs)]
+        _write_merged(inputs, out, key, stats, buffer)
+    finally:
+        for run in runs:
+            os.remove(run)
+    return stats
+
+
+def _sources(args):
+    paths = []
+    for arg in args:
+        paths.extend(manifest_files(arg) if os.path.isdir(arg) else [arg])
+    return paths
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[1] not in ("merge", "sort"):
+        print("Usage: python3 etf_merge.py merge|sort <out.etf> <etf_file | log_dir> [...] "
+              "[--key=account|code] [--fan-in=N] [--memory-limit=BYTES]")
+        sys.exit(1)
+
+    command, out_path = sys.argv[1], sys.argv[2]
+    key_name, fan_in, memory_limit = "account", DEFAULT_FAN_IN, DEFAULT_MEMORY_LIMIT
+    sources = []
+    for arg in sys.argv[3:]:
+        if arg.startswith("--key="):
+            key_name = arg.split("=", 1)[1]
+        elif arg.startswith("--fan-in="):
+            fan_in = int(arg.split("=", 1)[1])
+        elif arg.startswith("--memory-limit="):
+            memory_limit = int(arg.split("=", 1)[1])
+        else:
+            sources.append(arg)
+    if key_name not in KEYS or fan_in < 2:
+        print("Error: --key must be account or code, and --fan-in at least 2.")
+        sys.exit(1)
+
+    paths = _sources(sources)
+    try:
+        with open(out_path, "w") as out:
+            if command == "merge":
+                stats = merge(paths, out, key_name, fan_in)
+            else:
+                stats = external_sort(paths, out, key_name, memory_limit, fan_in)
+    except ValueError as exc:
+        print(f"Error: {exc}")
+        sys.exit(1)
+    print(f"Wrote {stats.records} records from {len(paths)} files to {out_path}"
+          + (f" ({stats.runs} temporary runs)" if stats.runs else "")
+          + (f"; skipped {stats.skipped} lines that are not transaction records." if stats.skipped else "."))
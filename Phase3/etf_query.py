@@ -0,0 +1,213 @@
+"""
+Account History Queries
+
+Answers "what happened to account X" across every transaction file without
+grepping them. A secondary index (an SQLite database next to the logs) maps each
+account number to the file and byte offset of every record it appears in, along
+with the record's code, day and amount, so that:
+
+- transfers and bill payments are listed under both the paying account and the
+  receiving one (the target account or the biller's company account),
+
+- account history reads back exactly the matching lines by offset,
+- per-biller paybill totals and per-type counts are aggregated inside the index
+  without opening the transaction files at all.
+
+The index is kept current incrementally: update() only parses bytes appended to a
+file since it was last indexed, and picks up new files as they appear. A file
+that got shorter than its indexed size is dropped from the index and re-read.
+
+How to Run:
+    python3 etf_query.py update  <index.db> <log_dir | etf_file ...>
+    python3 etf_query.py history <index.db> <account> [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+    python3 etf_query.py billers <index.db> [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+    python3 etf_query.py types   <index.db> [--account NNNNN]
+
+A <log_dir> is a directory written by txn_writer.TransactionWriter; its manifest
+supplies the day of every file. Plain files given by path are indexed without a day.
+"""
+
+import os
+import sqlite3
+import sys
+
+from etf_records import TRANSACTION_CODES, parse_record
+from billers import registry
+from txn_writer import read_manifest
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    day TEXT,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    account TEXT NOT NULL,
+    file_id INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    code TEXT NOT NULL,
+    day TEXT,
+    amount REAL NOT NULL,
+    extra TEXT NOT NULL,
+    incoming INTEGER NOT NULL  -- 1 on the receiving side of a transfer/paybill
+);
+CREATE INDEX IF NOT EXISTS records_by_account ON records (account, day);
+CREATE INDEX IF NOT EXISTS records_by_code ON records (code, day);
+"""
+
+
+def _day_clause(day_from, day_to, params, column="day"):
+    clause = ""
+    if day_from is not None:
+        clause += f" AND {column} >= ?"
+        params.append(day_from)
+    if day_to is not None:
+        clause += f" AND {column} <= ?"
+        params.append(day_to)
+    return clause
+
+
+class HistoryIndex:
+    """
+    Account-to-record index over a set of transaction files.
+    """
+
+    def __init__(self, index_path):
+        """
+        :param index_path: SQLite file holding the index (created if missing).
+        """
+        self.index_path = index_path
+        self.db = sqlite3.connect(index_path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def update_file(self, path, day=None):
+        """ Indexes the complete lines appended to path since its last update. Returns records added. """
+        path = os.path.abspath(path)
+        size = os.path.getsize(path)
+        row = self.db.execute("SELECT id, size FROM files WHERE path = ?", (path,)).fetchone()
+        if row is not None and size < row[1]:
+            # Truncated or replaced: forget what was indexed and start over.
+            self.db.execute("DELETE FROM records WHERE file_id = ?", (row[0],))
+            self.db.execute("DELETE FROM files WHERE id = ?", (row[0],))
+            row = None
+        if row is None:
+            file_id = self.db.execute("INSERT INTO files (path, day, size) VALUES (?, ?, 0)",
+                                      (path, day)).lastrowid
+            start = 0
+        else:
+            file_id, start = row
+        if size == start:
+            return 0
+
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read(size - start)
+        end = data.rfind(b"\n") + 1  # leave a partially written last line for next time
+
+        rows = []
+        offset = start
+        for line in data[:end].splitlines(keepends=True):
+            record = parse_record(line.decode())
+            if record is not None and record.code != "00":
+                rows.append((record.account, file_id, offset, record.code, day, record.amount, record.extra, 0))
+                if record.code in ("02", "03") and record.extra.isdigit():
+                    rows.append((record.extra, file_id, offset, record.code, day, record.amount, record.extra, 1))
+            offset += len(line)
+        with self.db:
+            self.db.executemany("INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.db.execute("UPDATE files SET size = ? WHERE id = ?", (start + end, file_id))
+        return len(rows)
+
+    def update(self, sources):
+        """
+        Brings the index up to date with a log directory (every file in its manifest)
+        or an explicit list of transaction files. Returns the number of records added.
+        """
+        if isinstance(sources, str) and os.path.isdir(sources):
+            files = [(os.path.join(sources, e["file"]), e["day"]) for e in read_manifest(sources)]
+        else:
+            files = [(path, None) for path in ([sources] if isinstance(sources, str) else sources)]
+        return sum(self.update_file(path, day) for path, day in files if os.path.exists(path))
+
+    def history(self, account, day_from=None, day_to=None):
+        """ Yields (day, record line) for every record of account, in log order. """
+        params = [account]
+        clause = _day_clause(day_from, day_to, params, "records.day")
+        rows = self.db.execute(
+            "SELECT files.path, records.offset, records.day FROM records JOIN files ON files.id = records.file_id"
+            " WHERE account = ?" + clause +
+            " ORDER BY records.day, files.path, records.offset", params).fetchall()
+        handle, handle_path = None, None
+        try:
+            for path, offset, day in rows:
+                if path != handle_path:
+                    if handle is not None:
+                        handle.close()
+                    handle, handle_path = open(path, "rb"), path
+                handle.seek(offset)
+                yield day, handle.readline().decode().rstrip("\n")
+        finally:
+            if handle is not None:
+                handle.close()
+
+    def biller_totals(self, day_from=None, day_to=None):
+        """ Returns {biller code: (payments, total amount)} for paybill records. """
+        billers = registry().codes
+        params = []
+        clause = _day_clause(day_from, day_to, params)
+        totals = {}
+        for extra, count, amount in self.db.execute(
+                "SELECT extra, COUNT(*), SUM(amount) FROM records WHERE code = '03' AND incoming = 0" + clause +
+                " GROUP BY extra", params):
+            totals[billers.get(extra, extra)] = (count, round(amount, 2))
+        return totals
+
+    def type_counts(self, account=None):
+        """ Returns {transaction type: record count}, for the records touching one account or for all of them. """
+        if account is None:
+            rows = self.db.execute("SELECT code, COUNT(*) FROM records WHERE incoming = 0 GROUP BY code")
+        else:
+            rows = self.db.execute("SELECT code, COUNT(*) FROM records WHERE account = ? GROUP BY code",
+                                   (account,))
+        return {TRANSACTION_CODES.get(code, code): count for code, count in rows}
+
+
+def _option(args, name):
+    for arg in args:
+        if arg.startswith(name + "="):
+            return arg.split("=", 1)[1]
+    if name in args and args.index(name) + 1 < len(args):
+        return args[args.index(name) + 1]
+    return None
+
+
+if __name__ == "__main__":
+    commands = ("update", "history", "billers", "types")
+    if len(sys.argv) < 3 or sys.argv[1] not in commands or (sys.argv[1] in ("update", "history") and len(sys.argv) < 4):
+        print("Usage: python3 etf_query.py update|history|billers|types <index.db> ...")
+        sys.exit(1)
+
+    command, rest = sys.argv[1], sys.argv[3:]
+    with HistoryIndex(sys.argv[2]) as index:
+        if command == "update":
+            source = rest[0] if len(rest) == 1 and os.path.isdir(rest[0]) else rest
+            print(f"Indexed {index.update(source)} new records.")
+        elif command == "history":
+            for day, line in index.history(rest[0], _option(rest, "--from"), _option(rest, "--to")):
+                print(f"{day or '-'} {line}")
+        elif command == "billers":
+            for company, (count, amount) in sorted(index.biller_totals(_option(rest, "--from"), _option(rest, "--to")).items()):
+                print(f"  {company}: {count} payments, total ${amount:,.2f}")
+        else:
+            for name, count in sorted(index.type_counts(_option(rest, "--account")).items()):
+                print(f"  {name:<11} {count}")
@@ -0,0 +1,51 @@
+"""
+Transaction Record Parsing
+
+Splits the fixed-format lines written to .etf / daily transaction files back
+into their fields. Every transaction class formats its own line, so widths vary
+a little between codes (e.g. deposit pads the name to 24 characters and
+withdrawal has no trailing field); parse_record() accepts all of them:
+
+  CC_<name padded with _>_NNNNN_<amount>[_<extra>]
+
+where extra is the target account (transfer), company account (paybill),
+new plan (changeplan), "D_" (disable) or "_" padding. The name is at most 24
+characters (the widest padding any record uses) and cannot hold an account
+and amount, and nothing else may follow the amount, so two records run together on
+one line are not read as one.
+"""
+
+import re
+from collections import namedtuple
+
+TRANSACTION_CODES = {
+    "00": "logout",
+    "01": "withdrawal",
+    "02": "transfer",
+    "03": "paybill",
+    "04": "deposit",
+    "05": "create",
+    "06": "delete",
+    "07": "disable",
+    "08": "changeplan",
+}
+
+Record = namedtuple("Record", ["code", "name", "account", "amount", "extra"])
+
+_RECORD = re.compile(r"^(\d\d)_(.{0,24}?)_+(\d{5})_(\d+\.\d{2})(?:_(\d{5}|[SN]P|D)?_*)?$")
+# An account and amount inside the name: the end of a record the line runs on from.
+_ACCOUNT_AMOUNT = re.compile(r"_\d{5}_\d+\.\d{2}")
+
+
+def parse_record(line):
+    """
+    Parses one transaction line into a Record, or returns None if it is not one.
+    Name and extra come back with their "_" padding removed.
+    """
+    match = _RECORD.match(line.rstrip("\r\n"))
+    if not match:
+        return None
+    code, name, account, amount, extra = match.groups()
+    if "." in name and _ACCOUNT_AMOUNT.search(name):
+        return None
+    return Record(code, name.strip("_"), account, float(amount), (extra or "").strip("_"))
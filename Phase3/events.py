@@ -0,0 +1,180 @@
+"""
+Transaction Event Stream
+
+Structured, machine-readable record of every command a front end session runs,
+written next to the human-readable .out console text, so dashboards can count
+outcomes and errors without parsing English error messages.
+
+One event per command:
+  ts          wall-clock time the command finished (seconds since the epoch)
+  seq         position of the command in the session
+  command     the command word ("withdraw", "transfer", ...)
+  code        its transaction code ("01" ... "08", "00" for logout; null for login)
+  accounts    account numbers the command named
+  amount      the amount it named, if any
+  outcome     "ok", "rejected", "terminated" (the session was ended) or "ignored"
+  error       ErrorCode name of the first error the command reported, or null
+  latency_us  time spent on the command, in microseconds
+
+Events are buffered and written in batches, either as newline-delimited JSON or
+as fixed-size binary records (see BINARY); read_events() reads back both.
+
+The code of an event's error is the one the failing handler or rule gave it
+(errors.ErrorMessage); the wording of the message is never looked at.
+"""
+
+import json
+import struct
+import time
+from enum import IntEnum
+
+import errors
+
+EVENT_CODES = {
+    "logout": "00",
+    "withdraw": "01",
+    "transfer": "02",
+    "paybill": "03",
+    "deposit": "04",
+    "create": "05",
+    "delete": "06",
+    "disable": "07",
+    "changeplan": "08",
+    "login": None,
+}
+
+OUTCOMES = ("ok", "rejected", "terminated", "ignored")
+
+
+# The codes of errors.py, by name. Unknown numbers are OTHER.
+ErrorCode = IntEnum("ErrorCode", {name: value for name, value in vars(errors).items() if name.isupper()})
+
+
+def error_code(code):
+    """ The ErrorCode of an event's error code (an int from errors.py). """
+    try:
+        return ErrorCode(code)
+    except ValueError:
+        return ErrorCode.OTHER
+
+
+# A finished command, as banking_system hands it to the event sink and the metrics:
+# one tuple, built when the command ends (the command loop keeps the fields in local
+# variables while it runs, rather than filling in an object per command):
+#
+#   command            the command as read
+#   error              errors code of the first error the command wrote (or None)
+#   terminated         whether the command ended the session
+#   handler            transaction handler the command looked up (only noted with
+#                        metrics handler timing on, else None)
+#   latency            seconds the command took
+#   handler_seconds    seconds from looking the handler up to the end of the command
+#   records            transaction records logged by the command
+#   amount             the amount it acted on (or None)
+#   seq                its number in the session
+#   accounts           account numbers it acted on
+
+
+def outcome(command, error, terminated):
+    """ "ok", "rejected", "terminated" or "ignored", for a finished command. """
+    if terminated:
+        return "terminated"
+    if error is not None:
+        return "rejected"
+    if command not in EVENT_CODES:
+        return "ignored"
+    return "ok"
+
+
+# ts, seq, code, outcome, error, account 1, account 2, amount in cents (NO_AMOUNT = none), latency.
+# Login is stored as code "LI" and commands the front end does not know as "??".
+BINARY = struct.Struct("<dI2sBH5s5sqI")
+BINARY_MAGIC = b"EVT1"
+NO_AMOUNT = -(2 ** 63)
+
+
+class EventSink:
+    """
+    Buffers events and writes them in batches to an NDJSON or binary file.
+    """
+
+    def __init__(self, path, fmt="ndjson", batch_size=256):
+        """
+        :param path: Output file (appended to).
+        :param fmt: "ndjson" or "binary".
+        :param batch_size: Events held in memory before a write.
+        """
+        if fmt not in ("ndjson", "binary"):
+            raise ValueError(f"Unknown event format: {fmt}")
+        self.path = path
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self._pending = []
+        self._file = open(path, "ab")
+        if fmt == "binary" and self._file.tell() == 0:
+            self._file.write(BINARY_MAGIC)
+
+    def emit(self, event):
+        """
+        Queues a finished command (the tuple described above), stamped with the time.
+        """
+        command, error, terminated, _, latency, _, _, amount, seq, accounts = event
+        self._pending.append((time.time(), seq, command, accounts, amount, outcome(command, error, terminated),
+                              error_code(error) if error is not None else None, int(latency * 1_000_000)))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def _encode(self, item):
+        ts, seq, command, accounts, amount, outcome, error, latency_us = item
+        code = EVENT_CODES.get(command)
+        if self.fmt == "ndjson":
+            return (json.dumps({"ts": round(ts, 6), "seq": seq, "command": command, "code": code,
+                                "accounts": list(accounts), "amount": amount, "outcome": outcome,
+                                "error": error.name if error is not None else None,
+                                "latency_us": latency_us}, separators=(",", ":")) + "\n").encode()
+        first = accounts[0] if accounts else ""
+        second = accounts[1] if len(accounts) > 1 else ""
+        cents = int(round(amount * 100)) if amount is not None else NO_AMOUNT
+        if code is None:
+            code = "LI" if command == "login" else "??"
+        return BINARY.pack(ts, seq, code.encode(), OUTCOMES.index(outcome),
+                           int(error) if error is not None else 0,
+                           first.encode()[:5], second.encode()[:5], cents, latency_us)
+
+    def flush(self):
+        if self._pending:
+            self._file.write(b"".join(self._encode(item) for item in self._pending))
+            self._pending = []
+        self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_events(path):
+    """ Yields every event in an NDJSON or binary event file as a dict. """
+    commands = {code: command for command, code in EVENT_CODES.items() if code is not None}
+    with open(path, "rb") as f:
+        if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            f.seek(0)
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        while True:
+            chunk = f.read(BINARY.size)
+            if len(chunk) < BINARY.size:
+                return
+            ts, seq, code, outcome, error, first, second, cents, latency_us = BINARY.unpack(chunk)
+            code = code.decode()
+            command = commands.get(code) or ("login" if code == "LI" else None)
+            yield {"ts": ts, "seq": seq, "command": command, "code": code if code in commands else None, "accounts": [a.decode().strip("\0") for a in (first, second) if a.strip(b"\0")],
+                   "amount": cents / 100 if cents != NO_AMOUNT else None, "outcome": OUTCOMES[outcome],
+                   "error": error_code(error).name if error else None, "latency_us": latency_us}
@@ -0,0 +1,335 @@
+"""
+Load Generator and Soak Test
+
+Produces reproducible, production-like session scripts for the front end and
+drives banking_system with them for as long as required, reporting throughput,
+latency percentiles and memory growth at a fixed interval.
+
+Sessions are a seeded mix of standard and admin logins. Each contains a few
+commands (withdraw, transfer, paybill, and for admins also deposit, changeplan,
+disable, create and delete) in the same line-per-token format as the .inp test
+inputs. A configurable share of commands carries a realistic mistake: wrong
+account number, unknown target account, insufficient funds, over-limit amount,
+or an invalid biller code for paybill.
+
+How to Run:
+    python3 loadgen.py current_accounts_file.txt --duration 3600 --rate 50
+    python3 loadgen.py current_accounts_file.txt --dump 20 generated_inputs/
+    python3 loadgen.py current_accounts_file.txt --duration 600 --metrics-port 9464
+
+The same --seed always produces the same sessions in the same order.
+Sessions run in a temporary working directory, because create/delete append to
+daily_transaction_file.txt in the current directory.
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from main import banking_system, load_users
+from billers import registry
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+VALID_BILLERS = sorted(registry().accounts)
+INVALID_BILLERS = ["XX", "ZZ", "EE", "ec"]
+MISSING_ACCOUNT = "99999"
+
+
+class LoadGenerator:
+    """
+    Generates session scripts (lists of input lines) from a seeded random stream.
+    """
+
+    def __init__(self, users, seed=3060, error_rate=0.1, admin_share=0.2, max_commands=4):
+        """
+        :param users: Dict of User objects keyed by account number (from load_users).
+        :param seed: Seed for the random stream; equal seeds give identical sessions.
+        :param error_rate: Fraction of commands that carry a deliberate mistake.
+        :param admin_share: Fraction of sessions that log in as admin.
+        :param max_commands: Upper bound on commands per session (at least one).
+        """
+        self.rng = random.Random(seed)
+        self.error_rate = error_rate
+        self.admin_share = admin_share
+        self.max_commands = max(1, max_commands)
+
+        company_accounts = registry().codes
+        self.accounts = [u for acct, u in sorted(users.items()) if acct not in company_accounts]
+        self.active = [u for u in self.accounts if u.availability == "A"] or self.accounts
+
+    def session(self):
+        """ Returns the next session script as a list of input lines. """
+        if self.rng.random() < self.admin_share:
+            lines = ["login", "admin"]
+            commands = [self._admin_command for _ in range(self._count())]
+            # Delete only ever ends a session, since later commands could target the account.
+            if self.rng.random() < 0.05:
+                commands.append(self._delete)
+            for make in commands:
+                lines += make()
+        else:
+            user = self.rng.choice(self.active)
+            lines = ["login", "standard", user.user_name]
+            for _ in range(self._count()):
+                lines += self._standard_command(user)
+        lines.append("logout")
+        return lines
+
+    def _count(self):
+        return self.rng.randint(1, self.max_commands)
+
+    def _error(self):
+        return self.rng.random() < self.error_rate
+
+    def _amount(self, low=1, high=500):
+        return str(self.rng.randint(low, high))
+
+    def _other(self, user):
+        others = [u for u in self.active if u is not user] or self.active
+        return self.rng.choice(others)
+
+    # -- standard session commands -----------------------------------------
+
+    def _standard_command(self, user):
+        kind = self.rng.choices(["withdraw", "transfer", "paybill"], weights=[4, 3, 3])[0]
+        error = self._error()
+
+        if kind == "withdraw":
+            if error and self.rng.random() < 0.5:
+                return ["withdraw", MISSING_ACCOUNT, self._amount()]
+            amount = self._amount(int(user.balance) + 1, int(user.balance) + 500) if error else self._amount()
+            return ["withdraw", user.account_number, amount]
+
+        if kind == "transfer":
+            target = self._other(user).account_number
+            sender = user.account_number
+            amount = self._amount()
+            if error:
+                mistake = self.rng.randrange(3)
+                if mistake == 0:
+                    target = MISSING_ACCOUNT
+                elif mistake == 1:
+                    sender = self._other(user).account_number
+                else:
+                    amount = self._amount(1001, 5000)
+            return ["transfer", sender, target, amount]
+
+        biller = self.rng.choice(VALID_BILLERS)
+        amount = self._amount()
+        if error:
+            if self.rng.random() < 0.6:
+                biller = self.rng.choice(INVALID_BILLERS)
+            else:
+                amount = self._amount(2001, 9000)
+        return ["paybill", user.account_number, biller, amount]
+
+    # -- admin session commands --------------------------------------------
+
+    def _admin_command(self):
+        kind = self.rng.choices(
+            ["withdraw", "transfer", "paybill", "deposit", "changeplan", "disable", "create"],
+            weights=[3, 3, 3, 3, 1, 1, 1])[0]
+        return getattr(self, "_admin_" + kind)()
+
+    def _admin_withdraw(self):
+        user = self.rng.choice(self.accounts)
+        acct = user.account_number
+        amount = self._amount()
+        if self._error():
+            if self.rng.random() < 0.5:
+                acct = self._other(user).account_number
+            else:
+                amount = self._amount(int(user.balance) + 1, int(user.balance) + 500)
+        return ["withdraw", user.user_name, acct, amount]
+
+    def _admin_transfer(self):
+        user = self.rng.choice(self.accounts)
+        target = self._other(user).account_number
+        amount = self._amount()
+        if self._error():
+            if self.rng.random() < 0.5:
+                target = MISSING_ACCOUNT
+            else:
+                amount = self._amount(int(user.balance) + 1, int(user.balance) + 500)
+        return ["transfer", user.account_number, target, amount]
+
+    def _admin_paybill(self):
+        user = self.rng.choice(self.accounts)
+        biller = self.rng.choice(INVALID_BILLERS if self._error() else VALID_BILLERS)
+        return ["paybill", user.account_number, biller, self._amount()]
+
+    def _admin_deposit(self):
+        user = self.rng.choice(self.accounts)
+        name = user.user_name
+        if self._error():
+            name = self._other(user).user_name
+        return ["deposit", name, user.account_number, self._amount()]
+
+    def _admin_changeplan(self):
+        user = self.rng.choice(self.accounts)
+        lines = ["changeplan", user.user_name, user.account_number]
+        if self.rng.random() < 0.5:
+            lines.append(self.rng.choice(["SP", "NP"]))
+        return lines
+
+    def _admin_disable(self):
+        user = self.rng.choice(self.accounts)
+        acct = self._other(user).account_number if self._error() else user.account_number
+        return ["disable", user.user_name, acct]
+
+    def _admin_create(self):
+        name = f"Load_Holder_{self.rng.randint(1, 99999)}"
+        return ["create", name, self._amount(0, 5000)]
+
+    def _delete(self):
+        user = self.rng.choice(self.accounts)
+        return ["delete", user.user_name, user.account_number]
+
+
+def percentile(sorted_values, pct):
+    """ Nearest-rank percentile of an already sorted list. """
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def current_rss_kb():
+    """ Resident set size of this process in KB (peak RSS where current is unavailable). """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return 0
+
+
+def soak(accounts_file, duration, rate, seed, error_rate, admin_share, interval, report_path=None,
+         metrics=None):
+    """
+    Runs generated sessions through banking_system for duration seconds at up to
+    rate sessions per second (0 = as fast as possible), printing one report line
+    per interval. Returns the number of sessions that raised an exception.
+
+    :param metrics: Optional metrics.SessionMetrics every session records into.
+    """
+    accounts_file = os.path.abspath(accounts_file)
+    generator = LoadGenerator(load_users(accounts_file), seed, error_rate, admin_share)
+    workdir = tempfile.mkdtemp(prefix="soak_")
+    old_cwd = os.getcwd()
+    # Opened before the chdir, so a relative path lands where the caller is, not in workdir.
+    report = open(report_path, "w") if report_path else None
+    os.chdir(workdir)
+
+    if report:
+        report.write("elapsed_s,sessions,sessions_per_s,p50_ms,p95_ms,p99_ms,max_ms,rss_kb,traced_kb,failures\n")
+
+    tracemalloc.start()
+    inp, out, etf = (os.path.join(workdir, name) for name in ("session.inp", "session.out", "session.etf"))
+    start = time.perf_counter()
+    next_report = start + interval
+    next_session = start
+    total = failures = 0
+    window = []
+    base_rss = current_rss_kb()
+    devnull = open(os.devnull, "w")
+    try:
+        while time.perf_counter() - start < duration:
+            if rate > 0:
+                delay = next_session - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                next_session += 1.0 / rate
+
+            with open(inp, "w") as f:
+                f.write("\n".join(generator.session()) + "\n")
+
+            t0 = time.perf_counter()
+            try:
+                # Withdrawal still prints to stdout; keep that out of the report.
+                with contextlib.redirect_stdout(devnull):
+                    banking_system(accounts_file, inp, out, etf, metrics=metrics)
+            except Exception as exc:
+                failures += 1
+                shutil.copy(inp, os.path.join(old_cwd, f"soak_failure_{failures:03d}.inp"))
+                print(f"Session raised {type(exc).__name__}: {exc} (script saved)", file=sys.stderr)
+            window.append(time.perf_counter() - t0)
+            total += 1
+
+            now = time.perf_counter()
+            if now >= next_report:
+                window.sort()
+                traced_kb = tracemalloc.get_traced_memory()[0] // 1024
+                rss_kb = current_rss_kb()
+                row = (now - start, total, len(window) / interval,
+                       percentile(window, 50) * 1000, percentile(window, 95) * 1000,
+                       percentile(window, 99) * 1000, window[-1] * 1000, rss_kb, traced_kb, failures)
+                print(f"[{row[0]:8.1f}s] sessions={total:<8} {row[2]:8.1f}/s  "
+                      f"p50={row[3]:.2f}ms p95={row[4]:.2f}ms p99={row[5]:.2f}ms max={row[6]:.2f}ms  "
+                      f"rss={rss_kb}KB (+{rss_kb - base_rss}KB) traced={traced_kb}KB failures={failures}")
+                if report:
+                    report.write(",".join(f"{v:.3f}" if isinstance(v, float) else str(v) for v in row) + "\n")
+                    report.flush()
+                window = []
+                next_report += interval
+    finally:
+        devnull.close()
+        tracemalloc.stop()
+        os.chdir(old_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+        if report:
+            report.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Total: {total} sessions in {elapsed:.1f}s ({total / elapsed:.1f}/s), "
+          f"{failures} failures, RSS growth {current_rss_kb() - base_rss}KB")
+    return failures
+
+
+def dump_sessions(accounts_file, count, directory, seed, error_rate, admin_share):
+    """ Writes count generated sessions as numbered .inp files for replay or inspection. """
+    generator = LoadGenerator(load_users(accounts_file), seed, error_rate, admin_share)
+    os.makedirs(directory, exist_ok=True)
+    for n in range(1, count + 1):
+        with open(os.path.join(directory, f"load_{n:05d}.inp"), "w") as f:
+            f.write("\n".join(generator.session()) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deterministic load generator and soak test for the front end.")
+    parser.add_argument("accounts_file")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds to run (default 60)")
+    parser.add_argument("--rate", type=float, default=0.0, help="target sessions per second (0 = unthrottled)")
+    parser.add_argument("--seed", type=int, default=3060)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--admin-share", type=float, default=0.2)
+    parser.add_argument("--interval", type=float, default=10.0, help="seconds between report lines")
+    parser.add_argument("--report", help="also write report lines to this CSV file")
+    parser.add_argument("--dump", nargs=2, metavar=("COUNT", "DIR"), help="write COUNT sessions as .inp files and exit")
+    parser.add_argument("--metrics-port", type=int, help="serve live metrics on http://127.0.0.1:PORT/metrics")
+    args = parser.parse_args()
+
+    if args.dump:
+        dump_sessions(args.accounts_file, int(args.dump[0]), args.dump[1], args.seed, args.error_rate, args.admin_share)
+        sys.exit(0)
+
+    session_metrics = None
+    if args.metrics_port is not None:
+        from metrics import SessionMetrics, serve
+        session_metrics = SessionMetrics()
+        serve(session_metrics.registry, args.metrics_port)
+
+    sys.exit(1 if soak(args.accounts_file, args.duration, args.rate, args.seed, args.error_rate,
+                       args.admin_share, args.interval, args.report, session_metrics) else 0)
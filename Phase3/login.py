@@ -1,6 +1,6 @@
 # Test Login
 
-from check import Check
+from check import CHECK
 
 
 class Login:
@@ -17,7 +17,7 @@ class Login:
         self.userType = userType  # 'admin' or 'standard'
         self.user = user  # User object with account details
         self.logged_in = logged_in
-        self.check = Check()
+        self.check = CHECK
 
     def check_user_type(self):
         """
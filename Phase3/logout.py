@@ -1,4 +1,6 @@
-from check import Check
+import errors
+from check import CHECK
+from errors import ErrorMessage
 
 class Logout:
     """
@@ -27,7 +29,7 @@ class Logout:
         self.logged_in = logged_in
         self.session_type = session_type
         self.current_user = current_user
-        self.check = Check()
+        self.check = CHECK
         self.processed = False
         self.write_console = write_console if write_console is not None else print
 
@@ -41,11 +43,11 @@ class Logout:
         Returns True if logout is successful, False otherwise.
         """
         if not self.logged_in:
-            self.write_console("Error: You are not logged in.")
+            self.write_console(ErrorMessage(errors.NOT_LOGGED_IN, "Error: You are not logged in."))
             return False
 
         if self.processed:
-            self.write_console("Error: Logout has already been performed for this session.")
+            self.write_console(ErrorMessage(errors.NOT_LOGGED_IN, "Error: Logout has already been performed for this session."))
             return False
 
         
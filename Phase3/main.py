@@ -13,6 +13,11 @@ Input Sources:
 
 Output File:
 - daily_transaction_file.txt: Stores a record of all transactions performed during a session.
+- With --log-dir, every transaction record is instead written to per-day (and optionally
+  per-terminal) log files with size-based rotation and a manifest; see txn_writer.py.
+  --log-index also keeps an integrity index beside each of them; see etf_index.py.
+- With --txn-ids, every transaction record also gets an ID (terminal, session, sequence),
+  written to a .ids side file next to each file the record goes to; see txn_ids.py.
 
 How to Run:
 1. Execute main.py to start the application.
@@ -33,22 +38,42 @@ How to Run:
 TODO:
 - Enhance error handling for edge cases.
 - Implement file-based user accounts instead of hardcoding.
-- Break transactions day by day into separate logs.
 """
 
+import gc
+import importlib
 import sys
+import time
 
-from transfer import Transfer
-from paybill import Paybill
+import errors
 from check import Check
-from deposit import Deposit
-from create import Create
-from delete import Delete
-from changeplan import ChangePlan
-from disable import Disable
-from login import Login
-from withdrawal import Withdrawal
-from logout import Logout
+from errors import ErrorMessage
+from pipeline import FileEmitter, tokenize
+from session import LOGOUT_RECORD, Session
+
+# Transaction handler class -> module that defines it. Handlers are imported the
+# first time a session uses them (see handler()), so a script with only a login
+# and a withdrawal never pays for importing the other eight modules.
+HANDLER_MODULES = {
+    "Transfer": "transfer",
+    "Paybill": "paybill",
+    "Deposit": "deposit",
+    "Create": "create",
+    "Delete": "delete",
+    "ChangePlan": "changeplan",
+    "Disable": "disable",
+    "Login": "login",
+    "Withdrawal": "withdrawal",
+    "Logout": "logout",
+}
+_handlers = {}
+
+def handler(name):
+    """ Returns the transaction handler class called name, importing its module on first use. """
+    cls = _handlers.get(name)
+    if cls is None:
+        cls = _handlers[name] = getattr(importlib.import_module(HANDLER_MODULES[name]), name)
+    return cls
 
 class User:
     def __init__(self, account_number, user_name, availability, balance):
@@ -95,106 +120,240 @@ def parse_account_line(line):
 
     return (account_number, user_name, availability, balance_str)
 
+# Availability flags repeat on every record, so map the raw byte straight to
+# one shared str object instead of decoding a new one-character string per line.
+_AVAILABILITY_FLAGS = {b"A": "A", b"D": "D"}
+
 def load_users(accounts_filename):
+    """
+    Loads the current accounts file into a dict of User objects keyed by account number.
+
+    The file is read once into a bytes buffer and each record is sliced as bytes, so
+    only the fields we keep are decoded. Same record layout and skipping rules as
+    parse_account_line().
+    """
+    with open(accounts_filename, "rb") as f:
+        buf = f.read()
+
     users_dict = {}
-    with open(accounts_filename, "r") as f:
-        for line in f:
-            if not line.strip():
-                continue
-            fields = parse_account_line(line)
-            if not fields:
-                # might be the END_OF_FILE or invalid line
+    # Every User built here lives for the whole session; pausing the cyclic GC
+    # stops it from repeatedly walking the growing dict during the bulk load.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for line in buf.splitlines():
+            # Too short (includes blank lines) or the END_OF_FILE sentinel
+            if len(line) < 38 or line.startswith(b"END_OF_FILE"):
                 continue
-            acct_num, uname, avail, bal = fields
-            new_user = User(acct_num, uname, avail, bal)
-            users_dict[acct_num] = new_user
+            acct_num = line[0:5].decode()
+            flag = line[29:30]
+            avail = _AVAILABILITY_FLAGS.get(flag) or flag.decode()
+            users_dict[acct_num] = User(acct_num, line[6:27].rstrip(b"_").decode(), avail, float(line[31:38]))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
     return users_dict
 
-def banking_system(accounts_file, commands_file, console_out_file, etf_file_path):
+def banking_system(accounts_file, commands_file, console_out_file, etf_file_path, store=None, users=None,
+                   transaction_writer=None, session=None, event_sink=None, metrics=None, screening=None,
+                   emitter=None):
+    """
+    Runs one front end session script: tokenize, dispatch, emit (see pipeline.py).
+
+    :param store: Optional ShardedAccountStore or SharedAccountTable. When given, balances
+                  are read from the store before each money command and every accepted
+                  balance change is committed back through it (cross-shard changes use
+                  the sharded store's two-phase protocol).
+    :param users: Optional preloaded accounts mapping (e.g. SharedAccountTable.users());
+                  accounts_file is only read when this is None.
+    :param transaction_writer: Optional TransactionWriter. When given, every transaction
+                  record also goes to the per-day logs, and Create/Delete no longer append
+                  to daily_transaction_file.txt themselves.
+    :param session: Optional Session to continue (e.g. one resumed with Session.from_dict());
+                  a new one is started when this is None.
+    :param event_sink: Optional events.EventSink. When given, one structured event per
+                  command (accounts, amount, outcome, error code, latency) is sent to it.
+    :param metrics: Optional metrics.SessionMetrics that counts and times every command and
+                  every transaction handler call.
+    :param screening: Optional screening.ScreeningStage. Withdrawals, transfers and paybills
+                  are screened against its velocity rules before they are applied, and
+                  counted in its windows once they are.
+    :param emitter: Optional output stage (e.g. a pipeline.ThreadedEmitter) that receives the
+                  console lines and transaction records; it is drained at every logout
+                  and closed when the script ends. By default they are written to
+                  console_out_file and etf_file_path (and to transaction_writer); a custom
+                  emitter does its own writing.
+    :return: The Session, in whatever state the script left it.
+    """
     
     # load users
-    USERS = load_users(accounts_file)
-
-    # open the .out (output) and .etf (transactions) files
-    out_file = open(console_out_file, "w")
-    etf_file = open(etf_file_path, "w")
+    USERS = users if users is not None else load_users(accounts_file)
+    if session is None:
+        session = Session(USERS, store)
+
+    # emit stage: the .out (output) and .etf (transactions) files
+    if emitter is None:
+        emitter = FileEmitter(console_out_file, etf_file_path, transaction_writer)
+    emit_console, emit_record = emitter.console, emitter.record
+
+    # Event of the command being run (only tracked for an event sink or metrics), kept in
+    # plain variables and handed on as one tuple when it ends; see events.py for the fields.
+    seq = 0
+    ev_command = ev_start = ev_amount = ev_error = ev_handler = ev_handler_start = None
+    ev_accounts, ev_records, ev_terminated = (), 0, False
+    track = event_sink is not None or metrics is not None
+    get_handler = handler
+    if metrics is not None:
+        metrics.start_session(session)
+        if metrics.handler_timing:
+            def get_handler(name):
+                """ Looks up a handler, noting it and the time on the event for metrics.record(). """
+                nonlocal ev_handler, ev_handler_start
+                ev_handler = name
+                ev_handler_start = time.perf_counter()
+                return _handlers.get(name) or handler(name)
+
+    # Ends an event: finish_event(event tuple). With one consumer it is that consumer's own
+    # method, so finishing a command's event costs a single call.
+    if event_sink is not None and metrics is not None:
+        def finish_event(event):
+            event_sink.emit(event)
+            metrics.record(event)
+    else:
+        finish_event = event_sink.emit if event_sink is not None else metrics.record if metrics is not None else None
 
     def write_console(msg):
         """
         Replaces all print statements in your code so that
         messages go to the .out file.
         """
-        out_file.write(msg + "\n")
+        nonlocal ev_error
+        emit_console(msg)
+        # "Error:" <= msg < "Error;" is msg.startswith("Error:") without the method call.
+        if track and "Error:" <= msg < "Error;" and ev_error is None:
+            # The failure point wrote an ErrorMessage with its code; bare error text is OTHER.
+            ev_error = getattr(msg, "code", errors.OTHER)
 
     def log_transaction(txn_str):
         """
         Write transaction lines to the .etf file.
         """
-        etf_file.write(txn_str + "\n")
+        nonlocal ev_records
+        emit_record(txn_str)
+        ev_records += 1
+
+    def screened(kind, account, amount):
+        """ False (with the error written) if the screening stage holds the transaction back. """
+        if screening is None:
+            return True
+        rule = screening.screen(kind, account, amount)
+        if rule is None:
+            return True
+        write_console(ErrorMessage(errors.SCREENED, f"Error: Transaction held for review ({rule.name})."))
+        return False
+
+    def note_event(*accounts, amount=None):
+        """ Records the accounts and amount a command named on its event. """
+        nonlocal ev_accounts, ev_amount
+        ev_accounts = accounts
+        ev_amount = amount
+
+    # Create/Delete keep appending to the single daily file unless records are
+    # routed through the per-day writer above.
+    daily_file = "daily_transaction_file.txt" if transaction_writer is None else None
     
-    # read commands from the commands_file
-    with open(commands_file, "r") as cf:
-        commands = [line.strip() for line in cf if line.strip()]
+    # tokenize stage: read commands from the commands_file
+    commands = tokenize(commands_file)
         
-    logged_in = False
-    current_user = None
-    session_type = None
     check = Check()
     
     def errorEnd():
+        nonlocal ev_terminated
         write_console("Session terminated.")
-        log_transaction("00_________________________00000_00000.00__")
-        logged_in = False
-        current_user = None
-        session_type = None
+        log_transaction(LOGOUT_RECORD)
+        session.end()
+        emitter.drain()
+        ev_terminated = True
+
+    # Balances come from the account store (if any) through the session, which
+    # only reads each account once per session.
+    store_refresh = session.refresh
+
+    # Money handlers write their console lines here rather than straight out, so a
+    # success message only shows once the store has taken the change.
+    held = []
+
+    def store_commit(before, accepted=True):
+        """
+        Sends the balance changes made since store_refresh() to the account store, if
+        the handler accepted the command, then writes out the held console lines.
+        If the store refuses the changes, local balances are rolled back, the held
+        lines are dropped for the store's error, and False is returned.
+        """
+        if accepted and not session.commit(before):
+            held.clear()
+            write_console(ErrorMessage(errors.CONCURRENT_UPDATE, "Error: Account balance changed by another session. Please re-try."))
+            return False
+        for msg in held:
+            write_console(msg)
+        held.clear()
+        return accepted
     
     
     i = 0
     while i < len(commands):
         command = commands[i].lower()
         i += 1
+        if track:
+            # One clock read ends the last command's event and starts this one's.
+            now = time.perf_counter()
+            if seq:
+                finish_event((ev_command, ev_error, ev_terminated, ev_handler, now - ev_start,
+                              ev_handler and now - ev_handler_start, ev_records, ev_amount, seq, ev_accounts))
+            seq += 1
+            ev_command = command
+            ev_start = now
+            ev_accounts = ()
+            ev_amount = ev_error = ev_handler = None
+            ev_records = 0
+            ev_terminated = False
         
         if command == "login":
-            if logged_in:
+            if session.logged_in:
                 write_console("You have already Login")
                 break
             write_console("Welcome to the banking system.")
             if i >= len(commands):
-                write_console("Error: Missing session type.")
+                write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Missing session type."))
                 break
-            session_type = commands[i].lower()
-            write_console(f"Enter session type: {session_type}")
+            session.session_type = commands[i].lower()
+            write_console(f"Enter session type: {session.session_type}")
             i += 1
 
-            if session_type == "admin":
-                login_instance = Login(session_type, None, logged_in)
+            if session.session_type == "admin":
+                login_instance = get_handler("Login")(session.session_type, None, session.logged_in)
                 login_instance.process_login()
-                logged_in = True
-                current_user = None
+                session.login(session.session_type)
                 # write_console("Login_Success")
             else:
                 # standard user
                 if i >= len(commands):
-                    write_console("Error: Missing account holder name.")
+                    write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Missing account holder name."))
                     break
                 entered_name = commands[i]
                 i += 1
 
                 # find a user with that name
-                found_user = None
-                for u in USERS.values():
-                    if u.user_name.lower() == entered_name.lower():
-                        found_user = u
-                        write_console(f"Enter account holder name: {entered_name}")
-                        break
+                found_user = session.find_by_name(entered_name)
                 if found_user:
-                    login_instance = Login(session_type, found_user, logged_in)
+                    note_event(found_user.account_number)
+                    write_console(f"Enter account holder name: {entered_name}")
+                    login_instance = get_handler("Login")(session.session_type, found_user, session.logged_in)
                     login_instance.process_login()
-                    logged_in = True
-                    current_user = found_user
+                    session.login(session.session_type, found_user)
                     # write_console("Login_Success")
                 else:
-                    write_console("Error: Invalid account holder name.")
+                    write_console(ErrorMessage(errors.ACCOUNT_NOT_FOUND, "Error: Invalid account holder name."))
 
         # elif command == "withdraw":
         #     # Default log string used for any error case.
@@ -276,41 +435,37 @@ def banking_system(accounts_file, commands_file, console_out_file, etf_file_path
             # Default log string used for any error case.
             default_log = "00_________________________00000_00000.00__"
             
-            if not logged_in:
-                write_console("Error: You must be logged in to withdraw.")
+            if not session.logged_in:
+                write_console(ErrorMessage(errors.NOT_LOGGED_IN, "Error: You must be logged in to withdraw."))
                 log_transaction(default_log)
                 continue
 
             # Branch based on session type
-            if session_type == "admin":
+            if session.session_type == "admin":
                 # For admin, read account holder name and then account number.
                 if i >= len(commands):
-                    write_console("Error: Missing account holder name for withdrawal.")
+                    write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Missing account holder name for withdrawal."))
                     log_transaction(default_log)
                     break
                 entered_name = commands[i]
                 write_console(f"Enter account holder name: {entered_name}")
                 i += 1
 
-                found_user = None
-                for u in USERS.values():
-                    if u.user_name.lower() == entered_name.lower():
-                        found_user = u
-                        break
+                found_user = session.find_by_name(entered_name)
                 if not found_user:
-                    write_console("Error: Invalid account holder name")
+                    write_console(ErrorMessage(errors.ACCOUNT_NOT_FOUND, "Error: Invalid account holder name"))
                     log_transaction(default_log)
                     continue
 
                 if i >= len(commands):
-                    write_console("Error: Missing account number for withdrawal.")
+                    write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Missing account number for withdrawal."))
                     log_transaction(default_log)
                     break
                 provided_account = commands[i]
                 i += 1
                 write_console(f"Enter account name: {found_user.account_number}")
                 if provided_account != found_user.account_number:
-                    write_console("Error: Invalid account number")
+                    write_console(ErrorMessage(errors.ACCOUNT_MISMATCH, "Error: Invalid account number"))
                     log_transaction(default_log)
                     continue
 
@@ -318,28 +473,28 @@ def banking_system(accounts_file, commands_file, console_out_file, etf_file_path
 
             else:  # standard session
                 # current_user is already set via login; just verify the account number.
-                if current_user is None:
-                    write_console("Error: No user logged in.")
+                if session.current_user is None:
+                    write_console(ErrorMessage(errors.NOT_LOGGED_IN, "Error: No user logged in."))
                     log_transaction(default_log)
                     continue
 
                 if i >= len(commands):
-                    write_console("Error: Missing account number for withdrawal.")
+                    write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Missing account number for withdrawal."))
                     log_transaction(default_log)
                     break
                 provided_account = commands[i]
                 i += 1
-                write_console(f"Enter account name: {current_user.account_number}")
-                if provided_account != current_user.account_number:
-                    write_console("Error: Wrong account number")
+                write_console(f"Enter account name: {session.current_user.account_number}")
+                if provided_account != session.current_user.account_number:
+                    write_console(ErrorMessage(errors.ACCOUNT_MISMATCH, "Error: Wrong account number"))
                     log_transaction(default_log)
                     continue
 
-                user_for_withdraw = current_user
+                user_for_withdraw = session.current_user
 
             # Read the withdrawal amount
             if i >= len(commands):
-                write_console("Error: Missing withdrawal amount.")
+                write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Missing withdrawal amount."))
                 log_transaction(default_log)
                 break
             amount_str = commands[i]
@@ -348,22 +503,32 @@ def banking_system(accounts_file, commands_file, console_out_file, etf_file_path
             try:
                 amount = float(amount_str)
             except ValueError:
-                write_console("Error: Invalid withdrawal amount.")
+                write_console(ErrorMessage(errors.NOT_NUMERIC, "Error: Invalid withdrawal amount."))
+                log_transaction(default_log)
+                continue
+
+            note_event(user_for_withdraw.account_number, amount=amount)
+            if not screened("withdraw", user_for_withdraw.account_number, amount):
                 log_transaction(default_log)
                 continue
+            before = store_refresh(user_for_withdraw)
 
             # Check if withdrawal amount exceeds current balance.
             if amount > user_for_withdraw.balance:
-                write_console("Error: Account balance less than 0")
+                write_console(ErrorMessage(errors.INSUFFICIENT_FUNDS, "Error: Account balance less than 0"))
                 log_transaction(default_log)
                 continue
             else:
-                write_console("Withdrawal success")
+                held.append("Withdrawal success")
                 # Process the withdrawal and log the transaction output.
-                withdrawal_instance = Withdrawal(user_for_withdraw, amount)
+                withdrawal_instance = get_handler("Withdrawal")(user_for_withdraw, amount)
                 withdrawal_instance.process_withdrawal()
-                withdrawal_output = withdrawal_instance.return_transaction_output()
-                log_transaction(withdrawal_output)
+                if store_commit(before):
+                    session.add_total("withdrawal", amount)
+                    if screening is not None:
+                        screening.record("withdraw", user_for_withdraw.account_number, amount)
+                    withdrawal_output = withdrawal_instance.return_transaction_output()
+                    log_transaction(withdrawal_output)
 
 
 
@@ -371,18 +536,18 @@ def banking_system(accounts_file, commands_file, console_out_file, etf_file_path
         
         elif command == "transfer":
             
-            if not logged_in:
-                write_console("Error: You must be logged in first.")
+            if not session.logged_in:
+                write_console(ErrorMessage(errors.NOT_LOGGED_IN, "Error: You must be logged in first."))
                 continue
             
             # Sanity Check
-            if session_type == "admin":
+            if session.session_type == "admin":
                 if 7 > len(commands):
-                    write_console("Error: Missing required fields for transfer. Please provide both source and destination account numbers and the amount.")
+                    write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Missing required fields for transfer. Please provide both source and destination account numbers and the amount."))
                     errorEnd()
                     break  
             elif 8 > len(commands):
-                write_console("Error: Missing required fields for transfer. Please provide both source and destination account numbers and the amount.")
+                write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Missing required fields for transfer. Please provide both source and destination account numbers and the amount."))
                 errorEnd()
                 break
             sender_account = commands[i]
@@ -392,41 +557,46 @@ def banking_system(accounts_file, commands_file, console_out_file, etf_file_path
             if check.invalid_character_check(commands[i]):
                 amount = float(commands[i])
             else:
-                write_console("Error: Invalid transfer amount. Amount must be numeric.")
+                write_console(ErrorMessage(errors.NOT_NUMERIC, "Error: Invalid transfer amount. Amount must be numeric."))
                 errorEnd()
                 break
             i += 1
+            note_event(sender_account, receiver_account, amount=amount)
             
-            if session_type == "admin" or (current_user and check.sender_account_match(current_user, sender_account)):
-                if receiver_account in USERS:
-                    transfer = Transfer(session_type, USERS[sender_account], USERS[receiver_account], amount, write_console=write_console)
+            if session.session_type == "admin" or (session.current_user and check.sender_account_match(session.current_user, sender_account)):
+                if not session.has_account(receiver_account):
+                    write_console(ErrorMessage(errors.ACCOUNT_NOT_FOUND, "Error: Target account does not exist."))
+                elif screened("transfer", sender_account, amount):
+                    sender, receiver = session.account(sender_account), session.account(receiver_account)
+                    before = store_refresh(sender, receiver)
+                    transfer = get_handler("Transfer")(session.session_type, sender, receiver, amount, write_console=held.append)
                     # Write transaction output to log file
                     # transaction_output = transfer.return_transaction_output()
                     # log_transaction(transaction_output)
                     # Then log the .etf lines:
-                    if 0!=transfer.process_transfer():
+                    if store_commit(before, 0 != transfer.process_transfer()):
+                        session.add_total("transfer", amount)
+                        if screening is not None:
+                            screening.record("transfer", sender_account, amount)
                         txn_out = transfer.return_transaction_output()
                         for line in txn_out.splitlines():
                             log_transaction(line)
-           
-                else:
-                    write_console("Error: Target account does not exist.")
             else:
-                write_console("Error: Unauthorized transfer. You can only transfer from accounts you own.")
+                write_console(ErrorMessage(errors.UNAUTHORIZED, "Error: Unauthorized transfer. You can only transfer from accounts you own."))
         
         elif command == "paybill":
 
-            if not logged_in:
-                write_console("Error: You must be logged in first.")
+            if not session.logged_in:
+                write_console(ErrorMessage(errors.NOT_LOGGED_IN, "Error: You must be logged in first."))
                 continue
             # Sanity Check
-            if session_type == "admin":
+            if session.session_type == "admin":
                 if 7 > len(commands):
-                    write_console("Error: The paybill argument is missing, so the process will be rejected. Please re-try.")
+                    write_console(ErrorMessage(errors.MISSING_INPUT, "Error: The paybill argument is missing, so the process will be rejected. Please re-try."))
                     errorEnd()
                     break  
             elif 8 > len(commands):
-                write_console("Error: The paybill argument is missing, so the process will be rejected. Please re-try.")
+                write_console(ErrorMessage(errors.MISSING_INPUT, "Error: The paybill argument is missing, so the process will be rejected. Please re-try."))
                 errorEnd()
                 break
             # sender acct, company code, amount
@@ -437,14 +607,22 @@ def banking_system(accounts_file, commands_file, console_out_file, etf_file_path
             if check.invalid_character_check(commands[i]):
                 amount = float(commands[i])
             else:
-                write_console("Error: Invalid payment amount. Amount must be numeric.")
+                write_console(ErrorMessage(errors.NOT_NUMERIC, "Error: Invalid payment amount. Amount must be numeric."))
                 errorEnd()
                 break
             i += 1
+            note_event(sender_account, amount=amount)
             
-            if session_type == "admin" or (current_user and check.sender_account_match(current_user, sender_account)):
-                paybill = Paybill(session_type, USERS[sender_account], company, amount, write_console=write_console)
-                if 0!= paybill.process_paybill():
+            if session.session_type == "admin" or (session.current_user and check.sender_account_match(session.current_user, sender_account)):
+                if not screened("paybill", sender_account, amount):
+                    continue
+                payer = session.account(sender_account)
+                before = store_refresh(payer)
+                paybill = get_handler("Paybill")(session.session_type, payer, company, amount, write_console=held.append)
+                if store_commit(before, 0 != paybill.process_paybill()):
+                    session.add_total("paybill", amount)
+                    if screening is not None:
+                        screening.record("paybill", sender_account, amount)
                     c_id = paybill.check.company_id_check(company)
                     if c_id:
                             out_str = paybill.return_transaction_output(c_id)
@@ -452,68 +630,71 @@ def banking_system(accounts_file, commands_file, console_out_file, etf_file_path
                                 log_transaction(line)
                 
             else:
-                write_console("Error: You must be logged in as a standard user to pay bills.")
+                write_console(ErrorMessage(errors.UNAUTHORIZED, "Error: You must be logged in as a standard user to pay bills."))
         
 
         elif command == "deposit":
-            if not logged_in or session_type != "admin":
-                write_console("Error: You must be logged in as an admin to deposit into other accounts.")
+            if not session.logged_in or session.session_type != "admin":
+                write_console(ErrorMessage(errors.UNAUTHORIZED, "Error: You must be logged in as an admin to deposit into other accounts."))
                 continue
             
             if commands[i] == "logout":
-                write_console("Error: Missing account holder name.")
+                write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Missing account holder name."))
                 continue
 
             if i >= len(commands):
-                write_console("Error: Missing account number.")
+                write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Missing account number."))
                 break
             account_holder_name = commands[i].strip()
             i += 1
 
             if i >= len(commands):
-                write_console("Error: Missing account holder name.")
+                write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Missing account holder name."))
                 continue
             account_number = commands[i].strip()
             i += 1
 
-            if account_number in USERS and USERS[account_number].user_name.strip() == account_holder_name:
+            if session.has_account(account_number) and session.account(account_number).user_name.strip() == account_holder_name:
                 if i >= len(commands):
-                    write_console("Error: Missing deposit amount.")
+                    write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Missing deposit amount."))
                     break
 
                 if check.invalid_character_check(commands[i]):
                     deposit_amount = float(commands[i])
                 else:
-                    write_console("Error: Invalid deposit amount. Amount must be numeric.")
+                    write_console(ErrorMessage(errors.NOT_NUMERIC, "Error: Invalid deposit amount. Amount must be numeric."))
                     errorEnd()
                     break
                 i += 1
+                note_event(account_number, amount=deposit_amount)
 
                 if deposit_amount > 0:
-                    deposit = Deposit(session_type, USERS[account_number], deposit_amount, write_console)
+                    before = store_refresh(session.account(account_number))
+                    deposit = get_handler("Deposit")(session.session_type, session.account(account_number), deposit_amount, held.append)
                     transaction_output = deposit.process_deposit()
 
-                    if transaction_output:  # Ensuring only successful deposits are logged
+                    if store_commit(before, bool(transaction_output)):  # Ensuring only successful deposits are logged
+                        session.add_total("deposit", deposit_amount)
                         log_transaction(transaction_output)
                 else:
-                    write_console("Error: Deposit amount must be greater than zero.")
+                    write_console(ErrorMessage(errors.INVALID_AMOUNT, "Error: Deposit amount must be greater than zero."))
             else:
-                write_console(f"Error: Invalid account number {account_number} for account holder '{account_holder_name}'.")
+                write_console(ErrorMessage(errors.ACCOUNT_MISMATCH, f"Error: Invalid account number {account_number} for account holder '{account_holder_name}'."))
         
         elif command == "create":
-            if not logged_in or session_type != "admin":
-                write_console("Error: You must be logged in as an admin to create an account.")
+            if not session.logged_in or session.session_type != "admin":
+                write_console(ErrorMessage(errors.UNAUTHORIZED, "Error: You must be logged in as an admin to create an account."))
                 continue
 
             # Check for missing account holder name
             if i >= len(commands):
-                write_console("Error: Missing account holder name.")
+                write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Missing account holder name."))
                 errorEnd()
                 break
 
             account_holder_name = commands[i].strip()
             if account_holder_name.isdigit() or account_holder_name.lower() == "logout": #added this check.
-                write_console("Error: Account holder name cannot be blank.")
+                write_console(ErrorMessage(errors.INVALID_NAME, "Error: Account holder name cannot be blank."))
                 errorEnd()
                 break
 
@@ -521,14 +702,14 @@ def banking_system(accounts_file, commands_file, console_out_file, etf_file_path
 
             # Check for missing initial balance
             if i >= len(commands):
-                write_console("Error: Missing initial balance.")
+                write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Missing initial balance."))
                 errorEnd()
                 break
 
             balance_str = commands[i]
 
             if balance_str.lower() == "logout": # added this check
-                write_console("Error: Initial balance cannot be blank.")
+                write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Initial balance cannot be blank."))
                 errorEnd()
                 break
 
@@ -536,38 +717,40 @@ def banking_system(accounts_file, commands_file, console_out_file, etf_file_path
             if check.invalid_character_check(balance_str):
                 initial_balance = float(balance_str)
             else:
-                write_console("Error: Invalid initial balance. Amount must be numeric.")
+                write_console(ErrorMessage(errors.NOT_NUMERIC, "Error: Invalid initial balance. Amount must be numeric."))
                 errorEnd()
                 break
 
             i += 1
+            note_event(amount=initial_balance)
 
             # Check for negative initial balance
             if initial_balance >= 0:
-                create_account = Create(session_type, USERS, account_holder_name, initial_balance, write_console=write_console)
+                create_account = get_handler("Create")(session.session_type, USERS, account_holder_name, initial_balance, transaction_file=daily_file, write_console=write_console)
                 transaction_output = create_account.process_creation()
 
                 if transaction_output:
+                    session.invalidate()
                     log_transaction(transaction_output)
             else:
-                write_console("Error: Initial balance cannot be negative.")
+                write_console(ErrorMessage(errors.INVALID_AMOUNT, "Error: Initial balance cannot be negative."))
                 errorEnd()
                 continue
     
         elif command == "delete":
-            if not logged_in or session_type != "admin":
-                write_console("Error: You must be logged in as an admin to delete accounts.")
+            if not session.logged_in or session.session_type != "admin":
+                write_console(ErrorMessage(errors.UNAUTHORIZED, "Error: You must be logged in as an admin to delete accounts."))
                 continue
 
             # Get the account holder name from the input file.
             if i >= len(commands):
-                write_console("Error: Missing account holder name for delete.")
+                write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Missing account holder name for delete."))
                 errorEnd()
                 break
             account_holder_name = commands[i]
 
             if account_holder_name.lower().isdigit():
-                write_console("Error: Account holder name cannot be blank.")
+                write_console(ErrorMessage(errors.INVALID_NAME, "Error: Account holder name cannot be blank."))
                 errorEnd()
                 break
 
@@ -576,38 +759,40 @@ def banking_system(accounts_file, commands_file, console_out_file, etf_file_path
 
             # Get the account number from the input file.
             if i >= len(commands):
-                write_console("Error: Missing account number for delete.")
+                write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Missing account number for delete."))
                 errorEnd()
                 break
 
             account_number = commands[i]
             if account_number.lower() == "logout":
-                write_console("Error: Account number cannot be blank.")
+                write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Account number cannot be blank."))
                 errorEnd()
                 break
 
             write_console(f"Enter account number: {account_number}")
             i += 1
+            note_event(account_number)
 
             # Create and process the Delete transaction.
-            delete_account = Delete(session_type, USERS, write_console=write_console)
+            delete_account = get_handler("Delete")(session.session_type, USERS, write_console=write_console, transaction_file=daily_file)
             transaction_output=delete_account.process_deletion(account_holder_name, account_number)
             if transaction_output:  # Ensure only successful creations are logged
+                    session.invalidate()
                     log_transaction(transaction_output)
 
 
         elif command == "changeplan":
-            if not logged_in:
-                write_console("Error: You must be logged in to perform transactions.")
+            if not session.logged_in:
+                write_console(ErrorMessage(errors.NOT_LOGGED_IN, "Error: You must be logged in to perform transactions."))
                 continue
 
-            if session_type != "admin":
-                write_console("Error: This is a privileged transaction that requires admin mode.")
+            if session.session_type != "admin":
+                write_console(ErrorMessage(errors.UNAUTHORIZED, "Error: This is a privileged transaction that requires admin mode."))
                 continue
 
             # Get the account holder name from the input file.
             if i >= len(commands):
-                write_console("Error: Missing account holder name for changeplan.")
+                write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Missing account holder name for changeplan."))
                 errorEnd()
                 break
             account_holder_name = commands[i]
@@ -615,19 +800,15 @@ def banking_system(accounts_file, commands_file, console_out_file, etf_file_path
             i += 1
 
             # Search for a user with the given name.
-            found_user = None
-            for user in USERS.values():
-                if user.user_name.strip().lower() == account_holder_name.lower():
-                    found_user = user
-                    break
+            found_user = session.find_by_name(account_holder_name)
 
             if found_user is None:
-                write_console("Error: Account holder name not found.")
+                write_console(ErrorMessage(errors.ACCOUNT_NOT_FOUND, "Error: Account holder name not found."))
                 continue
 
             # Get the account number from the input file.
             if i >= len(commands):
-                write_console("Error: Missing account number for changeplan.")
+                write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Missing account number for changeplan."))
                 errorEnd()
                 break
             account_number = commands[i]
@@ -644,8 +825,10 @@ def banking_system(accounts_file, commands_file, console_out_file, etf_file_path
                     i += 1
 
             
+            note_event(account_number)
+
             # Perform the changeplan transaction.
-            change_plan = ChangePlan(session_type, found_user, account_number, new_plan, write_console=write_console)
+            change_plan = get_handler("ChangePlan")(session.session_type, found_user, account_number, new_plan, write_console=write_console)
             result = change_plan.process_changeplan()
             if result != 1:
                 continue  # Do not log a transaction output if changeplan failed.
@@ -653,17 +836,17 @@ def banking_system(accounts_file, commands_file, console_out_file, etf_file_path
             log_transaction(transaction_output)
  
         elif command == "disable":
-            if not logged_in:
-                write_console("Error: You must be logged in to perform transactions.")
+            if not session.logged_in:
+                write_console(ErrorMessage(errors.NOT_LOGGED_IN, "Error: You must be logged in to perform transactions."))
                 continue
 
-            if session_type != "admin":
-                write_console("Error: This is a privileged transaction that requires admin mode.")
+            if session.session_type != "admin":
+                write_console(ErrorMessage(errors.UNAUTHORIZED, "Error: This is a privileged transaction that requires admin mode."))
                 continue
 
             # Get the account holder name from the input file.
             if i >= len(commands):
-                write_console("Error: Missing account holder name for disable.")
+                write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Missing account holder name for disable."))
                 errorEnd()
                 break
             account_holder_name = commands[i]
@@ -671,27 +854,24 @@ def banking_system(accounts_file, commands_file, console_out_file, etf_file_path
             i += 1
 
             # Preliminary check: verify the account holder name exists.
-            found_user = None
-            for user in USERS.values():
-                if user.user_name.strip().lower() == account_holder_name.lower():
-                    found_user = user
-                    break
+            found_user = session.find_by_name(account_holder_name)
 
             if found_user is None:
-                write_console("Error: Account holder name not found.")
+                write_console(ErrorMessage(errors.ACCOUNT_NOT_FOUND, "Error: Account holder name not found."))
                 continue
 
             # Get the account number from the input file.
             if i >= len(commands):
-                write_console("Error: Missing account number for disable.")
+                write_console(ErrorMessage(errors.MISSING_INPUT, "Error: Missing account number for disable."))
                 errorEnd()
                 break
             account_number = commands[i]
             write_console(f"Enter account number: {account_number}")
             i += 1
+            note_event(account_number)
 
             # Create and process the Disable transaction.
-            disable_txn = Disable(session_type, account_holder_name, account_number, USERS, write_console=write_console)
+            disable_txn = get_handler("Disable")(session.session_type, account_holder_name, account_number, USERS, write_console=write_console)
             result = disable_txn.process_disable()
             if result != 1:
                 continue  # If disable failed, do not log a transaction output.
@@ -703,24 +883,34 @@ def banking_system(accounts_file, commands_file, console_out_file, etf_file_path
  
         elif command == "logout":
             # Create a Logout transaction instance using current session info, passing write_console.
-            logout_txn = Logout(logged_in, session_type, current_user, write_console=write_console)
+            logout_txn = get_handler("Logout")(session.logged_in, session.session_type, session.current_user, write_console=write_console)
             
             # Process logout; if successful, log the transaction and clear session state.
             if logout_txn.process_logout():
                 out_line = logout_txn.return_transaction_output()
                 log_transaction(out_line)
                 write_console("Session terminated.")
-                logged_in = False
-                current_user = None
-                session_type = None
+                session.end()
+                # The session's records are written out before the next login.
+                emitter.drain()
 
 
         else:
             pass
+
+    if track and seq:
+        now = time.perf_counter()
+        finish_event((ev_command, ev_error, ev_terminated, ev_handler, now - ev_start,
+                      ev_handler and now - ev_handler_start, ev_records, ev_amount, seq, ev_accounts))
+    if event_sink is not None:
+        event_sink.flush()
+    if metrics is not None:
+        metrics.end_session(session)
             
     # Cleanup
-    out_file.close()
-    etf_file.close()      
+    emitter.close()
+    return session
+
 
 if __name__ == "__main__":
     # banking_system()
@@ -738,7 +928,7 @@ if __name__ == "__main__":
       4) transaction_outputs/02_transfer_transaction_outputs/02_test01.etf => transaction logs
     """
     if len(sys.argv) < 5:
-        print("Usage: python3 main.py <accounts_file> <commands_file> <console_out_file> <transaction_out_file>")
+        print("Usage: python3 main.py <accounts_file> <commands_file> <console_out_file> <transaction_out_file> [--shared-table=NAME] [--log-dir=DIR [--log-index]] [--durability=none|group|txn] [--terminal=ID] [--events=PATH] [--events-format=ndjson|binary] [--metrics-port=PORT [--metrics-handlers]] [--screening=RULES_FILE] [--emit-thread] [--emit-fsync] [--txn-ids] [--session=ID | --replay-ids]")
         sys.exit(1)
 
     accounts_file       = sys.argv[1]  # e.g. "current_accounts_file.txt"
@@ -746,4 +936,120 @@ if __name__ == "__main__":
     console_out_file    = sys.argv[3]  # e.g. "02_test01.out"
     etf_file            = sys.argv[4]  # e.g. "02_test01.etf"
 
-    banking_system(accounts_file, commands_file, console_out_file, etf_file)
\ No newline at end of file
+    # Optional: share one in-memory account table between front end processes.
+    # The first process to start creates it from accounts_file; later ones attach.
+    # Optional: write transaction records to per-day logs under --log-dir, fsynced as --durability says,
+    # each with an integrity index beside it if --log-index is given.
+    # Optional: write one structured event per command to --events.
+    # Optional: serve live metrics on http://127.0.0.1:<--metrics-port>/metrics, with every
+    # transaction handler call counted and timed as well if --metrics-handlers is given.
+    # Optional: screen withdrawals/transfers/paybills against the velocity rules in --screening.
+    # Optional: write the .out/.etf output from a separate thread (--emit-thread), syncing
+    # the transaction files to disk after each of its writes (--emit-fsync, implies --emit-thread).
+    # Optional: give every transaction record an ID (--txn-ids). Each run gets a new session
+    # ID unless one is given: --session=ID reuses an earlier session's, and --replay-ids derives
+    # it from the commands file, so that every re-run of the script repeats the same IDs.
+    shared_name = log_dir = terminal = events_path = metrics_port = rules_file = session_id = None
+    emit_thread = emit_fsync = txn_ids = replay_ids = metrics_handlers = log_index = False
+    events_format = "ndjson"
+    durability = "none"
+    for arg in sys.argv[5:]:
+        if arg.startswith("--shared-table="):
+            shared_name = arg.split("=", 1)[1]
+        elif arg.startswith("--log-dir="):
+            log_dir = arg.split("=", 1)[1]
+        elif arg == "--log-index":
+            log_index = True
+        elif arg.startswith("--durability="):
+            durability = arg.split("=", 1)[1]
+        elif arg.startswith("--terminal="):
+            terminal = arg.split("=", 1)[1]
+        elif arg.startswith("--events="):
+            events_path = arg.split("=", 1)[1]
+        elif arg.startswith("--events-format="):
+            events_format = arg.split("=", 1)[1]
+        elif arg.startswith("--metrics-port="):
+            metrics_port = int(arg.split("=", 1)[1])
+        elif arg == "--metrics-handlers":
+            metrics_handlers = True
+        elif arg.startswith("--screening="):
+            rules_file = arg.split("=", 1)[1]
+        elif arg == "--emit-thread":
+            emit_thread = True
+        elif arg == "--emit-fsync":
+            emit_thread = emit_fsync = True
+        elif arg == "--txn-ids":
+            txn_ids = True
+        elif arg.startswith("--session="):
+            session_id = arg.split("=", 1)[1]
+        elif arg == "--replay-ids":
+            replay_ids = True
+
+    writer = None
+    if log_dir:
+        from txn_writer import TransactionWriter
+        try:
+            writer = TransactionWriter(log_dir, terminal=terminal, durability=durability, index=log_index)
+        except ValueError as exc:
+            print(f"Error: {exc}")
+            sys.exit(1)
+
+    sink = None
+    if events_path:
+        from events import EventSink
+        sink = EventSink(events_path, events_format)
+
+    session_metrics = server = None
+    if metrics_port is not None:
+        from metrics import SessionMetrics, serve
+        session_metrics = SessionMetrics(handler_timing=metrics_handlers)
+        server = serve(session_metrics.registry, metrics_port)
+
+    screening = None
+    if rules_file:
+        from screening import ScreeningStage
+        screening = ScreeningStage.from_file(rules_file)
+
+    emitter = None
+    if txn_ids:
+        from txn_ids import TransactionIds, new_session_id, session_id_for
+        if session_id is None:
+            session_id = session_id_for(commands_file) if replay_ids else new_session_id()
+        try:
+            ids = TransactionIds(terminal or "T0", session_id)
+        except ValueError as exc:
+            print(f"Error: {exc}")
+            sys.exit(1)
+        emitter = FileEmitter(console_out_file, etf_file, writer, ids)
+    if emit_thread:
+        from pipeline import ThreadedEmitter
+        emitter = ThreadedEmitter(emitter or FileEmitter(console_out_file, etf_file, writer), fsync=emit_fsync)
+
+    table = None
+    if shared_name:
+        from shared_accounts import SharedAccountTable
+        table = SharedAccountTable.open_or_create(shared_name, lambda: load_users(accounts_file))
+        if session_metrics is not None:
+            session_metrics.track_contention(table.contention)
+    try:
+        if table is not None:
+            banking_system(accounts_file, commands_file, console_out_file, etf_file,
+                           store=table, users=table.users(), transaction_writer=writer, event_sink=sink, metrics=session_metrics,
+                           screening=screening, emitter=emitter)
+        else:
+            banking_system(accounts_file, commands_file, console_out_file, etf_file,
+                           transaction_writer=writer, event_sink=sink, metrics=session_metrics, screening=screening,
+                           emitter=emitter)
+    finally:
+        if emitter is not None:
+            # Writes out whatever is still queued if the session stopped early (a no-op
+            # after a normal end, which has closed it already).
+            emitter.close()
+        if server is not None:
+            server.shutdown()
+        if sink is not None:
+            sink.close()
+        if table is not None:
+            table.close()
+        if writer is not None:
+            writer.close()
\ No newline at end of file
@@ -0,0 +1,411 @@
+"""
+Front End Metrics
+
+A small metrics registry (counters, gauges, histograms) for live throughput,
+error-rate and money-movement numbers from running sessions, plus a background
+HTTP endpoint that serves them in the Prometheus text format.
+
+banking_system(..., metrics=registry) records, per command:
+  banking_commands_total{command, outcome}        commands run, by outcome
+  banking_command_errors_total{command, error}    rejected/terminated commands, by error code
+  banking_command_seconds{command}                command latency histogram
+  banking_amount_total{command}                   money moved by accepted commands
+plus banking_sessions_total and the banking_active_sessions gauge. With a shared
+account table, track_contention() adds its optimistic-commit counters:
+  banking_store_contention_total{event}         reads, read_retries, commits,
+                                                 conflicts, retries_exhausted
+and, with handler timing on (SessionMetrics(handler_timing=True), main.py
+--metrics-handlers), the transaction handlers the commands run:
+  banking_handler_calls_total{handler}
+  banking_handler_seconds_total{handler}        time from looking the handler up to the
+                                                 end of its command: its checks and balance
+                                                 changes, and committing and logging them
+                                                 (a counter: per-command latency is already
+                                                 in banking_command_seconds)
+banking_system notes the handler and one clock reading when it looks the handler
+up, and hands the handler's seconds on with the rest of the command, so handler
+timing adds no wrapper around the handler calls.
+
+Recording a command costs one append: record() is the queue's own append (a
+deque, so it needs no lock), and takes the command's event tuple (see events.py).
+The queue is folded into the metrics when a session ends with batch_size events
+waiting, and before every scrape (MetricsRegistry.on_render), under a lock, so a
+scrape sees every command that finished before it and no two threads ever update
+a metric at once. A fold groups the events by series and updates each series
+once, and each command's latency histogram once. The session counts are worked
+out when scraped, from the set of running sessions: start_session() is the set's
+own add.
+
+How to Run:
+    python3 main.py <accounts> <commands> <out> <etf> --metrics-port=9464 [--metrics-handlers]
+    curl http://127.0.0.1:9464/metrics
+"""
+
+import bisect
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from events import EVENT_CODES, error_code, outcome as event_outcome
+
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _number(value):
+    """ Sample value text: integers without exponent or decimals, floats in full. """
+    if value == int(value) and abs(value) < 2 ** 53:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                     for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._children = {}
+        if not self.label_names:
+            self._children[()] = self._new_child()
+
+    def labels(self, *values):
+        """ The child for one combination of label values (create and keep it for hot paths). """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name} takes labels {self.label_names}, got {values}")
+            child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(_label_text(self.label_names, values), values, child))
+        return lines
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount=1.0):
+        self.value += amount
+
+    def dec(self, amount=1.0):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class _Lookup:
+    """ A child whose value is read from a dict owned by someone else, at scrape time. """
+
+    __slots__ = ("counts", "key")
+
+    def __init__(self, counts, key):
+        self.counts = counts
+        self.key = key
+
+    @property
+    def value(self):
+        return self.counts.get(self.key, 0)
+
+
+class _Reading:
+    """ A child whose value is worked out by a function, at scrape time. """
+
+    __slots__ = ("read",)
+
+    def __init__(self, read):
+        self.read = read
+
+    @property
+    def value(self):
+        return self.read()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1.0):
+        self._children[()].inc(amount)
+
+    def _render_child(self, label_text, values, child):
+        return [f"{self.name}{label_text} {_number(child.value)}"]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount=1.0):
+        self._children[()].dec(amount)
+
+    def set(self, value):
+        self._children[()].set(value)
+
+
+class _Buckets:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, labels)
+
+    def _new_child(self):
+        return _Buckets(self.buckets)
+
+    def observe(self, value):
+        self._children[()].observe(value)
+
+    def _render_child(self, label_text, values, child):
+        lines = []
+        running = 0
+        counts = list(child.counts)
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            running += count
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            bucket_labels = _label_text(self.label_names + ("le",), values + (le,))
+            lines.append(f"{self.name}_bucket{bucket_labels} {running}")
+        lines.append(f"{self.name}_sum{label_text} {_number(child.sum)}")
+        lines.append(f"{self.name}_count{label_text} {running}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Named metrics, rendered together in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+
+    def _get(self, cls, name, help_text, labels, **options):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, help_text, labels, **options)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"{name} is already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text, labels=()):
+        return self._get(Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help_text, labels, buckets=buckets)
+
+    def on_render(self, collect):
+        """ Calls collect() before every render, to bring metrics kept elsewhere up to date. """
+        self._collectors.append(collect)
+
+    def render(self):
+        for collect in self._collectors:
+            collect()
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+class SessionMetrics:
+    """
+    The metrics banking_system records: finished commands are queued, and folded
+    into the metrics in batches.
+    """
+
+    def __init__(self, registry=None, handler_timing=False, batch_size=1024):
+        """
+        :param registry: MetricsRegistry to record into (a new one if None).
+        :param handler_timing: Also count and time every transaction handler call.
+        :param batch_size: Finished commands queued before they are folded into the metrics.
+        """
+        self.registry = registry if registry is not None else MetricsRegistry()
+        self.handler_timing = handler_timing
+        self.batch_size = batch_size
+        r = self.registry
+        self.sessions = r.counter("banking_sessions_total", "Sessions started.")
+        self.active = r.gauge("banking_active_sessions", "Sessions currently running.")
+        self.commands = r.counter("banking_commands_total", "Commands run, by outcome.", ("command", "outcome"))
+        self.errors = r.counter("banking_command_errors_total", "Commands that failed, by error code.",
+                                ("command", "error"))
+        self.latency = r.histogram("banking_command_seconds", "Command latency.", ("command",))
+        self.amount = r.counter("banking_amount_total", "Money moved by accepted commands.", ("command",))
+        if handler_timing:
+            self.handler_calls = r.counter("banking_handler_calls_total", "Transaction handler calls.",
+                                           ("handler",))
+            self.handler_seconds = r.counter("banking_handler_seconds_total",
+                                             "Time spent in transaction handlers.", ("handler",))
+        # (command, error, terminated, handler) -> the children a command with that key counts in
+        self._series = {}
+        self._running = set()  # sessions started and not yet ended
+        self._ended = 0
+        self._started = 0      # the last banking_sessions_total scraped
+        # start_session(session): counts a session that banking_system starts. It is the
+        # set's own add, so starting a session is a single C call.
+        self.start_session = self._running.add
+        self.sessions._children[()] = _Reading(self._sessions_started)
+        self.active._children[()] = _Reading(self._running.__len__)
+        self._pending = deque()  # finished events not yet folded in
+        # record(event): queues one finished command (the event tuple of events.py).
+        # It is the deque's own append, so recording a command is a single C call.
+        self.record = self._pending.append
+        self._lock = threading.Lock()
+        self.registry.on_render(self.collect)
+
+    def end_session(self, session):
+        """ Takes a finished session off the running set, folding the queue in once batch_size are waiting. """
+        self._running.discard(session)
+        self._ended += 1
+        if len(self._pending) >= self.batch_size:
+            self.collect()
+
+    def _sessions_started(self):
+        """
+        banking_sessions_total: the sessions running plus those that ended. A scrape
+        between the two steps of end_session() would count one short, so the total
+        never drops below one already scraped.
+        """
+        self._started = max(self._started, self._ended + len(self._running))
+        return self._started
+
+    def _new_series(self, key):
+        """
+        The children of one (command, error, terminated, handler) key: commands,
+        latency, amount (None unless ok), errors (None without an error), and the
+        handler's calls and seconds (None without a handler).
+        """
+        command, error, terminated, handler = key
+        # Stray tokens read as commands all share one label, so they cannot grow the series count.
+        outcome = event_outcome(command, error, terminated)
+        label = command if command in EVENT_CODES else "other"
+        series = self._series[key] = (
+            self.commands.labels(label, outcome), self.latency.labels(label),
+            self.amount.labels(label) if outcome == "ok" else None,
+            self.errors.labels(label, error_code(error).name) if error is not None else None,
+            self.handler_calls.labels(handler) if handler is not None else None,
+            self.handler_seconds.labels(handler) if handler is not None else None)
+        return series
+
+    def collect(self):
+        """
+        Folds the queued commands into the metrics (called by end_session() and
+        before every render). Events are grouped by series first, so each series'
+        histogram and counters are updated once per batch.
+        """
+        with self._lock:
+            pending = self._pending
+            popleft = pending.popleft
+            samples = {}  # key -> (latencies, handler seconds, amounts)
+            get = samples.get
+            for (command, error, terminated, handler, latency, handler_seconds, records, amount,
+                 _, _) in [popleft() for _ in range(len(pending))]:
+                key = (command, error, terminated, handler)
+                lists = get(key)
+                if lists is None:
+                    lists = samples[key] = ([], [], [])
+                lists[0].append(latency)
+                if handler is not None:
+                    lists[1].append(handler_seconds)
+                if records:
+                    lists[2].append(amount)
+            series_of, new_series = self._series, self._new_series
+            latencies = {}  # histogram child -> latencies of all its keys
+            for key, (values, handler_seconds, amounts) in samples.items():
+                count, latency, amount_total, errors, calls, seconds = series_of.get(key) or new_series(key)
+                n = len(values)
+                count.value += n
+                if errors is not None:
+                    errors.value += n
+                elif amount_total is not None and amounts:
+                    amount_total.value += sum(filter(None, amounts))
+                if calls is not None:
+                    calls.value += n
+                    seconds.value += sum(handler_seconds)
+                if latency in latencies:
+                    latencies[latency] += values
+                else:
+                    latencies[latency] = values
+            bounds = self.latency.buckets
+            for latency, values in latencies.items():
+                n = len(values)
+                latency.sum += sum(values)
+                # Walk the sorted latencies up to the bucket of the largest one; the
+                # buckets above it get nothing.
+                values.sort()
+                counts = latency.counts
+                low = 0
+                top = bisect.bisect_left(bounds, values[-1])
+                for i in range(top):
+                    below = bisect.bisect_right(values, bounds[i], low)
+                    counts[i] += below - low
+                    low = below
+                counts[top] += n - low
+
+    def track_contention(self, counts):
+        """
+        Exposes a store's contention counters (SharedAccountTable.contention) as
+        banking_store_contention_total. They are read when scraped, so the store's
+        commit path pays nothing extra.
+        """
+        metric = self.registry.counter("banking_store_contention_total",
+                                       "Shared account table reads, commits and conflicts.", ("event",))
+        for key in counts:
+            metric._children[(key,)] = _Lookup(counts, key)
+
+
+def serve(registry, port=9464, host="127.0.0.1"):
+    """
+    Serves registry on http://host:port/metrics from a daemon thread.
+    Returns the server; call shutdown() on it to stop.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
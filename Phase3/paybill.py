@@ -2,23 +2,68 @@
 """
 Paybill Class
 
-Handles the payment of bills to predefined companies. 
+Handles the payment of bills to the companies listed in the biller registry (billers.py).
 This class ensures proper validation of inputs, available funds, and transaction limits.
 """
 
-from check import Check
+import errors
+from billers import registry
+from check import CHECK
+from validation import Rule, register, rule_set
+
+
+def _unknown_biller(p):
+    """ The known_biller error, naming the billers in the registry as it is now. """
+    codes = list(registry().accounts)
+    message = f"Error: '{p.company}' is not a recognized biller."
+    if len(codes) > 2:
+        return f"{message} Please use {', '.join(codes[:-1])}, or {codes[-1]}."
+    if codes:
+        return f"{message} Please use {' or '.join(codes)}."
+    return message
+
+
+# Checks every payment gets, in the order their errors are reported. The guard stays
+# first under adaptive order: the checks after it compare the amount.
+_COMMON = [
+    Rule("zero_amount", CHECK.zero_amount_check, ("amount",),
+         "Error: Payment amount must be greater than zero.", errors.INVALID_AMOUNT),
+    Rule("numeric_amount", CHECK.invalid_character_check, ("amount",),
+         "Error: Invalid payment amount. Amount must be numeric.", errors.NOT_NUMERIC, guard=True),
+    Rule("known_biller", CHECK.valid_company_check, ("company",),
+         _unknown_biller, errors.INVALID_BILLER),
+    Rule("biller_account", CHECK.company_id_check, ("company",),
+         "Error: No valid company ID found for the selected biller.", errors.INVALID_BILLER),
+]
+
+# Admin: no limit check, and may pay from a disabled account.
+register("paybill", "admin", _COMMON + [
+    Rule("positive_amount", CHECK.negative_amount_check, ("amount",),
+         "Error: Invalid payment amount. Amount must be positive.", errors.INVALID_AMOUNT),
+    Rule("funds", CHECK.balance_check, ("user", "amount"),
+         lambda p: f"Error: Insufficient funds to pay the bill. Available balance: ${p.user.balance:,.2f}",
+         errors.INSUFFICIENT_FUNDS),
+])
+
+register("paybill", "standard", _COMMON + [
+    Rule("payer_active", CHECK.availability_check, ("user",),
+         "Error: Your account is disabled. Please use an available account to paybill.", errors.ACCOUNT_DISABLED),
+    Rule("positive_amount", CHECK.negative_amount_check, ("amount",),
+         "Error: Invalid payment amount. Amount must be positive.", errors.INVALID_AMOUNT),
+    Rule("limit", CHECK.limit_check, ("amount", "limit"),
+         lambda p: f"Error: Maximum paybill limit exceeded. You can paybill up to ${p.limit:.2f} in this session.",
+         errors.LIMIT_EXCEEDED),
+    Rule("funds", CHECK.balance_check, ("user", "amount"),
+         lambda p: f"Error: Insufficient funds to pay the bill. Available balance: ${p.user.balance:.2f}.",
+         errors.INSUFFICIENT_FUNDS),
+])
+
 
 class Paybill:
     
     """
     Handles bill payments, ensuring the user has sufficient balance and the biller is valid.
     """
-    
-    COMPANY_ACCOUNTS = {
-        "EC": "10000",
-        "CQ": "20000",
-        "FI": "30000"
-    }
 
     def __init__(self, userType, user, company, amount = None, limit=2000.00, write_console=None):
         self.userType = userType
@@ -26,7 +71,8 @@ class Paybill:
         self.company = company
         self.amount = amount
         self.limit = limit
-        self.check = Check()
+        self.check = CHECK
+        self.rules = rule_set("paybill", userType)
         
         # Provide a default no-op if not given
         if write_console is None:
@@ -36,88 +82,24 @@ class Paybill:
             self.write_console = write_console
 
     def process_paybill(self):
-        """ Processes the bill payment after performing necessary validations. """
-        # Basic checks
-        if not self.check.zero_amount_check(self.amount):
-            self.write_console("Error: Payment amount must be greater than zero.")
-            return 0
-        # all_inputs_valid, missing_fields = self.check.missing_input_check(
-        #     user=self.user, 
-        #     company=self.company, 
-        #     amount=self.amount
-        # )
-        # if not all_inputs_valid:
-        #     self.write_console(f"Error: The paybill {', '.join(missing_fields)} is missing, so the process will be rejected. Please re-try.")
-        #     return 0
-        
-        if not self.check.invalid_character_check(self.amount):
-            self.write_console("Error: Invalid payment amount. Amount must be numeric.")
-            return 0
-        
-        if not self.check.valid_company_check(self.company):
-            self.write_console(f"Error: '{self.company}' is not a recognized biller. Please use EC, CQ, or FI.")
-            return 0
-        
-        company_id = self.check.company_id_check(self.company)
-        if not company_id:
-            self.write_console("Error: No valid company ID found for the selected biller.")
-            return 0
+        """ Processes the bill payment after the paybill rules for the session type pass. """
+        failed = self.rules.first_failure(self)
+        if failed is not None:
+            self.write_console(failed.error(self))
+            return failed.result
 
-        # If user is admin, skip paybill limit & ownership checks, but still do negative/zero/funds checks
+        self.user.balance -= self.amount
         if self.userType == "admin":
-            # Admin override
-            if not self.check.negative_amount_check(self.amount):
-                self.write_console("Error: Invalid payment amount. Amount must be positive.")
-                return 0
-            
-            # if not self.check.zero_amount_check(self.amount):
-            #     self.write_console("Error: Payment amount must be greater than zero.")
-            #     return 0
-            
-            if not self.check.balance_check(self.user, self.amount):
-                self.write_console(f"Error: Insufficient funds to pay the bill. Available balance: ${self.user.balance:,.2f}")
-                return 0
-
-            # Assume admin able to pay from disabled accounts
-            # if not self.check.availability_check(self.user):
-            #     print(f"Error: Account {self.user.account_number} is inactive. Payment cannot be processed.")
-            #     return
-
-            self.user.balance -= self.amount
             self.write_console(
                 f"Payment successful. New balance for Account {self.user.account_number}: "
                 f"${self.user.balance:.2f}."
             )
-        # Standard user checks
         else:
-            if not self.check.availability_check(self.user):
-                self.write_console("Error: Your account is disabled. Please use an available account to paybill.")
-                return 0
-            if not self.check.negative_amount_check(self.amount):
-                self.write_console("Error: Invalid payment amount. Amount must be positive.")
-                return 0
-            # if not self.check.zero_amount_check(self.amount):
-            #     self.write_console("Error: Payment amount must be greater than zero.")
-            #     return 0
-            if not self.check.limit_check(self.amount, self.limit):
-                self.write_console(f"Error: Maximum paybill limit exceeded. You can paybill up to ${self.limit:.2f} in this session.")
-                return 0
-            if not self.check.balance_check(self.user, self.amount):
-                self.write_console(f"Error: Insufficient funds to pay the bill. Available balance: ${self.user.balance:.2f}.")
-                return 0
-            if not self.company_check():
-                self.write_console(f"Error: Biller not recognized. Please use EC, CQ, or FI.")
-                return 0
-
-            self.user.balance -= self.amount
             self.write_console(
                 f"Payment successful. New balance: "
                 f"${self.user.balance:.2f}."
             )
 
-    def company_check(self):
-        return self.company in self.COMPANY_ACCOUNTS
-    
     def return_transaction_output(self, company_id):
         """ Returns the formatted transaction output for logging. """
         formatted_username = self.user.user_name.replace(" ", "_").ljust(21, "_")
@@ -0,0 +1,274 @@
+"""
+Session Pipeline
+
+banking_system runs one session script as three stages:
+
+  tokenize   script file -> tokens, one per non-blank line (tokenize())
+  dispatch   tokens -> console lines and transaction records: the command loop
+             in banking_system reads each command's fields, validates them
+             (Check and the transaction handlers) and applies balance changes
+  emit       console lines and transaction records -> the .out and .etf files,
+             and the per-day transaction logs if there are any (FileEmitter);
+             with transaction IDs, each record's ID also goes to the .ids side
+             file of every file the record is written to (see txn_ids.py)
+
+There is no separate stage of typed requests, or of validation, or of apply:
+reading a command's fields, validating it and applying it all happen in the
+dispatch stage, one command at a time. The scripts are interactive input, so
+how many tokens a command takes depends on validation: an admin withdrawal
+naming an unknown holder stops reading there, and the tokens after it are then
+read as commands. A parser that ran ahead of the dispatcher would need the
+dispatcher's answers, and the console text the tests expect would change.
+Apply cannot run behind validation either: the next command is validated
+against the balances and session totals this one leaves, and with an account
+store the handler's console lines wait on the store accepting the change (see
+store_commit in main.py). Within the dispatch stage, validation is the
+transaction handlers' rule sets (validation.py), timed on their own by
+bench_validation.py.
+
+Emit is the stage that can move. By default it runs inline. ThreadedEmitter
+runs it on its own thread: the dispatcher collects output into batches and
+appends them to a deque, waking the writer thread with an Event only when the
+deque was empty; no lock is taken per line. The writer takes everything queued
+at once and hands it to the inner emitter in one go, which FileEmitter writes as
+one write() per file, and with fsync on it syncs the transaction files after
+each of these writes, off the dispatcher's thread. The deque is bounded: past
+max_batches the dispatcher waits for the writer, so a slow disk slows the
+session down instead of letting output pile up in memory. Order is kept,
+because both files are written by the same thread in the order the dispatcher
+produced the output.
+
+drain() returns once everything emitted so far is written (and synced, with
+fsync on). banking_system drains at every logout, so a session's records are on
+disk when it says "Session terminated.", and close() drains before it stops the
+thread. NullEmitter drops everything; it is used to time the dispatch stage on
+its own (bench_pipeline.py).
+"""
+
+import os
+
+CONSOLE, RECORD = 0, 1
+# Queued after a session's output to stop the writer thread (ThreadedEmitter).
+STOP = object()
+
+
+def tokenize(commands_file):
+    """ Returns the tokens of a session script: its non-blank lines, stripped. """
+    with open(commands_file, "r") as cf:
+        return [token for token in (line.strip() for line in cf) if token]
+
+
+class FileEmitter:
+    """
+    Writes console lines to the .out file and transaction records to the .etf file.
+    """
+
+    def __init__(self, console_out_file, etf_file_path, transaction_writer=None, ids=None):
+        """
+        :param console_out_file: Path of the .out file (overwritten).
+        :param etf_file_path: Path of the .etf file (overwritten).
+        :param transaction_writer: Optional TransactionWriter that also gets every record.
+                                   It belongs to the caller: close() only flushes it.
+        :param ids: Optional txn_ids.TransactionIds. When given, every record gets the next
+                    ID, written to <etf_file_path>.ids (overwritten) and to transaction_writer.
+        """
+        self.out_file = open(console_out_file, "w")
+        self.etf_file = open(etf_file_path, "w")
+        self.transaction_writer = transaction_writer
+        self.ids = ids
+        # Same name as txn_ids.ids_path(), which is not imported so plain sessions never load it.
+        self.ids_file = open(etf_file_path + ".ids", "w") if ids is not None else None
+
+    def console(self, msg):
+        self.out_file.write(msg + "\n")
+
+    def record(self, txn_str):
+        self.etf_file.write(txn_str + "\n")
+        if self.ids is not None or self.transaction_writer is not None:
+            self._pass_on(txn_str)
+
+    def _pass_on(self, txn_str):
+        """ Gives a record written to the .etf file its ID and passes it to the transaction writer. """
+        txn_id = None
+        if self.ids is not None:
+            txn_id = self.ids.next()
+            self.ids_file.write(txn_id + "\n")
+        if self.transaction_writer is not None:
+            self.transaction_writer.write(txn_str, txn_id)
+
+    def emit(self, items):
+        """ Writes a batch of (CONSOLE | RECORD, text) items in order, with one write per file. """
+        console, records = [], []
+        for kind, text in items:
+            (console if kind == CONSOLE else records).append(text)
+        if console:
+            self.out_file.write("\n".join(console) + "\n")
+        if records:
+            self.etf_file.write("\n".join(records) + "\n")
+            if self.ids is not None or self.transaction_writer is not None:
+                for txn_str in records:
+                    self._pass_on(txn_str)
+
+    def drain(self, sync=False):
+        """ Flushes everything written so far; with sync, also fsyncs the .etf and .ids files. """
+        self.out_file.flush()
+        self.etf_file.flush()
+        if self.ids_file is not None:
+            self.ids_file.flush()
+        if self.transaction_writer is not None:
+            self.transaction_writer.flush()
+        if sync:
+            os.fsync(self.etf_file.fileno())
+            if self.ids_file is not None:
+                os.fsync(self.ids_file.fileno())
+
+    def close(self):
+        self.out_file.close()
+        self.etf_file.close()
+        if self.ids_file is not None:
+            self.ids_file.close()
+        if self.transaction_writer is not None:
+            self.transaction_writer.flush()
+
+
+class NullEmitter:
+    """
+    Discards all output.
+    """
+
+    def console(self, msg):
+        pass
+
+    def record(self, txn_str):
+        pass
+
+    def emit(self, items):
+        pass
+
+    def drain(self, sync=False):
+        pass
+
+    def close(self):
+        pass
+
+
+class ThreadedEmitter:
+    """
+    Runs another emitter on a background writer thread, fed through a bounded deque.
+    """
+
+    def __init__(self, emitter, batch_size=64, max_batches=16, fsync=False):
+        """
+        :param emitter: The emitter that does the writing (e.g. a FileEmitter).
+        :param batch_size: Items collected before a batch is queued.
+        :param max_batches: Queued batches at most; the session waits beyond that.
+        :param fsync: Sync the transaction files after every write the thread makes
+                      (see FileEmitter.drain), not only when drained.
+        """
+        # Imported here so that sessions without a writer thread never load threading.
+        import collections
+        import threading
+
+        self.emitter = emitter
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.fsync = fsync
+        self.writes = 0     # writes the thread made, each of everything queued at the time
+        self.waits = 0      # times the session waited for room in the queue
+        self._batch = []
+        self._queue = collections.deque()
+        self._ready = threading.Event()     # set when the queue has something for the thread
+        self._room = threading.Event()      # set when the thread has taken from the queue
+        self._Event = threading.Event
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="emit", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        queue, ready, room = self._queue, self._ready, self._room
+        while True:
+            ready.clear()
+            if not queue:
+                ready.wait()
+            # Everything queued so far goes out in one write. A drain or stop request
+            # ends the write, so it is answered after everything queued before it.
+            items, request = [], None
+            while queue:
+                entry = queue.popleft()
+                if isinstance(entry, list):
+                    items.extend(entry)
+                    continue
+                request = entry
+                break
+            room.set()
+            if self._error is None:
+                try:
+                    if items:
+                        self.emitter.emit(items)
+                        self.writes += 1
+                        if self.fsync:
+                            self.emitter.drain(True)
+                    if request is STOP:
+                        self.emitter.drain(self.fsync)
+                    elif request is not None:
+                        self.emitter.drain(request[1])
+                except Exception as exc:  # reported to the session by drain() and close()
+                    self._error = exc
+            if request is STOP:
+                return
+            if request is not None:
+                request[0].set()
+
+    def _put(self, entry):
+        queue = self._queue
+        while len(queue) >= self.max_batches:
+            self._room.clear()
+            if len(queue) >= self.max_batches:
+                self.waits += 1
+                self._room.wait()
+        queue.append(entry)
+        if len(queue) == 1:
+            self._ready.set()
+
+    def console(self, msg):
+        self._batch.append((CONSOLE, msg))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def record(self, txn_str):
+        self._batch.append((RECORD, txn_str))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """ Queues the items collected so far (waiting while the queue is full). """
+        if self._batch:
+            self._put(self._batch)
+            self._batch = []
+
+    def drain(self, sync=False):
+        """
+        Waits until everything emitted so far is written and flushed, and synced with
+        fsync on or sync=True.
+        """
+        if self._closed:
+            return
+        self.flush()
+        done = self._Event()
+        self._put((done, sync or self.fsync))
+        done.wait()
+        if self._error is not None:
+            raise self._error
+
+    def close(self):
+        """ Drains the queue, stops the thread and closes the inner emitter. Safe to call twice. """
+        if self._closed:
+            return
+        self._closed = True
+        self.flush()
+        self._put(STOP)
+        self._thread.join()
+        self.emitter.close()
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,66 @@
+"""
+Worker Pool Client
+
+Drop-in replacement for `python3 main.py` that keeps the same four-argument
+command line but runs the session on a warm worker from worker_pool.py.
+If no pool is running (or BANKING_POOL_SOCKET points nowhere) the session is
+run in this process instead, exactly as main.py would.
+
+How to Run:
+    python3 pool_main.py <accounts_file> <commands_file> <console_out_file> <transaction_out_file>
+
+This module is the whole client, and it deliberately imports only os, socket and
+sys: anything heavier (json, tempfile, main itself) would hand back the startup
+time the pool exists to save.
+"""
+
+import os
+import socket
+import sys
+
+DEFAULT_SOCKET = os.path.join(os.environ.get("TMPDIR", "/tmp"), "banking_front_end.sock")
+
+
+def submit(accounts_file, commands_file, console_out_file, etf_file, socket_path=DEFAULT_SOCKET):
+    """
+    Runs one session on the pool. Returns (ok, text) where text is the session's
+    stdout on success or the worker's error report on failure.
+    Raises FileNotFoundError / ConnectionRefusedError if no supervisor is listening.
+    """
+    job = [os.path.abspath(accounts_file), os.path.abspath(commands_file),
+           os.path.abspath(console_out_file), os.path.abspath(etf_file), os.getcwd()]
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.connect(socket_path)
+        conn.sendall("\t".join(job).encode() + b"\n")
+        chunks = []
+        while True:
+            chunk = conn.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    status, _, text = b"".join(chunks).decode().partition("\n")
+    if not status:
+        return False, "Worker closed the connection without a reply.\n"
+    return status == "OK", text
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 5:
+        print("Usage: python3 pool_main.py <accounts_file> <commands_file> <console_out_file> <transaction_out_file>")
+        sys.exit(1)
+
+    accounts_file, commands_file, console_out_file, etf_file = sys.argv[1:5]
+    socket_path = os.environ.get("BANKING_POOL_SOCKET", DEFAULT_SOCKET)
+
+    try:
+        ok, text = submit(accounts_file, commands_file, console_out_file, etf_file, socket_path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        # No pool listening: run the session here instead.
+        from main import banking_system
+        banking_system(accounts_file, commands_file, console_out_file, etf_file)
+        sys.exit(0)
+
+    if not ok:
+        sys.stderr.write(text)
+        sys.exit(1)
+    sys.stdout.write(text)
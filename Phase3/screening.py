@@ -0,0 +1,242 @@
+"""
+Velocity Screening
+
+Check validates one transaction at a time and keeps no state, so it cannot see
+a burst: ten withdrawals in a minute each pass on their own. The screening stage
+runs just before a withdrawal, transfer or paybill is applied and looks at what
+the paying account has already done in the last few minutes.
+
+It is driven by rules, one per line in a rules file:
+
+  <name> <kinds> <window seconds> <max count> <max amount> <action>
+  withdraw_burst withdraw 600 5 - reject
+  outflow_hour withdraw,transfer,paybill 3600 - 3000.00 flag
+  END_OF_FILE
+
+A rule is hit when the transaction would take the account over max count
+transactions, or over max amount in total, among the listed kinds within the
+window ("-" means no limit). A "reject" rule refuses the transaction; a "flag"
+rule lets it through and records it in ScreeningStage.flags for review.
+
+Counts and amounts are kept per account in sliding windows made of a ring of
+fixed-width buckets (SlidingWindowCounter). Adding a transaction or reading the
+totals clears only the buckets that have expired since the account was last
+seen, so the cost does not depend on how many transactions or accounts there
+are. Counters live in flat arrays indexed by a per-account slot, created the
+first time an account is seen: with the default 12 buckets, one distinct
+(window, kinds) pair takes about 24 MB at 100k accounts, slot table included.
+"""
+
+import time
+from array import array
+from collections import deque
+
+SCREENED_KINDS = ("withdraw", "transfer", "paybill")
+ACTIONS = ("reject", "flag")
+
+
+class Rule:
+    """
+    One velocity limit on a set of transaction kinds.
+    """
+
+    __slots__ = ("name", "kinds", "window", "max_count", "max_amount", "action")
+
+    def __init__(self, name, kinds, window, max_count=None, max_amount=None, action="reject"):
+        """
+        :param name: Rule name, reported when the rule is hit.
+        :param kinds: Transaction kinds the rule counts ("withdraw", "transfer", "paybill").
+        :param window: Window length in seconds.
+        :param max_count: Most transactions allowed in the window, or None.
+        :param max_amount: Most money allowed in the window, or None.
+        :param action: "reject" or "flag".
+        """
+        kinds = frozenset(kinds)
+        if not kinds or not kinds <= set(SCREENED_KINDS):
+            raise ValueError(f"Rule {name}: kinds must be among {', '.join(SCREENED_KINDS)}")
+        if window <= 0:
+            raise ValueError(f"Rule {name}: window must be positive")
+        if max_count is None and max_amount is None:
+            raise ValueError(f"Rule {name}: needs a max count or a max amount")
+        if action not in ACTIONS:
+            raise ValueError(f"Rule {name}: action must be reject or flag")
+        self.name = name
+        self.kinds = kinds
+        self.window = window
+        self.max_count = max_count
+        self.max_amount = max_amount
+        self.action = action
+
+    def __repr__(self):
+        return (f"Rule({self.name!r}, {sorted(self.kinds)}, {self.window}, max_count={self.max_count}, "
+                f"max_amount={self.max_amount}, action={self.action!r})")
+
+
+DEFAULT_RULES = (
+    Rule("withdraw_burst", ["withdraw"], 600, max_count=5),
+    Rule("transfer_burst", ["transfer"], 600, max_count=5),
+    Rule("outflow_hour", SCREENED_KINDS, 3600, max_amount=3000.00, action="flag"),
+)
+
+
+def parse_rules(path):
+    """
+    Reads a rules file into a list of Rules.
+    Raises ValueError naming the first malformed line.
+    """
+    rules = []
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            if line.startswith("END_OF_FILE"):
+                break
+            fields = line.split()
+            if len(fields) != 6:
+                raise ValueError(f"{path}:{number}: expected <name> <kinds> <window> <max count> "
+                                 f"<max amount> <action>, got {line!r}")
+            name, kinds, window, max_count, max_amount, action = fields
+            try:
+                rules.append(Rule(name, kinds.split(","), float(window),
+                                  None if max_count == "-" else int(max_count),
+                                  None if max_amount == "-" else float(max_amount), action))
+            except ValueError as exc:
+                raise ValueError(f"{path}:{number}: {exc}") from None
+    return rules
+
+
+class SlidingWindowCounter:
+    """
+    Per-account transaction count and amount over the last window seconds.
+    """
+
+    def __init__(self, window, buckets=12):
+        """
+        :param window: Window length in seconds.
+        :param buckets: Buckets in the ring; the window moves forward one bucket
+                        (window / buckets seconds) at a time.
+        """
+        self.window = window
+        self.buckets = buckets
+        self.width = window / buckets
+        self._slots = {}                  # account number -> slot
+        self._head = array("q")           # per slot: absolute index of its newest bucket
+        self._count = array("q")          # per slot: transactions in the window
+        self._cents = array("q")          # per slot: amount in the window, in cents
+        self._bucket_count = array("I")   # slot * buckets + bucket index % buckets
+        self._bucket_cents = array("q")
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _advance(self, account, now):
+        """ Returns the account's slot with every bucket that left the window cleared. """
+        bucket = int(now // self.width)
+        slot = self._slots.get(account)
+        if slot is None:
+            slot = self._slots[account] = len(self._head)
+            self._head.append(bucket)
+            self._count.append(0)
+            self._cents.append(0)
+            self._bucket_count.extend([0] * self.buckets)
+            self._bucket_cents.extend([0] * self.buckets)
+            return slot
+        head = self._head[slot]
+        if bucket <= head:
+            return slot
+        base = slot * self.buckets
+        if bucket - head >= self.buckets:
+            # Idle for a whole window: everything expired.
+            for n in range(base, base + self.buckets):
+                self._bucket_count[n] = 0
+                self._bucket_cents[n] = 0
+            self._count[slot] = 0
+            self._cents[slot] = 0
+        else:
+            for b in range(head + 1, bucket + 1):
+                n = base + b % self.buckets
+                self._count[slot] -= self._bucket_count[n]
+                self._cents[slot] -= self._bucket_cents[n]
+                self._bucket_count[n] = 0
+                self._bucket_cents[n] = 0
+        self._head[slot] = bucket
+        return slot
+
+    def totals(self, account, now):
+        """ (count, amount) for account over the window ending at now. """
+        slot = self._slots.get(account)
+        if slot is None:
+            return 0, 0.0
+        slot = self._advance(account, now)
+        return self._count[slot], self._cents[slot] / 100
+
+    def add(self, account, amount, now):
+        # Whole cents, so adding and expiring buckets never drifts.
+        cents = round(amount * 100)
+        slot = self._advance(account, now)
+        n = slot * self.buckets + self._head[slot] % self.buckets
+        self._bucket_count[n] += 1
+        self._bucket_cents[n] += cents
+        self._count[slot] += 1
+        self._cents[slot] += cents
+
+
+class ScreeningStage:
+    """
+    Pre-commit velocity screening for withdrawals, transfers and paybills.
+    """
+
+    def __init__(self, rules=DEFAULT_RULES, buckets=12, clock=time.time, max_flags=10000):
+        """
+        :param rules: Rules to enforce (see parse_rules()).
+        :param buckets: Ring buckets per window.
+        :param clock: Returns the current time in seconds (replaceable for replays and tests).
+        :param max_flags: Most flagged transactions kept in flags (oldest dropped first).
+        """
+        self.rules = list(rules)
+        self.clock = clock
+        self.flags = deque(maxlen=max_flags)
+        self.flagged = 0    # transactions flagged so far, including those dropped from flags
+        # One counter per distinct (window, kinds); rules that share both share it.
+        counters = {}
+        self._checks = {kind: [] for kind in SCREENED_KINDS}
+        for rule in self.rules:
+            counter = counters.setdefault((rule.window, rule.kinds), SlidingWindowCounter(rule.window, buckets))
+            for kind in rule.kinds:
+                self._checks[kind].append((rule, counter))
+        self._counters = {kind: list({id(c): c for _, c in checks}.values())
+                          for kind, checks in self._checks.items()}
+
+    @classmethod
+    def from_file(cls, path, **options):
+        return cls(parse_rules(path), **options)
+
+    def screen(self, kind, account, amount):
+        """
+        Checks one transaction before it is applied. Returns the first "reject" rule it
+        hits, or None if it may go ahead; "flag" rules it hits are added to flags.
+        """
+        checks = self._checks.get(kind)
+        if not checks:
+            return None
+        now = self.clock()
+        flagged = None
+        for rule, counter in checks:
+            count, total = counter.totals(account, now)
+            if ((rule.max_count is not None and count + 1 > rule.max_count)
+                    or (rule.max_amount is not None and total + amount > rule.max_amount + 0.005)):
+                if rule.action == "reject":
+                    return rule
+                if flagged is None:
+                    flagged = rule
+        if flagged is not None:
+            self.flagged += 1
+            self.flags.append((now, flagged.name, kind, account, amount))
+        return None
+
+    def record(self, kind, account, amount):
+        """ Counts a transaction that was applied. """
+        now = self.clock()
+        for counter in self._counters.get(kind, ()):
+            counter.add(account, amount, now)
@@ -0,0 +1,224 @@
+"""
+Session Class
+
+Holds the state of one front end session: whether someone is logged in, the
+session type, the logged-in account, running totals per transaction type, and a
+small cache of the accounts the session has looked up.
+
+The cache means a session pays for an account lookup (a scan by holder name, a
+read from a shared table, a balance fetch from an account store) once, and
+repeated commands on the same accounts are served from memory. Balances fetched
+from a store are trusted until the session's own commit is refused, at which
+point those accounts are dropped from the cache and re-read on the next command.
+The store's atomic apply() still refuses any change that would overdraw an
+account, so a stale cached balance can never let money be lost.
+
+With a store that versions its rows (SharedAccountTable), commits are
+optimistic: refresh() also keeps the version each balance was read at, and
+commit() sends the changes with compare_and_apply(). If another session changed
+one of the accounts in between, the session re-reads them, re-applies its
+changes on top of the new balances, checks again with Check that no debit
+overdraws, and retries, up to max_retries times. Nothing is locked while a
+command is validated, so sessions that only read never hold up one that writes.
+
+to_dict()/from_dict() turn the session into plain data, so a session can be
+suspended in one worker and resumed in another that has the same accounts.
+"""
+
+from collections import OrderedDict
+
+from check import Check
+
+LOGOUT_RECORD = "00_________________________00000_00000.00__"
+
+
+class Session:
+    """
+    Login state and per-session caches for banking_system.
+    """
+
+    def __init__(self, users, store=None, cache_size=64, max_retries=8):
+        """
+        :param users: Dict (or dict-like view) of User objects keyed by account number.
+        :param store: Optional account store with balance()/apply(), as for banking_system.
+        :param cache_size: Maximum accounts kept in the per-session cache.
+        :param max_retries: Conflicting commits retried at most (versioned stores only).
+        """
+        self.users = users
+        self.store = store
+        self.cache_size = cache_size
+        self.max_retries = max_retries
+        self.optimistic = store is not None and hasattr(store, "compare_and_apply")
+        self.logged_in = False
+        self.session_type = None
+        self.current_user = None
+        self.totals = {}
+        self._accounts = OrderedDict()  # account number -> user, least recently used first
+        self._names = {}                # lower-case holder name -> user
+        self._fresh = set()             # accounts whose balance was read from the store this session
+        self._versions = {}             # account number -> version its balance was read at
+
+    # -- login state --------------------------------------------------------
+
+    def login(self, session_type, user=None):
+        self.logged_in = True
+        self.session_type = session_type
+        self.current_user = user
+
+    def end(self):
+        """ Clears the login state (after a logout or a terminating error). """
+        self.logged_in = False
+        self.session_type = None
+        self.current_user = None
+
+    def add_total(self, kind, amount):
+        """ Adds an accepted amount to the session's running total for kind (e.g. "withdrawal"). """
+        self.totals[kind] = self.totals.get(kind, 0.0) + amount
+
+    # -- account lookups ----------------------------------------------------
+
+    def _remember(self, account_number, user):
+        self._accounts[account_number] = user
+        self._accounts.move_to_end(account_number)
+        if len(self._accounts) > self.cache_size:
+            self._accounts.popitem(last=False)
+
+    def account(self, account_number):
+        """ The user with account_number; raises KeyError like users[...] if there is none. """
+        user = self._accounts.get(account_number)
+        if user is not None:
+            self._accounts.move_to_end(account_number)
+            return user
+        user = self.users[account_number]
+        self._remember(account_number, user)
+        return user
+
+    def has_account(self, account_number):
+        return account_number in self._accounts or account_number in self.users
+
+    def find_by_name(self, name):
+        """
+        The first user (in accounts order) whose holder name matches name, ignoring case,
+        or None. Matches are cached; misses are not, so new accounts are still found.
+        """
+        key = name.lower()
+        user = self._names.get(key)
+        if user is not None:
+            return user
+        for u in self.users.values():
+            if u.user_name.lower() == key:
+                self._names[key] = u
+                self._remember(u.account_number, u)
+                return u
+        return None
+
+    def invalidate(self):
+        """ Drops every cached lookup (after accounts were created or deleted). """
+        self._accounts.clear()
+        self._names.clear()
+        self._fresh.clear()
+        self._versions.clear()
+
+    # -- balances -----------------------------------------------------------
+
+    def refresh(self, *users):
+        """
+        Reads the balance of each user from the store the first time the session touches
+        it, and returns (user, balance) pairs to hand to commit() once the command has run.
+        """
+        if self.store is not None:
+            for u in users:
+                if u.account_number in self._fresh:
+                    continue
+                self._read(u)
+        return [(u, u.balance) for u in users]
+
+    def _read(self, user):
+        if self.optimistic:
+            found = self.store.read(user.account_number)
+            if found is None:
+                return
+            user.balance, self._versions[user.account_number] = found
+        else:
+            balance = self.store.balance(user.account_number)
+            if balance is None:
+                return
+            user.balance = balance
+        self._fresh.add(user.account_number)
+
+    def commit(self, before):
+        """
+        Sends the balance changes made since refresh() to the store. If the store refuses
+        them, local balances are rolled back, the accounts are re-read next time, and
+        False is returned.
+        """
+        if self.store is None:
+            return True
+        deltas = {}
+        for u, balance in before:
+            if u.balance != balance:
+                deltas[u.account_number] = deltas.get(u.account_number, 0.0) + (u.balance - balance)
+        if not deltas:
+            return True
+        if self.optimistic:
+            if self._compare_and_apply(before, deltas):
+                return True
+        elif self.store.apply(deltas):
+            return True
+        for u, balance in before:
+            u.balance = balance
+            self._fresh.discard(u.account_number)
+        return False
+
+    def _compare_and_apply(self, before, deltas):
+        """
+        Commits deltas against the versions the balances were read at, re-reading and
+        re-checking the accounts after each conflict. On success the local balances
+        are the committed ones.
+        """
+        from shared_accounts import APPLIED, CONFLICT
+
+        users = {u.account_number: u for u, _ in before}
+        check = Check()
+        for _ in range(self.max_retries + 1):
+            versions = {acct: self._versions[acct] for acct in deltas if acct in self._versions}
+            result = self.store.compare_and_apply(deltas, versions)
+            if result == APPLIED:
+                self._versions.update(versions)
+                return True
+            if result != CONFLICT:
+                return False
+            # Someone else got there first: start again from their balances.
+            for acct, delta in deltas.items():
+                u = users[acct]
+                found = self.store.read(acct)
+                if found is None:
+                    return False
+                u.balance, self._versions[acct] = found
+                if delta < 0 and not check.balance_check(u, -delta):
+                    return False
+                u.balance += delta
+        self.store.contention["retries_exhausted"] += 1
+        return False
+
+    # -- suspend / resume ---------------------------------------------------
+
+    def to_dict(self):
+        """ The session as plain data (caches are not included; they refill on resume). """
+        return {
+            "logged_in": self.logged_in,
+            "session_type": self.session_type,
+            "current_account": self.current_user.account_number if self.current_user is not None else None,
+            "totals": dict(self.totals),
+        }
+
+    @classmethod
+    def from_dict(cls, state, users, store=None):
+        """ Resumes a session saved by to_dict() against users (and optionally a store). """
+        session = cls(users, store)
+        session.logged_in = state["logged_in"]
+        session.session_type = state["session_type"]
+        if state["current_account"] is not None:
+            session.current_user = session.account(state["current_account"])
+        session.totals = dict(state["totals"])
+        return session
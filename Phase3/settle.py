@@ -0,0 +1,313 @@
+"""
+End-of-Day Settlement
+
+Works out each account's net position for a day from its transaction records,
+and the balances the accounts file should carry into the next day.
+
+Only the records that move money count (codes 01-04):
+  01 withdrawal   debits the account
+  02 transfer     debits the account, credits the target account
+  03 paybill      debits the account, credits the biller's company account
+  04 deposit      credits the account
+Create, delete, disable, changeplan and logout records move no money.
+The paybill records of a batch (batch_paybill.py) are the exception: their
+biller credits are in the <file>.credits beside them, one per biller per batch,
+so for a file that has one, 03 records only debit the payer and the billers
+are credited from the credits file, which is settled along with it (and
+skipped if it is also given on its own).
+
+Records are streamed: each file is read line by line and only per-account
+totals are kept, in a hash table of integer cents so nothing drifts. If the day
+touches more accounts than memory_limit allows for, the totals gathered so far
+are sorted by account and spilled to a temporary run file, and the table starts
+again empty. At the end the runs and what is left in the table are merged in
+account order (heapq.merge) and the totals of an account found in several of
+them are added up, so the result is the same whether anything spilled or not;
+only the memory used differs.
+
+The report lists every account that moved money, in account order:
+  account, opening balance, debits, credits, net, closing balance, records
+then the totals, and warnings for records that name an account missing from the
+accounts file and for accounts that would close below zero. The updated
+accounts file has the layout of the input, with the closing balances.
+
+With --seen=PATH, records are deduplicated by transaction ID (see txn_ids.py):
+a record whose ID is already in the seen-set at PATH is skipped, and once the
+balances are written (--balances) the IDs of every record settled are added to
+it, so settling the same file twice, or a session replayed under its original
+session ID, moves the money once. A run without --balances only previews the
+settlement and leaves the seen-set as it was. Two separate runs of one script are two sessions with their own
+IDs, and both are settled. Files
+without a complete .ids side file cannot be checked; they are settled as they
+are and named in a warning.
+
+How to Run:
+    python3 settle.py <accounts_file> <etf_file | log_dir> [...] [--report=PATH] [--balances=PATH]
+                      [--day=YYYY-MM-DD] [--memory-limit=BYTES] [--seen=PATH]
+
+The report goes to standard output unless --report is given; the updated
+accounts are only written with --balances. A <log_dir> is a directory written
+by txn_writer.TransactionWriter: every file in its manifest is settled, or only
+those of --day.
+"""
+
+import heapq
+import os
+import sys
+import tempfile
+
+from batch_paybill import credits_path
+from etf_records import parse_record
+from txn_ids import read_ids
+from txn_writer import manifest_files
+
+SETTLED_CODES = frozenset(("01", "02", "03", "04"))
+DEFAULT_MEMORY_LIMIT = 64 * 1024 * 1024
+# Rough cost of one account in the totals table: its dict slot, the account
+# number string and a list of three ints.
+ENTRY_BYTES = 240
+
+
+def _cents(amount):
+    return int(round(amount * 100))
+
+
+def _money(cents):
+    return f"{cents / 100:,.2f}"
+
+
+def _read_run(f):
+    for line in f:
+        account, debits, credits, records = line.split()
+        yield account, int(debits), int(credits), int(records)
+
+
+class SettlementAggregator:
+    """
+    Per-account debit and credit totals, spilled to sorted runs beyond a memory limit.
+    """
+
+    def __init__(self, memory_limit=DEFAULT_MEMORY_LIMIT, spill_dir=None):
+        """
+        :param memory_limit: Bytes the totals table may use before it is spilled.
+        :param spill_dir: Directory for run files (the system temporary directory by default).
+        """
+        self.max_entries = max(1, memory_limit // ENTRY_BYTES)
+        self.spill_dir = spill_dir
+        self.totals = {}    # account -> [debit cents, credit cents, records]
+        self.runs = []      # paths of the spilled runs, each sorted by account
+
+    def add(self, account, debit, credit):
+        entry = self.totals.get(account)
+        if entry is not None:
+            entry[0] += debit
+            entry[1] += credit
+            entry[2] += 1
+            return
+        if len(self.totals) >= self.max_entries:
+            self._spill()
+        self.totals[account] = [debit, credit, 1]
+
+    def _spill(self):
+        fd, path = tempfile.mkstemp(prefix="settle_run_", suffix=".txt", dir=self.spill_dir)
+        self.runs.append(path)
+        with os.fdopen(fd, "w") as f:
+            totals = self.totals
+            f.writelines(f"{account} {totals[account][0]} {totals[account][1]} {totals[account][2]}\n"
+                         for account in sorted(totals))
+        self.totals = {}
+
+    def results(self):
+        """
+        Yields (account, debit cents, credit cents, records) in account order, and
+        removes the run files once they are read.
+        """
+        in_memory = sorted((account, *entry) for account, entry in self.totals.items())
+        self.totals = {}
+        if not self.runs:
+            yield from in_memory
+            return
+        files = [open(path) for path in self.runs]
+        try:
+            current = None
+            for account, debits, credits, records in heapq.merge(in_memory, *(_read_run(f) for f in files)):
+                if current is not None and current[0] == account:
+                    current[1] += debits
+                    current[2] += credits
+                    current[3] += records
+                    continue
+                if current is not None:
+                    yield tuple(current)
+                current = [account, debits, credits, records]
+            if current is not None:
+                yield tuple(current)
+        finally:
+            for f in files:
+                f.close()
+            for path in self.runs:
+                os.remove(path)
+            self.runs = []
+
+
+def settle(users, paths, report, memory_limit=DEFAULT_MEMORY_LIMIT, spill_dir=None, seen=None,
+           settled_ids=None):
+    """
+    Settles the records in paths against users, changing their balances to the closing
+    balances and writing the report to the open file report. With seen (a txn_ids.SeenSet),
+    records whose transaction ID it already holds, or that came earlier in this run, are
+    skipped. seen itself is not changed: the IDs of the records settled are added to the
+    set settled_ids, for the caller to add to seen once the balances are kept.
+    Returns (records settled, accounts settled, runs spilled).
+    """
+    aggregator = SettlementAggregator(memory_limit, spill_dir)
+    add = aggregator.add
+    records = duplicates = 0
+    unidentified = []
+    if settled_ids is None:
+        settled_ids = set()
+    settled_with_batch = {credits_path(path) for path in paths}
+    for path in paths:
+        if path in settled_with_batch:
+            continue
+        ids = None
+        if seen is not None:
+            ids = read_ids(path)
+            if ids is None:
+                unidentified.append(path)
+        batch_credits = credits_path(path)
+        if not os.path.exists(batch_credits):
+            batch_credits = None
+        with open(path) as f:
+            for number, line in enumerate(f):
+                if line[:2] not in SETTLED_CODES:
+                    continue
+                if ids is not None:
+                    txn_id = ids[number]
+                    if txn_id in settled_ids or txn_id in seen:
+                        duplicates += 1
+                        continue
+                    settled_ids.add(txn_id)
+                record = parse_record(line)
+                if record is None:
+                    continue
+                records += 1
+                cents = _cents(record.amount)
+                if record.code == "04":
+                    add(record.account, 0, cents)
+                    continue
+                add(record.account, cents, 0)
+                if record.code == "02" or (record.code == "03" and batch_credits is None):
+                    # Transfer target or biller company account.
+                    add(record.extra, 0, cents)
+        if batch_credits is not None:
+            with open(batch_credits) as f:
+                for line in f:
+                    record = parse_record(line)
+                    if record is not None and record.code == "04":
+                        records += 1
+                        add(record.account, 0, _cents(record.amount))
+    spilled = len(aggregator.runs)
+
+    report.write(f"{'ACCOUNT':<7} {'OPENING':>14} {'DEBITS':>14} {'CREDITS':>14} {'NET':>14} "
+                 f"{'CLOSING':>14} {'RECORDS':>7}\n")
+    accounts = total_debits = total_credits = 0
+    unknown, negative = [], []
+    for account, debits, credits, count in aggregator.results():
+        accounts += 1
+        total_debits += debits
+        total_credits += credits
+        net = credits - debits
+        user = users.get(account)
+        if user is None:
+            unknown.append(account)
+            opening = closing = "-"
+        else:
+            opening_cents = _cents(user.balance)
+            closing_cents = opening_cents + net
+            user.balance = closing_cents / 100
+            if closing_cents < 0:
+                negative.append(account)
+            opening, closing = _money(opening_cents), _money(closing_cents)
+        report.write(f"{account:<7} {opening:>14} {_money(debits):>14} {_money(credits):>14} {_money(net):>14} "
+                     f"{closing:>14} {count:>7}\n")
+    report.write(f"{'TOTAL':<7} {'':>14} {_money(total_debits):>14} {_money(total_credits):>14} "
+                 f"{_money(total_credits - total_debits):>14} {'':>14} {records:>7}\n")
+    if duplicates:
+        report.write(f"Skipped {duplicates} records already settled (same transaction ID).\n")
+    for path in unidentified:
+        report.write(f"Warning: {path} has no transaction IDs; its records were settled without a duplicate check.\n")
+    for account in unknown:
+        report.write(f"Warning: account {account} is not in the accounts file; its movements were not applied.\n")
+    for account in negative:
+        report.write(f"Warning: account {account} closes below zero.\n")
+    return records, accounts, spilled
+
+
+def write_accounts(users, path):
+    """ Writes users in the current accounts file layout, ending with the END_OF_FILE record. """
+    with open(path, "w") as f:
+        for user in users.values():
+            name = user.user_name.replace(" ", "_")[:21].ljust(23, "_")
+            f.write(f"{user.account_number}_{name}{user.availability}_{user.balance:08.2f}\n")
+        f.write("END_OF_FILE___________________A_00000.00")
+
+
+def _sources(args, day):
+    paths = []
+    for arg in args:
+        paths.extend(manifest_files(arg, day) if os.path.isdir(arg) else [arg])
+    return paths
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python3 settle.py <accounts_file> <etf_file | log_dir> [...] [--report=PATH] "
+              "[--balances=PATH] [--day=YYYY-MM-DD] [--memory-limit=BYTES] [--seen=PATH]")
+        sys.exit(1)
+
+    from main import load_users
+
+    accounts_file = sys.argv[1]
+    report_path = balances_path = day = seen_path = None
+    memory_limit = DEFAULT_MEMORY_LIMIT
+    sources = []
+    for arg in sys.argv[2:]:
+        if arg.startswith("--report="):
+            report_path = arg.split("=", 1)[1]
+        elif arg.startswith("--balances="):
+            balances_path = arg.split("=", 1)[1]
+        elif arg.startswith("--day="):
+            day = arg.split("=", 1)[1]
+        elif arg.startswith("--memory-limit="):
+            memory_limit = int(arg.split("=", 1)[1])
+        elif arg.startswith("--seen="):
+            seen_path = arg.split("=", 1)[1]
+        else:
+            sources.append(arg)
+
+    users = load_users(accounts_file)
+    paths = _sources(sources, day)
+    seen = None
+    settled_ids = set()
+    if seen_path is not None:
+        from txn_ids import SeenSet
+        seen = SeenSet(seen_path)
+    try:
+        if report_path is None:
+            records, accounts, spilled = settle(users, paths, sys.stdout, memory_limit, seen=seen,
+                                                settled_ids=settled_ids)
+        else:
+            with open(report_path, "w") as report:
+                records, accounts, spilled = settle(users, paths, report, memory_limit, seen=seen,
+                                                    settled_ids=settled_ids)
+        if balances_path is not None:
+            write_accounts(users, balances_path)
+            # Only now are the records settled for good; a preview leaves them unseen.
+            if seen is not None:
+                for txn_id in settled_ids:
+                    seen.add(txn_id)
+    finally:
+        if seen is not None:
+            seen.close()
+    print(f"Settled {records} records from {len(paths)} files across {accounts} accounts"
+          + (f" ({spilled} runs spilled)." if spilled else "."), file=sys.stderr if report_path is None else sys.stdout)
@@ -0,0 +1,267 @@
+"""
+Sharded Account Store
+
+Partitions account balances across N worker processes by account-number range,
+so no single process has to hold (or serialize access to) the whole table.
+
+Each shard owns a contiguous range of account numbers and answers requests over
+its own pipe. A balance change that touches one shard is applied there in one
+step; a change spanning shards (e.g. a transfer between ranges) uses a two-phase
+protocol:
+  1. prepare - every shard involved checks its accounts and reserves the debits.
+  2. commit  - credits are applied and reservations dropped, or
+     abort   - reserved debits are put back if any shard refused.
+
+A balance change is described as a dict of {account_number: delta}, e.g. a
+transfer of 100.00 from 00003 to 00006 is {"00003": -100.0, "00006": 100.0}.
+"""
+
+import bisect
+import itertools
+import multiprocessing
+import threading
+
+
+def _check_deltas(balances, deltas):
+    """ True if every account exists and no debit would take a balance below zero. """
+    for acct, delta in deltas.items():
+        if acct not in balances:
+            return False
+        if delta < 0 and balances[acct] + delta < 0:
+            return False
+    return True
+
+
+def _run_op(balances, pending, op, args):
+    """ Executes one request against a shard's balances. """
+    if op == "get":
+        return balances.get(args)
+
+    if op == "apply":
+        if not _check_deltas(balances, args):
+            return False
+        for acct, delta in args.items():
+            balances[acct] += delta
+        return True
+
+    if op == "prepare":
+        txn_id, deltas = args
+        if not _check_deltas(balances, deltas):
+            return False
+        # Debits are taken now so nothing else can spend the reserved funds;
+        # credits only become visible on commit.
+        for acct, delta in deltas.items():
+            if delta < 0:
+                balances[acct] += delta
+        pending[txn_id] = deltas
+        return True
+
+    if op == "commit":
+        deltas = pending.pop(args, {})
+        for acct, delta in deltas.items():
+            if delta > 0:
+                balances[acct] += delta
+        return True
+
+    if op == "abort":
+        deltas = pending.pop(args, {})
+        for acct, delta in deltas.items():
+            if delta < 0:
+                balances[acct] -= delta
+        return True
+
+    if op == "batch":
+        return [_run_op(balances, pending, "apply", deltas) for deltas in args]
+
+    if op == "prepare_batch":
+        return [_run_op(balances, pending, "prepare", entry) for entry in args]
+
+    if op == "finish_batch":
+        for txn_id, ok in args:
+            _run_op(balances, pending, "commit" if ok else "abort", txn_id)
+        return True
+
+    if op == "snapshot":
+        return dict(balances)
+
+    raise ValueError(f"Unknown shard operation: {op}")
+
+
+def _shard_worker(conn, balances):
+    """ Main loop of one shard process: serve requests until told to stop. """
+    pending = {}
+    while True:
+        op, args = conn.recv()
+        if op == "stop":
+            conn.close()
+            return
+        conn.send(_run_op(balances, pending, op, args))
+
+
+class ShardedAccountStore:
+    """
+    Holds account balances in num_shards worker processes, split by account-number range.
+    """
+
+    def __init__(self, users, num_shards=2):
+        """
+        :param users: Dict of User objects keyed by account number (as returned by load_users).
+        :param num_shards: Number of worker processes to split the accounts across.
+        """
+        accounts = sorted(users)
+        num_shards = max(1, min(num_shards, len(accounts) or 1))
+        per_shard = -(-len(accounts) // num_shards) if accounts else 1
+
+        # Lowest account number owned by shards 1..N-1; shard 0 owns everything below.
+        self.bounds = [accounts[k * per_shard] for k in range(1, num_shards)
+                       if k * per_shard < len(accounts)]
+        self.num_shards = len(self.bounds) + 1
+
+        self._conns = []
+        self._locks = []
+        self._procs = []
+        self._txn_ids = itertools.count(1)
+        for k in range(self.num_shards):
+            hi = len(accounts) if k == self.num_shards - 1 else (k + 1) * per_shard
+            balances = {acct: float(users[acct].balance) for acct in accounts[k * per_shard:hi]}
+
+            parent_conn, child_conn = multiprocessing.Pipe()
+            proc = multiprocessing.Process(target=_shard_worker, args=(child_conn, balances), daemon=True)
+            proc.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._locks.append(threading.Lock())
+            self._procs.append(proc)
+
+    def shard_for(self, account_number):
+        """ Returns the index of the shard that owns account_number. """
+        return bisect.bisect_right(self.bounds, account_number)
+
+    def _call(self, shard, op, args=None):
+        with self._locks[shard]:
+            self._conns[shard].send((op, args))
+            return self._conns[shard].recv()
+
+    def _split(self, deltas):
+        by_shard = {}
+        for acct, delta in deltas.items():
+            by_shard.setdefault(self.shard_for(acct), {})[acct] = delta
+        return by_shard
+
+    def balance(self, account_number):
+        """ Current balance of an account, or None if no shard owns it. """
+        return self._call(self.shard_for(account_number), "get", account_number)
+
+    def apply(self, deltas):
+        """
+        Atomically applies {account_number: delta}. Returns True on success, False if
+        any account is unknown or would go negative (in which case nothing changes).
+        """
+        by_shard = self._split(deltas)
+        if len(by_shard) == 1:
+            (shard, shard_deltas), = by_shard.items()
+            return self._call(shard, "apply", shard_deltas)
+
+        txn_id = next(self._txn_ids)
+        prepared = []
+        for shard in sorted(by_shard):
+            if not self._call(shard, "prepare", (txn_id, by_shard[shard])):
+                for done in prepared:
+                    self._call(done, "abort", txn_id)
+                return False
+            prepared.append(shard)
+        for shard in prepared:
+            self._call(shard, "commit", txn_id)
+        return True
+
+    def transfer(self, from_account, to_account, amount):
+        """ Moves amount between two accounts, across shards if needed. """
+        return self.apply({from_account: -amount, to_account: amount})
+
+    def _scatter(self, requests):
+        """
+        Sends one request to each shard in requests ({shard: (op, args)}) before waiting
+        on any reply, so the shards work in parallel. Returns {shard: reply}.
+        """
+        # Always lock in shard order so concurrent callers cannot deadlock.
+        shards = sorted(requests)
+        for shard in shards:
+            self._locks[shard].acquire()
+        try:
+            for shard in shards:
+                self._conns[shard].send(requests[shard])
+            return {shard: self._conns[shard].recv() for shard in shards}
+        finally:
+            for shard in shards:
+                self._locks[shard].release()
+
+    def apply_batch(self, batch):
+        """
+        Applies a list of delta dicts, returning a list of True/False results in order.
+
+        Single-shard entries are applied first, each shard working through its share in
+        parallel. Cross-shard entries are then run through the two-phase protocol as a
+        group: one prepare round and one commit/abort round per shard for the whole batch.
+        """
+        results = [None] * len(batch)
+        single = {}
+        cross = {}
+        cross_parts = {}
+        for pos, deltas in enumerate(batch):
+            by_shard = self._split(deltas)
+            if len(by_shard) == 1:
+                shard = next(iter(by_shard))
+                single.setdefault(shard, []).append((pos, deltas))
+            elif not by_shard:
+                results[pos] = True
+            else:
+                txn_id = next(self._txn_ids)
+                cross_parts[txn_id] = pos
+                for shard, shard_deltas in by_shard.items():
+                    cross.setdefault(shard, []).append((txn_id, shard_deltas))
+
+        if single:
+            replies = self._scatter({shard: ("batch", [d for _, d in entries])
+                                     for shard, entries in single.items()})
+            for shard, entries in single.items():
+                for (pos, _), ok in zip(entries, replies[shard]):
+                    results[pos] = ok
+
+        if cross:
+            replies = self._scatter({shard: ("prepare_batch", entries)
+                                     for shard, entries in cross.items()})
+            outcome = dict.fromkeys(cross_parts, True)
+            for shard, entries in cross.items():
+                for (txn_id, _), ok in zip(entries, replies[shard]):
+                    outcome[txn_id] = outcome[txn_id] and ok
+            self._scatter({shard: ("finish_batch", [(txn_id, outcome[txn_id]) for txn_id, _ in entries])
+                           for shard, entries in cross.items()})
+            for txn_id, pos in cross_parts.items():
+                results[pos] = outcome[txn_id]
+        return results
+
+    def snapshot(self):
+        """ Returns every balance from every shard as one dict. """
+        merged = {}
+        for shard in range(self.num_shards):
+            merged.update(self._call(shard, "snapshot"))
+        return merged
+
+    def close(self):
+        """ Stops all shard processes. """
+        for conn, lock in zip(self._conns, self._locks):
+            with lock:
+                try:
+                    conn.send(("stop", None))
+                except (BrokenPipeError, OSError):
+                    pass
+                conn.close()
+        for proc in self._procs:
+            proc.join(timeout=5)
+        self._conns, self._locks, self._procs = [], [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,622 @@
+"""
+Shared-Memory Account Table
+
+Places the account table in one multiprocessing.shared_memory block so several
+front end processes (one per terminal) work on a single copy of every account
+instead of each loading and mutating its own.
+
+Block layout (all little-endian):
+  header : magic "ACCT", row count (uint32), row capacity (uint32),
+           stripes per hot account (uint16), hot account count (uint16)
+  rows   : fixed 48-byte records
+             number  5 bytes   account number
+             name   21 bytes   account holder name, NUL padded
+             status  1 byte    "A" active, "D" disabled, "X" deleted
+             plan    2 bytes   "SP" / "NP" (blank means the default SP)
+             balance 8 bytes   signed integer cents
+             version 8 bytes   unsigned, even when stable, odd while being written
+  hot    : one entry per hot account: account number (5 bytes, 3 padding) and
+           one signed cents counter (8 bytes) per stripe
+
+Each row has its own lock, taken as a one-byte fcntl range lock on a companion
+lock file, so unrelated processes can lock rows without a shared parent. Balance
+changes go through apply(), which locks every row involved, re-checks that no
+balance would go negative and writes the new cents values in one step.
+
+Hot accounts: the biller company accounts receive a credit from every paybill in
+every session, so a single row lock on them would serialize all terminals. An
+account designated hot at creation (by default every company account in the
+biller registry) gets striped counters: a credit only locks and bumps one stripe,
+picked from the process and thread, so concurrent credits mostly touch different
+locks. Its balance is the row plus the sum of its stripes. A debit from a hot
+account, and merge_hot(), first fold the stripes back into the row while holding
+the row and all its stripes.
+
+Versions: every change to a row (balance, status, plan) runs under its row lock
+and bumps the row's version twice, to odd before writing and back to even after.
+read() takes no lock at all: it reads the version, the row and the version again,
+and retries if a write was in progress or happened in between, so sessions that
+only read balances never wait on, or hold up, a writer. compare_and_apply() is
+the optimistic commit: it locks the rows only to compare their versions with the
+ones the caller read and to write the new balances. Validation runs before it,
+lock-free, and a conflict is returned to the caller to re-read and retry (see
+Session.commit()). Credits to a hot account's stripe skip the comparison, since
+credits commute. The contention counters (contention) count reads, read
+retries, commits, conflicts and commits given up after too many conflicts, for
+this process.
+
+Creation is published last: the creator writes the header with a blank magic,
+fills in the rows and hot accounts, and writes "ACCT" over the magic only then.
+attach() polls (up to attach_timeout seconds) until the block exists, has its
+size and carries the magic, so a front end that starts while another is still
+building the table waits for it instead of failing or reading half a table.
+
+SharedAccountTable exposes the same balance()/apply() interface as
+ShardedAccountStore, so banking_system can use it as its store.
+"""
+
+import errno
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; rows are then only locked per process
+    fcntl = None
+
+MAGIC = b"ACCT"
+PENDING = b"\0\0\0\0"     # magic of a table whose creator is still filling it
+ATTACH_TIMEOUT = 5.0
+HEADER = struct.Struct("<4sIIHH")
+ROW = struct.Struct("<5s21s1s2s3xqQ")
+BALANCE = struct.Struct("<q")
+VERSION = struct.Struct("<Q")
+VERSION_OFFSET = ROW.size - VERSION.size
+BALANCE_OFFSET = VERSION_OFFSET - BALANCE.size
+STATUS_OFFSET = 5 + 21
+PLAN_OFFSET = STATUS_OFFSET + 1
+DELETED = b"X"
+HOT_KEY = struct.Struct("<5s3x")
+DEFAULT_STRIPES = 8
+
+# compare_and_apply() results.
+APPLIED, REFUSED, CONFLICT = 1, 0, -1
+
+
+def _to_cents(amount):
+    return int(round(float(amount) * 100))
+
+
+def _field(account, name):
+    """ Reads a field from a User-like object or from the dict Create builds. """
+    if isinstance(account, dict):
+        return account.get(name)
+    return getattr(account, name, None)
+
+
+class SharedAccountTable:
+    """
+    Fixed-width account table in shared memory with per-row locks.
+    """
+
+    def __init__(self, shm, owner, published=True):
+        """
+        :param shm: The shared memory block.
+        :param owner: Unlink the block when this table is closed.
+        :param published: False only while create() is filling the table.
+        """
+        self._shm = shm
+        self._buf = shm.buf
+        self._owner = owner
+        self.name = shm.name
+
+        magic, _, self.capacity, self.stripes, hot_count = HEADER.unpack_from(self._buf, 0)
+        if magic != (MAGIC if published else PENDING):
+            raise ValueError(f"Shared memory block '{shm.name}' is not an account table.")
+
+        self._lock_fd = os.open(os.path.join(tempfile.gettempdir(), f"{shm.name}.lock"),
+                                os.O_RDWR | os.O_CREAT, 0o600)
+        # fcntl locks do not exclude threads of the same process, so each lock byte
+        # also gets a thread lock (created on first use).
+        self._thread_locks = {}
+        self._thread_locks_guard = threading.Lock()
+        self._index = {}
+        self._indexed = 0
+
+        self._hot = {}  # account number -> hot entry index
+        self.contention = dict.fromkeys(("reads", "read_retries", "commits", "conflicts", "retries_exhausted"), 0)
+        for slot in range(hot_count):
+            number = HOT_KEY.unpack_from(self._buf, self._hot_offset(slot))[0].decode()
+            self._hot[number] = slot
+
+    @classmethod
+    def create(cls, name, users, capacity=None, persist=False, hot_accounts=None, stripes=DEFAULT_STRIPES):
+        """
+        Creates a new shared table called name, filled from a dict of User objects.
+
+        :param capacity: Maximum number of rows (defaults to twice the current account count,
+                         leaving room for accounts created while the table is live).
+        :param persist: Keep the table after this process exits (remove it with remove()).
+        :param hot_accounts: Accounts that get striped balance counters. Defaults to the
+                             company accounts of the biller registry; pass () for none.
+        :param stripes: Counters per hot account.
+        """
+        if hot_accounts is None:
+            from billers import registry
+            hot_accounts = registry().codes
+        hot_accounts = sorted(acct for acct in set(hot_accounts) if acct in users)
+        stripes = max(stripes, 1)
+        capacity = max(capacity or 2 * len(users), len(users), 1)
+        hot_size = len(hot_accounts) * (HOT_KEY.size + stripes * BALANCE.size)
+        shm = shared_memory.SharedMemory(name=name, create=True,
+                                         size=HEADER.size + capacity * ROW.size + hot_size)
+        if persist:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        HEADER.pack_into(shm.buf, 0, PENDING, 0, capacity, stripes, len(hot_accounts))
+        entry = HOT_KEY.size + stripes * BALANCE.size
+        for slot, acct in enumerate(hot_accounts):
+            HOT_KEY.pack_into(shm.buf, HEADER.size + capacity * ROW.size + slot * entry, acct.encode())
+        table = cls(shm, owner=not persist, published=False)
+        for acct in sorted(users):
+            table._append(users[acct])
+        # Publish: attach() accepts the table from here on.
+        shm.buf[:len(MAGIC)] = MAGIC
+        return table
+
+    @classmethod
+    def attach(cls, name, timeout=ATTACH_TIMEOUT):
+        """
+        Attaches to a table another process created; nothing is loaded or parsed.
+        Waits up to timeout seconds for a table that is still being created.
+        Raises FileNotFoundError if there is no such table, and ValueError if it is
+        not an account table or is not finished in time.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+                break
+            except ValueError:
+                # Created but not yet sized ("cannot mmap an empty file").
+                if time.monotonic() >= deadline:
+                    raise ValueError(f"Shared memory block '{name}' was never sized.") from None
+                time.sleep(0.001)
+        # Only the creator may unlink the block; stop this process's tracker doing it at exit.
+        resource_tracker.unregister(shm._name, "shared_memory")
+        while bytes(shm.buf[:len(MAGIC)]) == PENDING and time.monotonic() < deadline:
+            time.sleep(0.001)
+        if bytes(shm.buf[:len(MAGIC)]) == PENDING:
+            shm.close()
+            raise ValueError(f"Shared memory block '{name}' is still being created after {timeout:g} s "
+                             f"(did its creator exit?).")
+        try:
+            return cls(shm, owner=False)
+        except ValueError:
+            shm.close()
+            raise
+
+    @classmethod
+    def open_or_create(cls, name, load, **options):
+        """
+        Attaches to table name, or creates it from load() if no process has yet.
+        A table created here outlives the process, so later front ends can attach to it.
+        """
+        try:
+            return cls.attach(name)
+        except FileNotFoundError:
+            pass
+        try:
+            return cls.create(name, load(), persist=True, **options)
+        except FileExistsError:
+            # Another front end created it first.
+            return cls.attach(name)
+
+    @staticmethod
+    def remove(name):
+        """ Removes a persistent table once no front end needs it any more. """
+        shm = shared_memory.SharedMemory(name=name)
+        shm.close()
+        shm.unlink()
+        try:
+            os.unlink(os.path.join(tempfile.gettempdir(), f"{name}.lock"))
+        except FileNotFoundError:
+            pass
+
+    # -- rows -------------------------------------------------------------
+
+    def _offset(self, row):
+        return HEADER.size + row * ROW.size
+
+    def _count(self):
+        return HEADER.unpack_from(self._buf, 0)[1]
+
+    def _hot_offset(self, slot):
+        return HEADER.size + self.capacity * ROW.size + slot * (HOT_KEY.size + self.stripes * BALANCE.size)
+
+    def _stripe_offset(self, slot, stripe):
+        return self._hot_offset(slot) + HOT_KEY.size + stripe * BALANCE.size
+
+    def _stripe_lock(self, slot, stripe):
+        """ Lock byte of a stripe; they follow the row lock bytes. """
+        return self.capacity + 1 + slot * self.stripes + stripe
+
+    def _my_stripe(self):
+        return hash((os.getpid(), threading.get_ident())) % self.stripes
+
+    def _stripe_total(self, slot):
+        return sum(BALANCE.unpack_from(self._buf, self._stripe_offset(slot, stripe))[0]
+                   for stripe in range(self.stripes))
+
+    def _read_row(self, row):
+        number, name, status, plan, cents, _ = ROW.unpack_from(self._buf, self._offset(row))
+        return number.decode(), name.rstrip(b"\0").decode(), status.decode(), plan.decode().strip(), cents
+
+    def _version(self, row):
+        return VERSION.unpack_from(self._buf, self._offset(row) + VERSION_OFFSET)[0]
+
+    @contextmanager
+    def _writing(self, row):
+        """ Marks a row as being written (odd version) for the duration. Needs the row lock. """
+        pos = self._offset(row) + VERSION_OFFSET
+        version = VERSION.unpack_from(self._buf, pos)[0]
+        VERSION.pack_into(self._buf, pos, version + 1)
+        try:
+            yield
+        finally:
+            VERSION.pack_into(self._buf, pos, version + 2)
+
+    def _refresh_index(self):
+        """ Indexes any rows appended (by any process) since the last call. """
+        count = self._count()
+        for row in range(self._indexed, count):
+            number = bytes(self._buf[self._offset(row):self._offset(row) + 5]).decode()
+            self._index[number] = row
+        self._indexed = count
+
+    def _row_of(self, account_number):
+        row = self._index.get(account_number)
+        if row is None and self._indexed < self._count():
+            self._refresh_index()
+            row = self._index.get(account_number)
+        if row is None or self._buf[self._offset(row) + STATUS_OFFSET] == DELETED[0]:
+            return None
+        return row
+
+    def _thread_lock(self, byte):
+        lock = self._thread_locks.get(byte)
+        if lock is None:
+            with self._thread_locks_guard:
+                lock = self._thread_locks.setdefault(byte, threading.Lock())
+        return lock
+
+    def _lockf(self, byte):
+        while True:
+            try:
+                fcntl.lockf(self._lock_fd, fcntl.LOCK_EX, 1, byte)
+                return
+            except OSError as error:
+                # The kernel treats all threads of a process as one lock owner, so two
+                # threads holding different bytes can look like a deadlock cycle. Bytes
+                # are always taken in ascending order, so a real cycle cannot happen.
+                if error.errno != errno.EDEADLK:
+                    raise
+                time.sleep(0.0005)
+
+    @contextmanager
+    def _lock_bytes(self, lock_bytes):
+        """
+        Holds the given lock bytes, always taken in ascending order so that row and
+        stripe locks can be mixed without deadlock.
+        """
+        lock_bytes = sorted(set(lock_bytes))
+        held = []
+        try:
+            for byte in lock_bytes:
+                self._thread_lock(byte).acquire()
+                held.append(byte)
+                if fcntl is not None:
+                    self._lockf(byte)
+            yield
+        finally:
+            for byte in reversed(held):
+                if fcntl is not None:
+                    fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, byte)
+                self._thread_lock(byte).release()
+
+    def lock_rows(self, rows):
+        """ Holds the locks of the given rows (taken in row order to avoid deadlock). """
+        # Byte 0 of the lock file guards the header; row n is byte n + 1.
+        return self._lock_bytes(row + 1 for row in rows)
+
+    def _fold(self, account_number, row):
+        """ Moves a hot account's stripes into its row. Needs the row and all its stripe locks. """
+        slot = self._hot[account_number]
+        total = 0
+        for stripe in range(self.stripes):
+            pos = self._stripe_offset(slot, stripe)
+            total += BALANCE.unpack_from(self._buf, pos)[0]
+            BALANCE.pack_into(self._buf, pos, 0)
+        pos = self._offset(row) + BALANCE_OFFSET
+        with self._writing(row):
+            BALANCE.pack_into(self._buf, pos, BALANCE.unpack_from(self._buf, pos)[0] + total)
+
+    def merge_hot(self, accounts=None):
+        """ Folds the stripes of hot accounts (all of them by default) back into their rows. """
+        for acct in (self._hot if accounts is None else accounts):
+            row = self._row_of(acct)
+            if row is None or acct not in self._hot:
+                continue
+            slot = self._hot[acct]
+            with self._lock_bytes([row + 1] + [self._stripe_lock(slot, s) for s in range(self.stripes)]):
+                self._fold(acct, row)
+
+    def _append(self, account):
+        with self.lock_rows([-1]):
+            count = self._count()
+            if count >= self.capacity:
+                raise ValueError("Shared account table is full.")
+            ROW.pack_into(
+                self._buf, self._offset(count),
+                str(_field(account, "account_number")).encode(),
+                str(_field(account, "user_name")).encode()[:21],
+                (_field(account, "availability") or "A").encode(),
+                (_field(account, "plan") or "").encode(),
+                _to_cents(_field(account, "balance") or 0),
+                0,
+            )
+            HEADER.pack_into(self._buf, 0, MAGIC, count + 1, self.capacity, self.stripes, len(self._hot))
+        self._refresh_index()
+
+    # -- store interface (same as ShardedAccountStore) ---------------------
+
+    def read(self, account_number):
+        """
+        (balance, version) of an account, or None if it does not exist. Takes no lock:
+        retries until it has seen the row between two writes.
+        """
+        row = self._row_of(account_number)
+        if row is None:
+            return None
+        slot = self._hot.get(account_number)
+        pos = self._offset(row)
+        self.contention["reads"] += 1
+        while True:
+            version = VERSION.unpack_from(self._buf, pos + VERSION_OFFSET)[0]
+            if not version & 1:
+                cents = BALANCE.unpack_from(self._buf, pos + BALANCE_OFFSET)[0]
+                if slot is not None:
+                    cents += self._stripe_total(slot)
+                if VERSION.unpack_from(self._buf, pos + VERSION_OFFSET)[0] == version:
+                    return cents / 100, version
+            self.contention["read_retries"] += 1
+            time.sleep(0)
+
+    def balance(self, account_number):
+        """ Current balance of an account, or None if it does not exist. """
+        found = self.read(account_number)
+        return found[0] if found is not None else None
+
+    def apply(self, deltas):
+        """
+        Atomically applies {account_number: delta}. Returns False (changing nothing) if
+        any account is unknown or would go negative.
+        """
+        return self._apply(deltas, None) == APPLIED
+
+    def compare_and_apply(self, deltas, versions):
+        """
+        Applies {account_number: delta} only if every account in versions is still at
+        the version read() returned for it. Returns APPLIED, REFUSED (an account is
+        unknown or would go negative) or CONFLICT (a row changed since it was read);
+        nothing changes unless it is APPLIED, in which case versions is updated to the
+        rows' new versions.
+        """
+        self.contention["commits"] += 1
+        result = self._apply(deltas, versions)
+        if result == CONFLICT:
+            self.contention["conflicts"] += 1
+        return result
+
+    def _apply(self, deltas, versions):
+        rows = {}
+        for acct in deltas:
+            row = self._row_of(acct)
+            if row is None:
+                return REFUSED
+            rows[acct] = row
+
+        # Credits to hot accounts only take this thread's stripe; debits from them
+        # take the row and every stripe so the stripes can be folded in first.
+        lock_bytes, folds, stripe_credits = [], [], {}
+        stripe = self._my_stripe()
+        for acct, delta in deltas.items():
+            slot = self._hot.get(acct)
+            if slot is None:
+                lock_bytes.append(rows[acct] + 1)
+            elif delta >= 0:
+                lock_bytes.append(self._stripe_lock(slot, stripe))
+                stripe_credits[acct] = slot
+            else:
+                lock_bytes.append(rows[acct] + 1)
+                lock_bytes.extend(self._stripe_lock(slot, s) for s in range(self.stripes))
+                folds.append(acct)
+
+        with self._lock_bytes(lock_bytes):
+            if versions is not None:
+                for acct, version in versions.items():
+                    if acct in rows and acct not in stripe_credits and self._version(rows[acct]) != version:
+                        return CONFLICT
+            for acct in folds:
+                self._fold(acct, rows[acct])
+            new_cents = {}
+            written_rows = {}
+            for acct, delta in deltas.items():
+                if acct in stripe_credits:
+                    pos = self._stripe_offset(stripe_credits[acct], stripe)
+                else:
+                    pos = self._offset(rows[acct]) + BALANCE_OFFSET
+                    written_rows[pos] = rows[acct]
+                cents = new_cents.get(pos, BALANCE.unpack_from(self._buf, pos)[0]) + _to_cents(delta)
+                if delta < 0 and cents < 0:
+                    return REFUSED
+                new_cents[pos] = cents
+            for pos, cents in new_cents.items():
+                row = written_rows.get(pos)
+                if row is None:
+                    BALANCE.pack_into(self._buf, pos, cents)
+                else:
+                    with self._writing(row):
+                        BALANCE.pack_into(self._buf, pos, cents)
+            if versions is not None:
+                for acct in versions:
+                    if acct in rows and acct not in stripe_credits:
+                        versions[acct] = self._version(rows[acct])
+        return APPLIED
+
+    def transfer(self, from_account, to_account, amount):
+        """ Moves amount between two accounts. """
+        return self.apply({from_account: -amount, to_account: amount})
+
+    # -- status / plan / membership ----------------------------------------
+
+    def _write_flag(self, account_number, offset, value, width):
+        row = self._row_of(account_number)
+        if row is None:
+            raise KeyError(account_number)
+        with self.lock_rows([row]), self._writing(row):
+            pos = self._offset(row) + offset
+            self._buf[pos:pos + width] = value.encode().ljust(width)[:width]
+
+    def delete(self, account_number):
+        """ Marks an account deleted in every process. """
+        self._write_flag(account_number, STATUS_OFFSET, DELETED.decode(), 1)
+
+    def users(self):
+        """ Returns a dict-like view of the table usable as banking_system's users. """
+        return SharedAccountsView(self)
+
+    def close(self):
+        """ Detaches this process; the creating process also removes the block. """
+        self.merge_hot()
+        os.close(self._lock_fd)
+        self._buf = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+            try:
+                os.unlink(os.path.join(tempfile.gettempdir(), f"{self.name}.lock"))
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class SharedUser:
+    """
+    A User backed by one table row.
+
+    Status and plan read and write the shared row directly. The balance is a working
+    copy for the current command: banking_system refreshes it from the table before a
+    money command and commits the change back through SharedAccountTable.apply().
+    """
+
+    def __init__(self, table, account_number, user_name, cents):
+        self._table = table
+        self.account_number = account_number
+        self.user_name = user_name
+        self.balance = cents / 100
+        self.user_type = "standard"
+
+    @property
+    def availability(self):
+        row = self._table._row_of(self.account_number)
+        if row is None:
+            return DELETED.decode()
+        return self._table._read_row(row)[2]
+
+    @availability.setter
+    def availability(self, value):
+        self._table._write_flag(self.account_number, STATUS_OFFSET, value, 1)
+
+    @property
+    def plan(self):
+        row = self._table._row_of(self.account_number)
+        plan = self._table._read_row(row)[3] if row is not None else ""
+        return plan or "SP"
+
+    @plan.setter
+    def plan(self, value):
+        self._table._write_flag(self.account_number, PLAN_OFFSET, value, 2)
+
+
+class SharedAccountsView(MutableMapping):
+    """
+    Dict of SharedUser objects keyed by account number, backed by a SharedAccountTable.
+
+    Users are built on first access and then reused for the rest of the session, so
+    a front end attaching to the table pays nothing for accounts it never touches.
+    """
+
+    def __init__(self, table):
+        self._table = table
+        self._cache = {}
+
+    def __getitem__(self, account_number):
+        user = self._cache.get(account_number)
+        if user is not None and self._table._row_of(account_number) is not None:
+            return user
+        row = self._table._row_of(account_number)
+        if row is None:
+            self._cache.pop(account_number, None)
+            raise KeyError(account_number)
+        acct, name, _, _, cents = self._table._read_row(row)
+        user = self._cache[account_number] = SharedUser(self._table, acct, name, cents)
+        return user
+
+    def __setitem__(self, account_number, account):
+        if self._table._row_of(account_number) is not None:
+            raise KeyError(f"Account {account_number} already exists.")
+        self._table._append(account)
+
+    def __delitem__(self, account_number):
+        self._table.delete(account_number)
+        self._cache.pop(account_number, None)
+
+    def __iter__(self):
+        self._table._refresh_index()
+        return iter([acct for acct in list(self._table._index) if self._table._row_of(acct) is not None])
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+if __name__ == "__main__":
+    """
+    Manage a persistent shared table outside of any session, e.g.:
+        python3 shared_accounts.py create bank current_accounts_file.txt
+        python3 shared_accounts.py merge bank
+        python3 shared_accounts.py remove bank
+    """
+    import sys
+
+    if len(sys.argv) < 3 or sys.argv[1] not in ("create", "merge", "remove") or (sys.argv[1] == "create" and len(sys.argv) < 4):
+        print("Usage: python3 shared_accounts.py create <name> <accounts_file> | merge <name> | remove <name>")
+        sys.exit(1)
+
+    if sys.argv[1] == "create":
+        from main import load_users
+        SharedAccountTable.create(sys.argv[2], load_users(sys.argv[3]), persist=True).close()
+    elif sys.argv[1] == "merge":
+        SharedAccountTable.attach(sys.argv[2]).close()  # close() folds every hot account
+    else:
+        SharedAccountTable.remove(sys.argv[2])
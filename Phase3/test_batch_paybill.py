@@ -0,0 +1,78 @@
+"""
+Tests: Batch Paybill
+
+A batch's payments are checked by the paybill rules (batch_paybill.py), and
+settling the batch (settle.py) credits each biller once for every payment.
+
+How to Run:
+    python3 -m unittest test_batch_paybill
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import batch_paybill
+import billers
+from main import load_users
+from settle import settle
+
+PAYMENTS = [
+    ("00003", "EC", "100"),
+    ("00001", "CQ", "50"),
+    ("00003", "EC", "25"),
+    ("00003", "XX", "5"),
+    ("00003", "EC", "abc"),
+    ("00001", "EC", "1960"),
+]
+
+
+class BatchPaybillTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="test_batch_paybill_")
+        self.etf = os.path.join(self.dir, "batch.etf")
+        self.messages = []
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_rules(self):
+        accepted, rejected = batch_paybill.run_batches(load_users("current_accounts_file.txt"), PAYMENTS, self.etf,
+                                                       write_console=self.messages.append)
+        self.assertEqual((accepted, rejected), (3, 3))
+        self.assertEqual(self.messages, [
+            "Error: 'XX' is not a recognized biller. Please use EC, CQ, or FI.",
+            "Error: Invalid payment amount. Amount must be numeric.",
+            "Error: Maximum paybill limit exceeded. You can paybill up to $1950.00 in this session.",
+        ])
+
+    def test_unknown_biller_lists_registry(self):
+        path = os.path.join(self.dir, "billers.txt")
+        with open(path, "w") as f:
+            f.write("EC_10000_Electric\nWA_40000_Water_Works\nEND_OF_FILE\n")
+        shared, billers._registry = billers._registry, billers.BillerRegistry(path)
+        try:
+            batch_paybill.run_batches(load_users("current_accounts_file.txt"), [("00003", "XX", "5")], self.etf,
+                                      write_console=self.messages.append)
+        finally:
+            billers._registry = shared
+        self.assertEqual(self.messages, ["Error: 'XX' is not a recognized biller. Please use EC or WA."])
+
+    def test_settle_credits_billers_once(self):
+        batch_paybill.run_batches(load_users("current_accounts_file.txt"), PAYMENTS, self.etf,
+                                  write_console=self.messages.append)
+        users = load_users("current_accounts_file.txt")
+        opening = {account: users[account].balance for account in ("00001", "00003", "10000", "20000")}
+        # The credits file comes with the transaction file, whether or not it is named too.
+        settle(users, [self.etf, batch_paybill.credits_path(self.etf)], io.StringIO())
+        self.assertEqual(users["00003"].balance, opening["00003"] - 125)
+        self.assertEqual(users["00001"].balance, opening["00001"] - 50)
+        self.assertEqual(users["10000"].balance, opening["10000"] + 125)
+        self.assertEqual(users["20000"].balance, opening["20000"] + 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
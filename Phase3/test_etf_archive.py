@@ -0,0 +1,55 @@
+"""
+Tests: Transaction Archive
+
+An account query (etf_archive.py) finds the records on both sides of a
+transfer or paybill, from the block index and in the records it yields.
+
+How to Run:
+    python3 -m unittest test_etf_archive
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from etf_archive import ArchiveReader, ArchiveWriter
+
+DAY_1 = [
+    "02_Dev_Thaker____________00001_3.00_00013",
+    "01_Dev_Thaker____________00001_5.00",
+]
+DAY_2 = [
+    "03_Xuan_Zheng____________00003_100.00_10000",
+    "04_Elon_Trust_______________00013_00020.00__",
+]
+
+
+class AccountQueryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="test_etf_archive_")
+        self.path = os.path.join(self.dir, "history.etfa")
+        with ArchiveWriter(self.path, block_records=2) as writer:
+            for day, lines in (("2026-01-01", DAY_1), ("2026-01-02", DAY_2)):
+                for line in lines:
+                    writer.add(day, line)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def query(self, account):
+        return [line for _, line in ArchiveReader(self.path).records(account=account)]
+
+    def test_transfer_target(self):
+        self.assertEqual(self.query("00013"), [DAY_1[0], DAY_2[1]])
+
+    def test_biller_account(self):
+        self.assertEqual(self.query("10000"), [DAY_2[0]])
+
+    def test_payer(self):
+        self.assertEqual(self.query("00001"), DAY_1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Tests: Transaction File Merge and Sort
+
+Sorting or merging by account must keep each account's records in the order
+they happened (etf_merge.py), in memory, spilled to runs, and across files.
+
+How to Run:
+    python3 -m unittest test_etf_merge
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import etf_merge
+from etf_records import parse_record
+
+# One terminal's day: create 00013, deposit to it, then spend more than the deposit
+# alone; interleaved with another account whose records run in reverse code order.
+TERMINAL_1 = [
+    "05_Elon_Trust____________00013_05000.00__",
+    "04_Elon_Trust_______________00013_00100.00__",
+    "08_Dev_Thaker____________00001_00000.00_NP",
+    "01_Elon_Trust____________00013_150.00",
+    "04_Dev_Thaker_______________00001_00010.00__",
+    "01_Dev_Thaker____________00001_5.00",
+    "00_________________________00000_00000.00__",
+]
+TERMINAL_2 = [
+    "04_Elon_Trust_______________00013_00020.00__",
+    "02_Dev_Thaker____________00001_3.00_00013",
+    "01_Elon_Trust____________00013_20.00",
+    "00_________________________00000_00000.00__",
+]
+
+
+class ChronologyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="test_etf_merge_")
+        self.paths = []
+        for n, lines in enumerate((TERMINAL_1, TERMINAL_2)):
+            self.paths.append(os.path.join(self.dir, f"T{n}.etf"))
+            with open(self.paths[-1], "w") as f:
+                f.write("\n".join(lines) + "\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def expected(self, account):
+        """ account's records in time order: the first terminal's, then the second's. """
+        return [line + "\n" for line in TERMINAL_1 + TERMINAL_2
+                if not line.startswith("00_") and parse_record(line).account == account]
+
+    def check(self, output):
+        lines = output.getvalue().splitlines(keepends=True)
+        self.assertEqual(lines[-1], etf_merge.LOGOUT_RECORD + "\n")
+        accounts = [parse_record(line).account for line in lines[:-1]]
+        self.assertEqual(accounts, sorted(accounts))
+        for account in ("00001", "00013"):
+            self.assertEqual([line for line in lines if parse_record(line).account == account],
+                             self.expected(account))
+
+    def test_sort_in_memory(self):
+        out = io.StringIO()
+        etf_merge.external_sort(self.paths, out, spill_dir=self.dir)
+        self.check(out)
+
+    def test_sort_spilled(self):
+        # A limit of one record per run, merged two at a time: many runs and passes.
+        out = io.StringIO()
+        stats = etf_merge.external_sort(self.paths, out, memory_limit=1, fan_in=2, spill_dir=self.dir)
+        self.assertGreater(stats.runs, len(TERMINAL_1))
+        self.check(out)
+
+    def test_merge(self):
+        sorted_paths = []
+        for path in self.paths:
+            sorted_paths.append(path + ".sorted")
+            with open(sorted_paths[-1], "w") as out:
+                etf_merge.external_sort([path], out)
+        out = io.StringIO()
+        etf_merge.merge(sorted_paths, out, fan_in=2, spill_dir=self.dir)
+        self.check(out)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+"""
+Tests: Transaction Record Parsing
+
+parse_record() (etf_records.py) reads every record layout the transaction
+classes write, and rejects two records run together on one line.
+
+How to Run:
+    python3 -m unittest test_etf_records
+"""
+
+import unittest
+
+from etf_records import Record, parse_record
+
+
+class ParseRecordTest(unittest.TestCase):
+
+    def test_layouts(self):
+        for line, record in [
+            ("00_________________________00000_00000.00__", Record("00", "", "00000", 0.0, "")),
+            ("01_Dev_Thaker____________00001_5.00", Record("01", "Dev_Thaker", "00001", 5.0, "")),
+            ("02_Dev_Thaker____________00001_3.00_00013", Record("02", "Dev_Thaker", "00001", 3.0, "00013")),
+            ("03_Xuan_Zheng____________00003_100.00_10000", Record("03", "Xuan_Zheng", "00003", 100.0, "10000")),
+            ("04_Elon_Trust_______________00013_00020.00__", Record("04", "Elon_Trust", "00013", 20.0, "")),
+            ("07_Dev_Thaker____________00001_00000.00_D_", Record("07", "Dev_Thaker", "00001", 0.0, "D")),
+            ("08_Dev_Thaker____________00001_00000.00_NP\n", Record("08", "Dev_Thaker", "00001", 0.0, "NP")),
+        ]:
+            self.assertEqual(parse_record(line), record)
+
+    def test_glued_records(self):
+        for line in [
+            "02_Dev_Thaker____________00001_3.00_0001301_Dev_Thaker____________00001_5.00",
+            "01_Dev_Thaker____________00001_5.00_01_Xuan_Zheng____________00003_3.00",
+            "01_A_00001_5.0001_B_00002_3.00",
+            "03_Xuan_Zheng____________00003_100.00_10000_junk",
+        ]:
+            self.assertIsNone(parse_record(line), line)
+
+
+if __name__ == "__main__":
+    unittest.main()
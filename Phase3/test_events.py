@@ -0,0 +1,62 @@
+"""
+Tests: Transaction Event Stream
+
+The error code of an event is the one given where the error happened
+(errors.py), in both event formats (events.py).
+
+How to Run:
+    python3 -m unittest test_events
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from events import EventSink, read_events
+from main import banking_system
+
+COMMANDS = [
+    "withdraw",
+    "login", "standard", "Xuan_Zheng",
+    "transfer", "00003", "99999", "5",
+    "transfer", "00003", "00001", "1200",
+    "transfer", "00003", "00001", "abc",
+]
+
+EXPECTED = [
+    ("withdraw", "rejected", "NOT_LOGGED_IN"),
+    ("login", "ok", None),
+    ("transfer", "rejected", "ACCOUNT_NOT_FOUND"),
+    ("transfer", "rejected", "LIMIT_EXCEEDED"),
+    ("transfer", "terminated", "NOT_NUMERIC"),
+]
+
+
+class ErrorCodeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="test_events_")
+        self.commands = os.path.join(self.dir, "commands.txt")
+        with open(self.commands, "w") as f:
+            f.write("\n".join(COMMANDS) + "\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def run_session(self, fmt):
+        path = os.path.join(self.dir, "events." + fmt)
+        with EventSink(path, fmt) as sink:
+            banking_system("current_accounts_file.txt", self.commands, os.path.join(self.dir, "out.txt"),
+                           os.path.join(self.dir, "out.etf"), event_sink=sink)
+        return [(e["command"], e["outcome"], e["error"]) for e in read_events(path)]
+
+    def test_ndjson(self):
+        self.assertEqual(self.run_session("ndjson"), EXPECTED)
+
+    def test_binary(self):
+        self.assertEqual(self.run_session("binary"), EXPECTED)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+Tests: Threaded Emitter
+
+ThreadedEmitter (pipeline.py) keeps the order of the output, makes the session
+wait once max_batches are queued, and drain() and close() return only after
+everything emitted before them is written, reporting the writer's errors.
+
+How to Run:
+    python3 -m unittest test_pipeline
+"""
+
+import threading
+import unittest
+
+from pipeline import CONSOLE, RECORD, ThreadedEmitter
+
+
+class GatedEmitter:
+    """ Inner emitter whose writes wait until the test opens the gate. """
+
+    def __init__(self, error=None):
+        self.items = []
+        self.drains = []
+        self.closed = False
+        self.error = error
+        self.writing = threading.Event()
+        self.gate = threading.Event()
+
+    def emit(self, items):
+        self.writing.set()
+        self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        self.items.extend(items)
+
+    def drain(self, sync=False):
+        self.drains.append(sync)
+
+    def close(self):
+        self.closed = True
+
+
+class ThreadedEmitterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.inner = GatedEmitter()
+        self.emitter = ThreadedEmitter(self.inner, batch_size=1, max_batches=2)
+
+    def tearDown(self):
+        self.inner.gate.set()
+        self.emitter.close()
+
+    def test_back_pressure(self):
+        self.emitter.console("a")
+        self.inner.writing.wait(5)
+        # The thread is held in its write of "a"; two more batches fill the queue.
+        self.emitter.record("b")
+        self.emitter.console("c")
+        session = threading.Thread(target=self.emitter.console, args=("d",))
+        session.start()
+        session.join(0.2)
+        self.assertTrue(session.is_alive())
+        self.assertEqual(self.emitter.waits, 1)
+
+        self.inner.gate.set()
+        session.join(5)
+        self.assertFalse(session.is_alive())
+        self.emitter.drain()
+        self.assertEqual(self.inner.items, [(CONSOLE, "a"), (RECORD, "b"), (CONSOLE, "c"), (CONSOLE, "d")])
+
+    def test_drain(self):
+        self.inner.gate.set()
+        emitter = ThreadedEmitter(self.inner, batch_size=64)
+        try:
+            emitter.console("a")
+            emitter.record("b")
+            self.assertEqual(self.inner.items, [])   # still in the session's batch
+            emitter.drain(sync=True)
+            self.assertEqual(self.inner.items, [(CONSOLE, "a"), (RECORD, "b")])
+            self.assertEqual(self.inner.drains, [True])
+        finally:
+            emitter.close()
+
+    def test_close(self):
+        self.inner.gate.set()
+        self.emitter.console("a")
+        self.emitter.close()
+        self.assertEqual(self.inner.items, [(CONSOLE, "a")])
+        self.assertTrue(self.inner.closed)
+        self.assertFalse(self.emitter._thread.is_alive())
+        self.emitter.close()
+        self.emitter.drain()
+
+    def test_error(self):
+        inner = GatedEmitter(OSError("disk full"))
+        inner.gate.set()
+        emitter = ThreadedEmitter(inner, batch_size=1)
+        emitter.console("a")
+        self.assertRaises(OSError, emitter.drain)
+        self.assertRaises(OSError, emitter.close)
+        self.assertTrue(inner.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
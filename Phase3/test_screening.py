@@ -0,0 +1,54 @@
+"""
+Tests: Sliding Window Counter
+
+SlidingWindowCounter (screening.py) forgets each transaction once the window
+has moved a whole window past the bucket it was counted in, and keeps amounts
+in whole cents so they never drift.
+
+How to Run:
+    python3 -m unittest test_screening
+"""
+
+import unittest
+
+from screening import SlidingWindowCounter
+
+
+class SlidingWindowCounterTest(unittest.TestCase):
+
+    def setUp(self):
+        # 60-second window moving in 10-second buckets.
+        self.counter = SlidingWindowCounter(60, buckets=6)
+
+    def test_expiry(self):
+        self.counter.add("00001", 10.0, now=0)
+        self.counter.add("00001", 5.0, now=25)
+        self.assertEqual(self.counter.totals("00001", now=59), (2, 15.0))
+        # The bucket of t=0 leaves the window at t=60, the one of t=25 at t=80.
+        self.assertEqual(self.counter.totals("00001", now=60), (1, 5.0))
+        self.assertEqual(self.counter.totals("00001", now=79), (1, 5.0))
+        self.assertEqual(self.counter.totals("00001", now=80), (0, 0.0))
+
+    def test_idle_for_a_window(self):
+        self.counter.add("00001", 10.0, now=0)
+        self.counter.add("00001", 5.0, now=55)
+        self.assertEqual(self.counter.totals("00001", now=1000), (0, 0.0))
+        self.counter.add("00001", 7.0, now=1000)
+        self.assertEqual(self.counter.totals("00001", now=1001), (1, 7.0))
+
+    def test_accounts_counted_apart(self):
+        self.counter.add("00001", 10.0, now=0)
+        self.counter.add("00002", 3.0, now=30)
+        self.assertEqual(self.counter.totals("00001", now=65), (0, 0.0))
+        self.assertEqual(self.counter.totals("00002", now=65), (1, 3.0))
+        self.assertEqual(self.counter.totals("00003", now=65), (0, 0.0))
+        self.assertEqual(len(self.counter), 2)
+
+    def test_cents(self):
+        for n in range(10):
+            self.counter.add("00001", 0.1, now=n)
+        self.assertEqual(self.counter.totals("00001", now=10), (10, 1.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
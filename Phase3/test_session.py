@@ -0,0 +1,82 @@
+"""
+Tests: Session Suspend and Resume
+
+Session.to_dict() (session.py) holds the whole login state as plain data, and
+a session rebuilt from it with from_dict() against another copy of the
+accounts carries on where the first one stopped.
+
+How to Run:
+    python3 -m unittest test_session
+"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from main import banking_system, load_users
+from session import Session
+
+
+class SuspendResumeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="test_session_")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def run_script(self, commands, **options):
+        path = os.path.join(self.dir, "commands.txt")
+        with open(path, "w") as f:
+            f.write("\n".join(commands) + "\n")
+        out = os.path.join(self.dir, "out.txt")
+        # Withdrawal prints its own progress to stdout.
+        with contextlib.redirect_stdout(io.StringIO()):
+            session = banking_system("current_accounts_file.txt", path, out, os.path.join(self.dir, "out.etf"),
+                                     **options)
+        with open(out) as f:
+            return session, f.read().splitlines()
+
+    def test_round_trip(self):
+        users = load_users("current_accounts_file.txt")
+        session = Session(users)
+        session.login("standard", users["00003"])
+        session.add_total("withdrawal", 20.0)
+        state = json.loads(json.dumps(session.to_dict()))
+        self.assertEqual(state, {"logged_in": True, "session_type": "standard", "current_account": "00003",
+                                 "totals": {"withdrawal": 20.0}})
+
+        other = load_users("current_accounts_file.txt")
+        resumed = Session.from_dict(state, other)
+        self.assertEqual(resumed.to_dict(), state)
+        self.assertIs(resumed.current_user, other["00003"])
+
+    def test_admin_and_logged_out(self):
+        users = load_users("current_accounts_file.txt")
+        for session_type in ("admin", None):
+            session = Session(users)
+            if session_type is not None:
+                session.login(session_type)
+            resumed = Session.from_dict(session.to_dict(), users)
+            self.assertEqual((resumed.logged_in, resumed.session_type, resumed.current_user),
+                             (session.logged_in, session_type, None))
+
+    def test_resume_in_another_run(self):
+        session, _ = self.run_script(["login", "standard", "Xuan_Zheng", "withdraw", "00003", "30"])
+        state = json.loads(json.dumps(session.to_dict()))
+
+        users = load_users("current_accounts_file.txt")
+        session, console = self.run_script(["withdraw", "00003", "20", "logout"],
+                                           session=Session.from_dict(state, users), users=users)
+        self.assertIn("Withdrawal success", console)
+        self.assertNotIn("Error: You must be logged in to withdraw.", console)
+        self.assertEqual(session.totals, {"withdrawal": 50.0})
+        self.assertFalse(session.logged_in)
+
+
+if __name__ == "__main__":
+    unittest.main()
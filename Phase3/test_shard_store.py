@@ -0,0 +1,51 @@
+"""
+Tests: Sharded Account Store
+
+A balance change spanning shards (shard_store.py) is applied on every shard
+or on none: when one shard refuses to prepare, the debits the others reserved
+are put back.
+
+How to Run:
+    python3 -m unittest test_shard_store
+"""
+
+import unittest
+
+from main import User
+from shard_store import ShardedAccountStore
+
+BALANCES = {"00001": 100.0, "00002": 50.0, "00003": 20.0, "00004": 0.0}
+
+
+class TwoPhaseTest(unittest.TestCase):
+
+    def setUp(self):
+        users = {acct: User(acct, "Holder", "A", balance) for acct, balance in BALANCES.items()}
+        self.store = ShardedAccountStore(users, num_shards=2)
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_shards(self):
+        self.assertEqual(self.store.num_shards, 2)
+        self.assertNotEqual(self.store.shard_for("00001"), self.store.shard_for("00003"))
+
+    def test_cross_shard_transfer(self):
+        self.assertTrue(self.store.transfer("00001", "00004", 30.0))
+        self.assertEqual(self.store.snapshot(), dict(BALANCES, **{"00001": 70.0, "00004": 30.0}))
+
+    def test_abort_on_failed_prepare(self):
+        # Shard 0 reserves the 10.00 debit from 00001; shard 1 refuses the overdraft of 00003.
+        self.assertFalse(self.store.apply({"00001": -10.0, "00003": -25.0, "00004": 35.0}))
+        self.assertEqual(self.store.snapshot(), BALANCES)
+        # Nothing is left reserved: the whole balance can still be spent.
+        self.assertTrue(self.store.apply({"00001": -100.0, "00004": 100.0}))
+        self.assertEqual(self.store.balance("00001"), 0.0)
+
+    def test_unknown_account(self):
+        self.assertFalse(self.store.apply({"00001": -10.0, "00009": 10.0}))
+        self.assertEqual(self.store.snapshot(), BALANCES)
+
+
+if __name__ == "__main__":
+    unittest.main()
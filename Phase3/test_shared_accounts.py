@@ -0,0 +1,84 @@
+"""
+Tests: Optimistic Commits on the Shared Account Table
+
+compare_and_apply() (shared_accounts.py) refuses a commit made against a row
+version that has changed since it was read, and Session.commit() (session.py)
+re-reads, re-checks and retries after such a conflict.
+
+How to Run:
+    python3 -m unittest test_shared_accounts
+"""
+
+import os
+import unittest
+
+from main import User
+from session import Session
+from shared_accounts import APPLIED, CONFLICT, REFUSED, SharedAccountTable
+
+
+class CompareAndApplyTest(unittest.TestCase):
+
+    def setUp(self):
+        users = {
+            "00001": User("00001", "Payer", "A", 100.0),
+            "00002": User("00002", "Payee", "A", 0.0),
+        }
+        self.table = SharedAccountTable.create(f"test_cas_{os.getpid()}", users, hot_accounts=())
+        # Two sessions working on the same table, each with its own copy of the users.
+        self.users_a = {acct: User(acct, u.user_name, "A", 0.0) for acct, u in users.items()}
+        self.users_b = {acct: User(acct, u.user_name, "A", 0.0) for acct, u in users.items()}
+
+    def tearDown(self):
+        self.table.close()
+
+    def test_conflict(self):
+        balance, version = self.table.read("00001")
+        self.assertEqual(self.table.apply({"00001": -10.0}), True)
+        versions = {"00001": version}
+        self.assertEqual(self.table.compare_and_apply({"00001": -20.0}, versions), CONFLICT)
+        self.assertEqual(self.table.balance("00001"), balance - 10.0)
+        self.assertEqual(self.table.contention["conflicts"], 1)
+
+        _, versions["00001"] = self.table.read("00001")
+        self.assertEqual(self.table.compare_and_apply({"00001": -20.0}, versions), APPLIED)
+        self.assertEqual(self.table.balance("00001"), balance - 30.0)
+        self.assertEqual(self.table.compare_and_apply({"00001": -500.0}, versions), REFUSED)
+
+    def test_session_retries_after_conflict(self):
+        a, b = Session(self.users_a, self.table), Session(self.users_b, self.table)
+        payer_a, payer_b = self.users_a["00001"], self.users_b["00001"]
+        before_a = a.refresh(payer_a, self.users_a["00002"])
+        before_b = b.refresh(payer_b)
+
+        payer_b.balance -= 30.0
+        self.assertTrue(b.commit(before_b))
+
+        # a validated against the 100.00 it read; its commit conflicts, then goes
+        # through on top of b's change.
+        payer_a.balance -= 50.0
+        self.users_a["00002"].balance += 50.0
+        self.assertTrue(a.commit(before_a))
+        self.assertEqual(payer_a.balance, 20.0)
+        self.assertEqual(self.table.balance("00001"), 20.0)
+        self.assertEqual(self.table.balance("00002"), 50.0)
+        self.assertEqual(self.table.contention["conflicts"], 1)
+
+    def test_retry_rechecks_funds(self):
+        a, b = Session(self.users_a, self.table), Session(self.users_b, self.table)
+        payer_a, payer_b = self.users_a["00001"], self.users_b["00001"]
+        before_a = a.refresh(payer_a)
+        before_b = b.refresh(payer_b)
+
+        payer_b.balance -= 80.0
+        self.assertTrue(b.commit(before_b))
+
+        # 60.00 was covered by the balance a read, not by what is left after b.
+        payer_a.balance -= 60.0
+        self.assertFalse(a.commit(before_a))
+        self.assertEqual(payer_a.balance, 100.0)
+        self.assertEqual(self.table.balance("00001"), 20.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
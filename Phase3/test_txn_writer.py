@@ -0,0 +1,95 @@
+"""
+Tests: Transaction Writer
+
+Per-day transaction logs (txn_writer.py) rotate by size and by day, list every
+file in the manifest, and a later session on the same day carries on with the
+file the last one left below max_bytes. With index=True each file's integrity
+index (etf_index.py) covers everything flushed.
+
+How to Run:
+    python3 -m unittest test_txn_writer
+"""
+
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from etf_index import EtfIndex
+from txn_writer import TransactionWriter, manifest_files, read_manifest
+
+RECORD = "01_Dev_Thaker____________00001_5.00"  # 36 bytes with its newline
+DAY_1 = datetime.date(2026, 10, 19)
+DAY_2 = datetime.date(2026, 10, 20)
+
+
+class TransactionWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="test_txn_writer_")
+        self.day = DAY_1
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def writer(self, **options):
+        return TransactionWriter(self.dir, max_bytes=100, today=lambda: self.day, **options)
+
+    def lines(self, name):
+        with open(os.path.join(self.dir, name)) as f:
+            return f.read().splitlines()
+
+    def test_rotation_and_manifest(self):
+        with self.writer(terminal="T01") as writer:
+            for _ in range(4):
+                writer.write(RECORD)
+            self.day = DAY_2
+            writer.write(RECORD)
+
+        self.assertEqual([(e["file"], e["records"], e["bytes"]) for e in read_manifest(self.dir)], [
+            (os.path.join("2026-10-19", "transactions_T01_0001.etf"), 3, 108),
+            (os.path.join("2026-10-19", "transactions_T01_0002.etf"), 1, 36),
+            (os.path.join("2026-10-20", "transactions_T01_0001.etf"), 1, 36),
+        ])
+        self.assertEqual(manifest_files(self.dir, day="2026-10-20"),
+                         [os.path.join(self.dir, "2026-10-20", "transactions_T01_0001.etf")])
+        self.assertEqual(self.lines(os.path.join("2026-10-19", "transactions_T01_0001.etf")), [RECORD] * 3)
+
+    def test_same_day_resume(self):
+        with self.writer() as writer:
+            writer.write(RECORD, txn_id="T0.a.1")
+        with self.writer() as writer:
+            writer.write(RECORD, txn_id="T0.b.1")
+
+        name = os.path.join("2026-10-19", "transactions_0001.etf")
+        self.assertEqual([(e["file"], e["records"], e["bytes"]) for e in read_manifest(self.dir)],
+                         [(name, 2, 72)])
+        self.assertEqual(self.lines(name), [RECORD] * 2)
+        self.assertEqual(self.lines(name + ".ids"), ["T0.a.1", "T0.b.1"])
+
+    def test_full_file_not_resumed(self):
+        with self.writer() as writer:
+            for _ in range(3):
+                writer.write(RECORD)
+        with self.writer() as writer:
+            writer.write(RECORD)
+
+        self.assertEqual([(e["seq"], e["records"]) for e in read_manifest(self.dir)], [(1, 3), (2, 1)])
+
+    def test_index(self):
+        with self.writer(index=True) as writer:
+            writer.write(RECORD)
+            writer.flush()
+            writer.write(RECORD)
+        with self.writer(index=True) as writer:
+            writer.write(RECORD)
+
+        index = EtfIndex(os.path.join(self.dir, "2026-10-19", "transactions_0001.etf"))
+        self.assertEqual((index.data["records"], len(index.data["checkpoints"])), (3, 3))
+        self.assertEqual(index.data["accounts"], {"00001": [3, 15.0]})
+        self.assertEqual(index.verify(full=True), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
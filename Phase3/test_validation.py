@@ -0,0 +1,70 @@
+"""
+Tests: Validation Rule Sets
+
+Adaptive rule order (validation.py) must never move a rule ahead of the guards
+it relies on.
+
+How to Run:
+    python3 -m unittest test_validation
+"""
+
+import unittest
+
+import validation
+from main import User
+from paybill import Paybill
+from transfer import Transfer
+
+
+class AdaptiveOrderTest(unittest.TestCase):
+
+    def setUp(self):
+        validation.adaptive_order(True, every=4)
+        self.messages = []
+
+    def tearDown(self):
+        validation.adaptive_order(False)
+        for rules in validation._RULE_SETS.values():
+            for rule in rules.rules + tuple(rules._order):
+                rule.failures = 0
+            rules.runs = 0
+
+    def transfer(self, user2, amount):
+        payer = User("00001", "Payer", "A", 500.0)
+        return Transfer("admin", payer, user2, amount, write_console=self.messages.append).process_transfer()
+
+    def test_missing_target_after_disabled_targets(self):
+        # Enough failures of target_active to move it to the front of what can move.
+        disabled = User("00002", "Disabled", "D", 0.0)
+        for _ in range(8):
+            self.assertEqual(self.transfer(disabled, 5.0), 0)
+        self.assertEqual(validation.rule_set("transfer", "admin").stats()[3][0], "target_active")
+
+        self.assertIsNone(self.transfer(None, 5.0))
+        self.assertEqual(self.messages[-1], "Error: Target account does not exist.")
+
+    def test_non_numeric_amount_after_overdrafts(self):
+        payee = User("00002", "Payee", "A", 0.0)
+        for _ in range(8):
+            self.transfer(payee, 900.0)
+        self.assertEqual(self.transfer(payee, "abc"), 0)
+        self.assertEqual(self.messages[-1], "Error: Invalid transfer amount. Amount must be numeric.")
+
+        payer = User("00001", "Payer", "A", 500.0)
+        for _ in range(8):
+            Paybill("standard", payer, "EC", 900.0, write_console=self.messages.append).process_paybill()
+        Paybill("standard", payer, "EC", "abc", write_console=self.messages.append).process_paybill()
+        self.assertEqual(self.messages[-1], "Error: Invalid payment amount. Amount must be numeric.")
+
+    def test_guards_stay_first(self):
+        for kind in ("transfer", "paybill"):
+            for session_type in ("admin", "standard"):
+                rules = validation.rule_set(kind, session_type)
+                for rule in rules.rules[rules.fixed:]:
+                    rule.failures = 1000
+                rules.reorder()
+                self.assertEqual(rules._order[:rules.fixed], list(rules.rules[:rules.fixed]))
+
+
+if __name__ == "__main__":
+    unittest.main()
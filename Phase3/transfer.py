@@ -6,7 +6,51 @@ Handles the transfer of funds between two user accounts.
 This class ensures proper validation of input values, available funds, and transaction limits.
 """
     
-from check import Check
+import errors
+from check import CHECK
+from validation import Rule, register, rule_set
+
+# Checks every transfer gets, in the order their errors are reported. The guards stay
+# first under adaptive order: the checks after them read the target account and
+# compare the amount.
+_COMMON = [
+    Rule("zero_amount", CHECK.zero_amount_check, ("amount",),
+         "Error: Transfer amount must be greater than zero.", errors.INVALID_AMOUNT),
+    Rule("target_exists", CHECK.account_existence_check, ("user2",),
+         "Error: Target account does not exist.", errors.ACCOUNT_NOT_FOUND, result=None, guard=True),
+    Rule("numeric_amount", CHECK.invalid_character_check, ("amount",),
+         "Error: Invalid transfer amount. Amount must be numeric.", errors.NOT_NUMERIC, guard=True),
+]
+
+# Admin: no ownership or limit checks, and may transfer from a disabled account.
+register("transfer", "admin", _COMMON + [
+    Rule("positive_amount", CHECK.negative_amount_check, ("amount",),
+         "Error: Invalid transfer amount. Amount must be positive.", errors.INVALID_AMOUNT),
+    Rule("funds", CHECK.balance_check, ("user1", "amount"),
+         "Error: Insufficient funds for transfer.", errors.INSUFFICIENT_FUNDS),
+    Rule("target_active", CHECK.availability_check, ("user2",),
+         lambda t: f"Error: Account {t.user2.account_number} is disabled. Transfers cannot be processed.",
+         errors.ACCOUNT_DISABLED),
+])
+
+register("transfer", "standard", _COMMON + [
+    Rule("distinct_accounts", CHECK.user_check, ("user1", "user2"),
+         "Error: Cannot transfer money to the same account.", errors.SAME_ACCOUNT),
+    Rule("source_active", CHECK.availability_check, ("user1",),
+         lambda t: f"Error: Account {t.user1.account_number} is disabled. Transfers cannot be processed.",
+         errors.ACCOUNT_DISABLED),
+    Rule("target_active", CHECK.availability_check, ("user2",),
+         lambda t: f"Error: Account {t.user2.account_number} is disabled. Transfers cannot be processed.",
+         errors.ACCOUNT_DISABLED),
+    Rule("positive_amount", CHECK.negative_amount_check, ("amount",),
+         "Error: Invalid transfer amount.", errors.INVALID_AMOUNT),
+    Rule("funds", CHECK.balance_check, ("user1", "amount"),
+         "Error: Insufficient funds for transfer.", errors.INSUFFICIENT_FUNDS),
+    Rule("limit", CHECK.limit_check, ("amount", "limit"),
+         lambda t: f"Error: Maximum transfer limit exceeded. You can transfer up to ${t.limit:.2f} in this session.",
+         errors.LIMIT_EXCEEDED),
+])
+
 
 class Transfer:
     
@@ -20,7 +64,8 @@ class Transfer:
         self.user2 = user2
         self.amount = amount
         self.limit = limit
-        self.check = Check()
+        self.check = CHECK
+        self.rules = rule_set("transfer", userType)
         
         # Provide a default no-op if not given
         if write_console is None:
@@ -30,100 +75,19 @@ class Transfer:
             self.write_console = write_console
 
     def process_transfer(self):
-        # Processes the fund transfer after performing necessary validations.
-        
-        if not self.check.zero_amount_check(self.amount):
-            # print("Error: Transfer amount must be greater than zero.")
-            self.write_console("Error: Transfer amount must be greater than zero.")
-            return 0
-            
-        # Check for missing inputs
-        # all_inputs_valid, missing_fields = self.check.missing_input_check(
-        #     user1=self.user1,
-        #     user2=self.user2,
-        #     amount=self.amount
-        # )
-        # if not all_inputs_valid:
-        #     self.write_console(f"Error: The transfer {', '.join(missing_fields)} is missing, so the process will be rejected. Please re-try.")
-        #     return 0
-        
-        # Basic checks that should always run
-        if not self.check.account_existence_check(self.user2):
-            self.write_console("Error: Target account does not exist.")
-            return
-        if not self.check.invalid_character_check(self.amount):
-            self.write_console("Error: Invalid transfer amount. Amount must be numeric.")
-            return 0
-
-        # If admin, skip ownership & limit checks, but still check negative/zero amounts & funds
-        if self.userType == "admin":
-            # Admin override
-            # Admin can transfer from any account to any other account, ignoring limit & ownership
-            if not self.check.negative_amount_check(self.amount):
-                # print("Error: Invalid transfer amount. Amount must be positive.")
-                self.write_console("Error: Invalid transfer amount. Amount must be positive.")
-                return 0
-            # if not self.check.zero_amount_check(self.amount):
-            #     # print("Error: Transfer amount must be greater than zero.")
-            #     self.write_console("Error: Transfer amount must be greater than zero.")
-            #     return 0
-            if not self.check.balance_check(self.user1, self.amount):
-                # print(f"Error: Insufficient funds for transfer.")
-                self.write_console("Error: Insufficient funds for transfer.")
-                return 0
+        """ Processes the fund transfer after the transfer rules for the session type pass. """
+        failed = self.rules.first_failure(self)
+        if failed is not None:
+            self.write_console(failed.error(self))
+            return failed.result
 
-            # Assume admin can transfer from an inactive account if desired
-            # if not self.check.availability_check(self.user1):
-            #     print("Error: Source account is inactive. Transfer cannot be processed.")
-            #     return
-
-            if not self.check.availability_check(self.user2):
-                self.write_console(f"Error: Account {self.user2.account_number} is disabled. Transfers cannot be processed.")
-                return 0
-
-            # Perform admin transfer
-            self.user1.balance -= self.amount
-            self.user2.balance += self.amount
-            self.write_console(
-                f"Transfer successful. New balance: "
-                f"${self.user1.balance:,.2f} (Account {self.user1.account_number}), "
-                f"${self.user2.balance:,.2f} (Account {self.user2.account_number})."
-            )
-
-        else:
-            # Standard user checks
-            if not self.check.user_check(self.user1, self.user2):
-                self.write_console("Error: Cannot transfer money to the same account.")
-                return 0
-            if not self.check.availability_check(self.user1):
-                self.write_console(f"Error: Account {self.user1.account_number} is disabled. Transfers cannot be processed.")
-                return 0
-            if not self.check.availability_check(self.user2):
-                self.write_console(f"Error: Account {self.user2.account_number} is disabled. Transfers cannot be processed.")
-                return 0
-            if not self.check.negative_amount_check(self.amount):
-                self.write_console("Error: Invalid transfer amount.")
-                return 0
-            # if not self.check.zero_amount_check(self.amount):
-            #     self.write_console("Error: Transfer amount must be greater than zero.")
-            #     return 0
-            if not self.check.balance_check(self.user1, self.amount):
-                self.write_console("Error: Insufficient funds for transfer.")
-                return 0
-            if not self.check.limit_check(self.amount, self.limit):
-                self.write_console(f"Error: Maximum transfer limit exceeded. You can transfer up to ${self.limit:.2f} in this session.")
-                return 0
-
-            # Process standard transfer
-            # print(f"Transfer successful. New balance: ${self.user1.balance:.2f}.")
-            # self.display_transaction_output()
-            self.user1.balance -= self.amount
-            self.user2.balance += self.amount
-            self.write_console(
-                f"Transfer successful. New balance: "
-                f"${self.user1.balance:,.2f} (Account {self.user1.account_number}), "
-                f"${self.user2.balance:,.2f} (Account {self.user2.account_number})."
-            )
+        self.user1.balance -= self.amount
+        self.user2.balance += self.amount
+        self.write_console(
+            f"Transfer successful. New balance: "
+            f"${self.user1.balance:,.2f} (Account {self.user1.account_number}), "
+            f"${self.user2.balance:,.2f} (Account {self.user2.account_number})."
+        )
 
     def return_transaction_output(self):
         formatted_username = self.user1.user_name.replace(" ", "_").ljust(21, "_")
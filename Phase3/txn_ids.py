@@ -0,0 +1,237 @@
+"""
+Transaction IDs and Duplicate Suppression
+
+Transaction records are fixed-width and carry no ID, so settling the same
+transaction file twice, or a copy of it (a day's log next to the .etf it was
+also written to), or a replayed session, applies the same transfers twice. The record format cannot change (the back office and the
+tests read it as it is), so IDs travel in a side file instead: next to a record
+file <path> is <path>.ids, with one ID per line, line N being the ID of line N
+of the record file (logout records included).
+
+An ID is "<terminal>.<session>.<sequence>", e.g. "T01.6718a2f09c3e41b7.12":
+the terminal, the session, and the record's position in the session. Every
+session gets a new session ID by default (new_session_id(): the start time and
+random bits), so two sessions never share IDs, even when they run the same
+script. Marking a re-run as a replay of an earlier session is explicit: pass
+that session's ID again, or derive the ID from the script on both runs
+(session_id_for(), main.py --replay-ids) when re-running a script is only ever
+a replay of it.
+
+SeenSet remembers every ID it has been given, to drop repeats when records are
+applied (settle.py --seen). The exact set lives on disk, in an SQLite table; in
+memory there is only a Bloom filter over it. An ID the filter has never seen is
+new for certain and costs no disk read; only IDs the filter may have seen (real
+repeats, and false positives at about error_rate) are looked up in the table.
+The filter's size is fixed when the set is created (capped at max_bytes), so
+memory stays bounded however long the history gets: past the expected count it
+only answers "maybe" more often, which costs lookups but never correctness. It
+is saved next to the table on close and rebuilt from the table if the two do
+not match (e.g. after a crash).
+"""
+
+import hashlib
+import math
+import os
+import secrets
+import sqlite3
+import struct
+import time
+
+BLOOM_HEADER = struct.Struct("<4sQQQ")  # magic, bits, hashes, IDs added
+BLOOM_MAGIC = b"BLM1"
+
+
+def ids_path(path):
+    """ The side file holding the IDs of the records in path. """
+    return path + ".ids"
+
+
+def new_session_id():
+    """ A session ID no other session gets: the start time in seconds, and 32 random bits (hex). """
+    return f"{int(time.time()):x}{secrets.token_hex(4)}"
+
+
+def session_id_for(commands_file):
+    """
+    A session ID derived from the session script, the same on every run of it. Only for
+    re-runs that replay the script: two real sessions running it would share IDs.
+    """
+    with open(commands_file, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=6).hexdigest()
+
+
+def read_ids(path):
+    """
+    The IDs of the records in path, one per line, or None if path has no side file or
+    the side file does not have one ID for every line.
+    """
+    try:
+        with open(ids_path(path)) as f:
+            ids = f.read().splitlines()
+    except FileNotFoundError:
+        return None
+    with open(path, "rb") as f:
+        lines = sum(1 for _ in f)
+    return ids if len(ids) == lines else None
+
+
+class TransactionIds:
+    """
+    Hands out the IDs of one session's records, in order.
+    """
+
+    def __init__(self, terminal, session, start=0):
+        """
+        :param terminal: Terminal ID (no "." allowed).
+        :param session: Session ID (no "." allowed), e.g. from new_session_id().
+        :param start: Sequence number of the last ID already handed out.
+        """
+        if "." in terminal or "." in session:
+            raise ValueError("Terminal and session IDs cannot contain '.'.")
+        self.prefix = f"{terminal}.{session}."
+        self.seq = start
+
+    def next(self):
+        self.seq += 1
+        return self.prefix + str(self.seq)
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+    """
+
+    def __init__(self, bits, hashes, data=None):
+        """
+        :param bits: Filter size in bits.
+        :param hashes: Bit positions set per item.
+        :param data: Existing filter contents (bits / 8 bytes, rounded up), or None for empty.
+        """
+        self.bits = bits
+        self.hashes = hashes
+        self.data = bytearray((bits + 7) // 8) if data is None else bytearray(data)
+
+    @classmethod
+    def for_capacity(cls, expected, error_rate, max_bytes=None):
+        """ A filter sized for expected items at error_rate false positives, at most max_bytes. """
+        bits = max(8, math.ceil(-expected * math.log(error_rate) / math.log(2) ** 2))
+        if max_bytes is not None:
+            bits = min(bits, max_bytes * 8)
+        hashes = max(1, round(bits / max(1, expected) * math.log(2)))
+        return cls(bits, hashes)
+
+    def _positions(self, item):
+        # Two 64-bit halves of one hash, combined into all the positions (Kirsch-Mitzenmacher).
+        h1, h2 = struct.unpack("<QQ", hashlib.blake2b(item.encode(), digest_size=16).digest())
+        bits = self.bits
+        return [(h1 + n * h2) % bits for n in range(self.hashes)]
+
+    def add(self, item):
+        data = self.data
+        for pos in self._positions(item):
+            data[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        data = self.data
+        for pos in self._positions(item):
+            if not data[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+class SeenSet:
+    """
+    IDs seen so far: exact on disk, with a Bloom filter in front of it in memory.
+    """
+
+    def __init__(self, path, expected=10_000_000, error_rate=0.01, max_bytes=64 * 1024 * 1024,
+                 commit_every=10_000):
+        """
+        :param path: SQLite database holding the IDs (created if missing). The Bloom
+                     filter is saved beside it as <path>.bloom.
+        :param expected: IDs the filter is sized for (only used when the set is created).
+        :param error_rate: Target false-positive rate at expected IDs.
+        :param max_bytes: Largest filter to allocate, whatever expected is.
+        :param commit_every: New IDs buffered before they are committed to the database.
+        """
+        self.path = path
+        self.bloom_path = path + ".bloom"
+        self.commit_every = commit_every
+        self.lookups = 0        # IDs the filter could not rule out, checked in the database
+        self.db = sqlite3.connect(path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS seen (id TEXT PRIMARY KEY) WITHOUT ROWID")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self.db.commit()
+        self.count = self._meta("count", 0)
+        self.bloom = self._load_bloom()
+        if self.bloom is None:
+            bits, hashes = self._meta("bits", None), self._meta("hashes", None)
+            self.bloom = (BloomFilter(bits, hashes) if bits is not None
+                          else BloomFilter.for_capacity(expected, error_rate, max_bytes))
+            self._rebuild()
+        self._pending = set()     # new IDs not yet committed to the database
+
+    def _meta(self, key, default):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None else default
+
+    def _load_bloom(self):
+        """ The saved filter, if there is one and it covers exactly the IDs in the database. """
+        try:
+            with open(self.bloom_path, "rb") as f:
+                magic, bits, hashes, count = BLOOM_HEADER.unpack(f.read(BLOOM_HEADER.size))
+                data = f.read()
+        except (FileNotFoundError, struct.error):
+            return None
+        if magic != BLOOM_MAGIC or count != self.count or len(data) != (bits + 7) // 8:
+            return None
+        return BloomFilter(bits, hashes, data)
+
+    def _rebuild(self):
+        for (txn_id,) in self.db.execute("SELECT id FROM seen"):
+            self.bloom.add(txn_id)
+
+    def __contains__(self, txn_id):
+        """ True if txn_id was added before. Only IDs the filter lets through reach the database. """
+        if txn_id not in self.bloom:
+            return False
+        self.lookups += 1
+        return txn_id in self._pending or self.db.execute(
+            "SELECT 1 FROM seen WHERE id = ?", (txn_id,)).fetchone() is not None
+
+    def add(self, txn_id):
+        """ Records txn_id; returns True if it is new, False if it was seen before. """
+        if txn_id in self:
+            return False
+        self.bloom.add(txn_id)
+        self._pending.add(txn_id)
+        if len(self._pending) >= self.commit_every:
+            self.commit()
+        return True
+
+    def commit(self):
+        """ Writes the buffered IDs to the database. """
+        if not self._pending:
+            return
+        self.count += len(self._pending)
+        with self.db:
+            self.db.executemany("INSERT INTO seen (id) VALUES (?)", ((i,) for i in sorted(self._pending)))
+            self.db.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                (("count", self.count), ("bits", self.bloom.bits), ("hashes", self.bloom.hashes)))
+        self._pending = set()
+
+    def close(self):
+        """ Commits, saves the filter and closes the database. """
+        self.commit()
+        tmp_path = self.bloom_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(BLOOM_HEADER.pack(BLOOM_MAGIC, self.bloom.bits, self.bloom.hashes, self.count))
+            f.write(self.bloom.data)
+        os.replace(tmp_path, self.bloom_path)
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,229 @@
+"""
+Transaction Writer
+
+Writes transaction records into per-day (and optionally per-terminal) log files
+instead of one ever-growing daily_transaction_file.txt, so the back office can
+pick up and process each day on its own, and several days in parallel.
+
+Layout under the log directory:
+  2026-10-19/transactions_0001.etf        one terminal, first file of the day
+  2026-10-19/transactions_T01_0002.etf    terminal "T01", rotated once
+  manifest.json                           every file with its day, terminal,
+                                          sequence number, records and bytes
+
+Records written with a transaction ID also get it appended to the file's .ids
+side file (2026-10-19/transactions_0001.etf.ids), one ID per record line; see
+txn_ids.py. The side file is rotated with its log file and is not in the
+manifest.
+
+A file is rotated to the next sequence number once it reaches max_bytes, and a
+new day always starts a new file. The manifest is rewritten on every rotation
+and on close, under a lock so that several terminals can share one directory.
+
+How soon a written record is on disk depends on the durability mode:
+  none    records reach the OS when the file buffer fills or is flushed, and the
+          disk whenever the OS writes them back (the default, and the fastest)
+  group   group commit: the file is fsynced once group_records records have
+          been written since the last sync, or on the first write group_ms or
+          more after it, so a crash loses at most about one group
+  txn     every record is flushed and fsynced before write() returns
+In group and txn mode flush() also syncs, so everything written before a flush
+(FileEmitter drains at every logout) or close is on disk, and a rotated file is
+synced before it is closed. Group mode has no timer of its own: the time bound
+is checked on each write, and the records after the last write wait for the
+next flush. See bench_durability.py for what each mode costs.
+
+With index=True every log file also gets an integrity index beside it
+(2026-10-19/transactions_0001.etf.idx, see etf_index.py). The records written
+since the last flush are indexed as one batch on every flush and when the file
+is closed, so the index covers everything up to the last logout.
+"""
+
+import datetime
+import json
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; manifest updates are then unlocked
+    fcntl = None
+
+MANIFEST = "manifest.json"
+DURABILITY = ("none", "group", "txn")
+
+
+def _file_name(terminal, seq):
+    prefix = f"transactions_{terminal}" if terminal else "transactions"
+    return f"{prefix}_{seq:04d}.etf"
+
+
+def read_manifest(directory):
+    """ Returns the manifest entries of a log directory (empty if there is none yet). """
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)["files"]
+    except FileNotFoundError:
+        return []
+
+
+def manifest_files(directory, day=None, terminal=None):
+    """ Paths of the logged files, optionally only one day's and/or one terminal's, in order. """
+    entries = [e for e in read_manifest(directory)
+               if (day is None or e["day"] == day) and (terminal is None or e["terminal"] == terminal)]
+    entries.sort(key=lambda e: (e["day"], e["terminal"] or "", e["seq"]))
+    return [os.path.join(directory, e["file"]) for e in entries]
+
+
+class TransactionWriter:
+    """
+    Appends transaction records to the current day's log file, rotating by size.
+    """
+
+    def __init__(self, directory, terminal=None, max_bytes=1_000_000, today=None, durability="none",
+                 group_records=64, group_ms=10, index=False):
+        """
+        :param directory: Log directory; per-day subdirectories are created inside it.
+        :param terminal: Optional terminal id, added to file names so terminals never share a file.
+        :param max_bytes: Size at which the current file is closed and the next one started.
+        :param today: Callable returning the current datetime.date (defaults to date.today).
+        :param durability: "none", "group" or "txn" (see the module docstring).
+        :param group_records: Group mode: records written before the file is synced.
+        :param group_ms: Group mode: milliseconds after a sync at which the next write syncs.
+        :param index: Keep an etf_index.EtfIndex beside each log file (see the module docstring).
+        """
+        if durability not in DURABILITY:
+            raise ValueError(f"Unknown durability mode {durability!r}; expected one of {', '.join(DURABILITY)}.")
+        self.directory = directory
+        self.terminal = terminal
+        self.max_bytes = max_bytes
+        self.today = today or datetime.date.today
+        self.durability = durability
+        self.group_records = group_records
+        self.group_seconds = group_ms / 1000
+        self.syncs = 0          # fsyncs of the log file (each with its .ids side file)
+        self._unsynced = 0      # records written since the last sync
+        self._synced_at = time.monotonic()
+        self._file = None
+        self._ids_file = None
+        self._day = None
+        self._entry = None
+        self._index = None
+        self._index_class = None
+        if index:
+            from etf_index import EtfIndex
+            self._index_class = EtfIndex
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, record, txn_id=None):
+        """
+        Appends one record (without its newline) to the current log file, and its
+        transaction ID, if it has one, to the file's .ids side file.
+        """
+        day = self.today().isoformat()
+        if self._file is None or day != self._day or self._entry["bytes"] >= self.max_bytes:
+            self._roll(day)
+        data = record + "\n"
+        self._file.write(data)
+        self._entry["bytes"] += len(data)
+        self._entry["records"] += 1
+        if txn_id is not None:
+            if self._ids_file is None:
+                self._ids_file = open(os.path.join(self.directory, self._entry["file"] + ".ids"), "a")
+            self._ids_file.write(txn_id + "\n")
+        if self.durability != "none":
+            self._unsynced += 1
+            if (self.durability == "txn" or self._unsynced >= self.group_records
+                    or time.monotonic() - self._synced_at >= self.group_seconds):
+                self._sync()
+
+    def _sync(self):
+        """ Flushes the current file (and its .ids side file) and fsyncs them. """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        if self._ids_file is not None:
+            self._ids_file.flush()
+            os.fsync(self._ids_file.fileno())
+        self.syncs += 1
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def _roll(self, day):
+        """ Closes the current file and opens the one the next record belongs in. """
+        self._close_file()
+
+        same_stream = [e for e in read_manifest(self.directory)
+                       if e["day"] == day and e["terminal"] == self.terminal]
+        last = max(same_stream, key=lambda e: e["seq"], default=None)
+        if last is not None and last["bytes"] < self.max_bytes:
+            # Carry on with the file a previous session left open.
+            entry = dict(last)
+        else:
+            seq = last["seq"] + 1 if last is not None else 1
+            entry = {"file": os.path.join(day, _file_name(self.terminal, seq)), "day": day,
+                     "terminal": self.terminal, "seq": seq, "records": 0, "bytes": 0}
+
+        os.makedirs(os.path.join(self.directory, day), exist_ok=True)
+        self._file = open(os.path.join(self.directory, entry["file"]), "a")
+        if self._index_class is not None:
+            self._index = self._index_class(os.path.join(self.directory, entry["file"]))
+        self._day = day
+        self._entry = entry
+        self._update_manifest()
+
+    def _close_file(self):
+        if self._file is not None:
+            if self._unsynced:
+                self._sync()
+            self._file.close()
+            self._file = None
+            if self._ids_file is not None:
+                self._ids_file.close()
+                self._ids_file = None
+            if self._index is not None:
+                self._index.update()
+                self._index = None
+            self._update_manifest()
+
+    def _update_manifest(self):
+        """ Merges this writer's current entry into the shared manifest. """
+        path = os.path.join(self.directory, MANIFEST)
+        lock_fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.lockf(lock_fd, fcntl.LOCK_EX)
+            entries = [e for e in read_manifest(self.directory) if e["file"] != self._entry["file"]]
+            entries.append(dict(self._entry))
+            entries.sort(key=lambda e: (e["day"], e["terminal"] or "", e["seq"]))
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"files": entries}, f, indent=1)
+                if self.durability != "none":
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        finally:
+            os.close(lock_fd)
+
+    def flush(self):
+        """ Flushes the current file; in group and txn mode, also syncs whatever is not synced yet. """
+        if self._file is None:
+            return
+        if self._unsynced:
+            self._sync()
+        else:
+            self._file.flush()
+            if self._ids_file is not None:
+                self._ids_file.flush()
+        if self._index is not None:
+            self._index.update()
+
+    def close(self):
+        """ Closes the current file and records its final size in the manifest. """
+        self._close_file()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,146 @@
+"""
+Validation Rule Sets
+
+A transaction handler used to validate with a chain of if-statements, one per
+Check method, chosen by session type. Here the same checks are data: a RuleSet
+is an ordered list of Rules, each naming a Check method (bound to the shared
+CHECK instance), the handler attributes it is called with, and the error message
+and return value the handler reports when it fails. The rule sets are built
+once, when the handler module is first imported, and kept in a registry keyed by
+(transaction type, session type):
+
+  rules = rule_set("transfer", "admin")
+  failed = rules.first_failure(transfer)
+
+The first rule that fails decides the error message, as the if-chains did, so
+the order of each list is part of the console output the tests expect.
+
+Some rules are guards: later rules rely on them having passed (a target account
+that exists before its availability is read, a numeric amount before it is
+compared). A rule set keeps its rules up to and including its last guard as a
+fixed prefix.
+
+Adaptive order (off by default): every RuleSet counts how often each rule fails.
+With adaptive_order(True), every `every` validations a rule set moves the rules
+after the fixed prefix that fail most often to the front of the rest, so a transaction that is going to be rejected
+is rejected after fewer checks. It does
+not make a passing transaction cheaper (every rule still runs), and a
+transaction that breaks several rules may then be reported against a different
+one of them, so it is meant for bulk front ends whose rejections are counted
+rather than read.
+"""
+
+from operator import attrgetter
+
+from errors import ErrorMessage
+
+
+class Rule:
+    """
+    One validation step.
+    """
+
+    __slots__ = ("name", "check", "args", "message", "code", "result", "guard", "failures")
+
+    def __init__(self, name, check, args, message, code, result=0, guard=False):
+        """
+        :param name: Rule name (for failure statistics).
+        :param check: Bound Check method; the transaction passes when it returns true.
+        :param args: Names of the handler attributes check is called with, in order.
+        :param message: Error message written when it fails: a string, or a function
+                        of the handler for messages that name accounts or amounts.
+        :param code: Error code (errors.py) the message is reported with.
+        :param result: What the handler returns when this rule fails.
+        :param guard: Later rules rely on this one having passed, so adaptive order
+                      never moves a rule ahead of it.
+        """
+        self.name = name
+        self.check = check
+        self.args = tuple(args)
+        self.message = message
+        self.code = code
+        self.result = result
+        self.guard = guard
+        self.failures = 0
+
+    def error(self, txn):
+        """ The error message for txn, as an ErrorMessage carrying the rule's code. """
+        return ErrorMessage(self.code, self.message if isinstance(self.message, str) else self.message(txn))
+
+    def __repr__(self):
+        return f"Rule({self.name!r}, failures={self.failures})"
+
+
+class RuleSet:
+    """
+    An ordered list of Rules, run until the first one fails.
+    """
+
+    def __init__(self, rules, every=1024):
+        """
+        :param rules: Rules in the order their errors take precedence.
+        :param every: Validations between reorderings, when adaptive order is on.
+        """
+        # Copies, so a rule list shared by several sets counts failures per set.
+        self.rules = tuple(Rule(r.name, r.check, r.args, r.message, r.code, r.result, r.guard) for r in rules)
+        # Rules up to the last guard never move.
+        self.fixed = max((n + 1 for n, rule in enumerate(self.rules) if rule.guard), default=0)
+        self.every = every
+        self.runs = 0
+        self.adaptive = False
+        self._set_order(list(self.rules))
+
+    def _set_order(self, order):
+        self._order = order
+        # What first_failure() runs, per rule: the check, a getter for its arguments,
+        # and whether the getter returns several.
+        self._steps = [(rule, rule.check, attrgetter(*rule.args), len(rule.args) > 1) for rule in order]
+
+    def first_failure(self, txn):
+        """ Runs the rules on txn in order; returns the first that fails, or None. """
+        self.runs += 1
+        if self.adaptive and self.runs % self.every == 0:
+            self.reorder()
+        for rule, check, get, spread in self._steps:
+            if not (check(*get(txn)) if spread else check(get(txn))):
+                rule.failures += 1
+                return rule
+        return None
+
+    def reorder(self):
+        """
+        Puts the rules that failed most often first, after the fixed prefix (ties keep
+        their current order).
+        """
+        fixed = self.fixed
+        self._set_order(self._order[:fixed] + sorted(self._order[fixed:], key=lambda rule: -rule.failures))
+
+    def reset_order(self):
+        self._set_order(list(self.rules))
+
+    def stats(self):
+        """ (rule name, failures) in the current order. """
+        return [(rule.name, rule.failures) for rule in self._order]
+
+
+_RULE_SETS = {}  # (transaction type, session type) -> RuleSet
+
+
+def register(kind, session_type, rules):
+    """ Builds and registers the RuleSet for one (transaction type, session type). """
+    rules = _RULE_SETS[(kind, session_type)] = RuleSet(rules)
+    return rules
+
+
+def rule_set(kind, session_type):
+    """ The RuleSet for kind; any session type other than "admin" uses the "standard" one. """
+    return _RULE_SETS[(kind, "admin" if session_type == "admin" else "standard")]
+
+
+def adaptive_order(enabled=True, every=1024):
+    """ Turns adaptive rule order on or off for every registered RuleSet. """
+    for rules in _RULE_SETS.values():
+        rules.adaptive = enabled
+        rules.every = every
+        if not enabled:
+            rules.reset_order()
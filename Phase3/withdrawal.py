@@ -1,5 +1,5 @@
 # Test withdrawal 
-from check import Check
+from check import CHECK
 
 
 class Withdrawal:
@@ -14,7 +14,7 @@ class Withdrawal:
     def __init__(self, user, amount):
         self.user = user  # User object
         self.amount = amount  # Amount to be withdrawn
-        self.check = Check()
+        self.check = CHECK
 
     def check_account_number(self):
         """
@@ -0,0 +1,171 @@
+"""
+Pre-Forked Session Worker Pool
+
+Runs a long-lived supervisor that loads the accounts file and imports every
+transaction handler once, then forks N workers that inherit that warm state
+copy-on-write. Workers take session jobs from a local Unix socket and run
+banking_system on them, so a session no longer pays for interpreter start,
+imports and load_users.
+
+Each job gets its own copy of the preloaded accounts, so sessions still start
+from the accounts file exactly as a fresh `python3 main.py` process would. The
+supervisor reloads the file when its modification time changes.
+
+Protocol (one connection per session over the socket):
+  request : accounts, commands, out and etf paths plus the client's working
+            directory, tab-separated on one line
+  reply   : "OK" or "ERROR" on the first line, then the session's stdout or the
+            error report, until the worker closes the connection
+
+How to Run:
+    python3 worker_pool.py current_accounts_file.txt [--workers 4] [--socket PATH] [--max-jobs 1000]
+    python3 pool_main.py <accounts_file> <commands_file> <console_out_file> <transaction_out_file>
+
+The client side (pool_main.py) only imports os, socket and sys, so it starts
+faster than main.py itself.
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import os
+import signal
+import socket
+import traceback
+
+from main import HANDLER_MODULES, banking_system, handler, load_users
+from pool_main import DEFAULT_SOCKET
+
+
+def clone_users(users):
+    """ Cheap per-session copy of a preloaded accounts dict (no file parsing). """
+    copies = {}
+    for acct, user in users.items():
+        copy = object.__new__(type(user))
+        copy.__dict__.update(user.__dict__)
+        copies[acct] = copy
+    return copies
+
+
+class AccountsCache:
+    """ The preloaded accounts of one file, reloaded when the file changes. """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.mtime = None
+        self.users = None
+        self.refresh()
+
+    def refresh(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self.mtime:
+            self.users = load_users(self.path)
+            self.mtime = mtime
+
+    def users_for(self, path):
+        """ A fresh copy of the accounts in path (loaded directly if it is another file). """
+        if os.path.abspath(path) != self.path:
+            return load_users(path)
+        self.refresh()
+        return clone_users(self.users)
+
+
+def _handle(conn, cache):
+    with conn, conn.makefile("rb") as stream:
+        line = stream.readline()
+        if not line:
+            return
+        try:
+            accounts, commands, out, etf, cwd = line.decode().rstrip("\n").split("\t")
+            os.chdir(cwd)
+            captured = io.StringIO()
+            with contextlib.redirect_stdout(captured):
+                banking_system(accounts, commands, out, etf, users=cache.users_for(accounts))
+            reply = "OK\n" + captured.getvalue()
+        except Exception:
+            reply = "ERROR\n" + traceback.format_exc()
+        conn.sendall(reply.encode())
+
+
+def _worker(listener, cache, max_jobs):
+    """ Worker loop: accept and run jobs until max_jobs is reached, then exit to be replaced. """
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    done = 0
+    while max_jobs <= 0 or done < max_jobs:
+        conn, _ = listener.accept()
+        _handle(conn, cache)
+        done += 1
+    os._exit(0)
+
+
+def _spawn(listener, cache, max_jobs):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            _worker(listener, cache, max_jobs)
+        finally:
+            os._exit(1)
+    return pid
+
+
+def serve(accounts_file, workers=4, socket_path=DEFAULT_SOCKET, max_jobs=1000):
+    """ Starts the supervisor and blocks, replacing workers that exit, until SIGTERM/SIGINT. """
+    if not hasattr(os, "fork"):
+        raise OSError("The worker pool needs os.fork (POSIX only).")
+
+    # Warm everything a session may need before forking, then move it out of the
+    # GC's reach so collections in the workers do not dirty the shared pages.
+    for name in HANDLER_MODULES:
+        handler(name)
+    cache = AccountsCache(accounts_file)
+    gc.collect()
+    gc.freeze()
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen(128)
+
+    children = {_spawn(listener, cache, max_jobs) for _ in range(workers)}
+    print(f"Worker pool ready: {workers} workers on {socket_path}")
+
+    def _stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, _stop)
+    try:
+        while True:
+            pid, _ = os.wait()
+            if pid in children:
+                children.discard(pid)
+                children.add(_spawn(listener, cache, max_jobs))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        listener.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-forked worker pool for front end sessions.")
+    parser.add_argument("accounts_file")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--socket", default=DEFAULT_SOCKET)
+    parser.add_argument("--max-jobs", type=int, default=1000,
+                        help="jobs a worker runs before it is replaced (0 = never)")
+    args = parser.parse_args()
+    serve(args.accounts_file, args.workers, args.socket, args.max_jobs)